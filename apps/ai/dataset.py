@@ -0,0 +1,211 @@
+import io
+import json
+import mmap
+import os
+import tarfile
+import zlib
+
+import numpy as np
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+FORMAT_NPY = "npy"
+FORMAT_TAR = "tar"
+FORMATS = (FORMAT_NPY, FORMAT_TAR)
+
+SPLIT_TRAIN = 0
+SPLIT_VAL = 1
+SPLITS = {"train": SPLIT_TRAIN, "val": SPLIT_VAL}
+
+INDEX_DTYPE = np.dtype([
+    ("dataset_id", "<i8"),
+    ("roi_id", "U36"),
+    ("label", "u1"),
+    ("camera_id", "<i8"),
+    ("bazaar_id", "<i8"),
+    ("snapshot_at", "<i8"),
+    ("split", "u1"),
+    ("offset", "<i8"),
+    ("size", "<i8"),
+])
+
+
+def split_of(camera_id, roi_id, val_percent):
+    # Bitta rastaning barcha kesimlari doim bitta bo'limga tushadi (train/val aralashmaydi)
+    bucket = zlib.crc32(f"{camera_id}:{roi_id}".encode("utf-8")) % 100
+    return SPLIT_VAL if bucket < val_percent else SPLIT_TRAIN
+
+
+def load_manifest(path):
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(path, manifest):
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def exported_ids(path, manifest):
+    ids = set()
+    for shard in manifest["shards"]:
+        index = np.load(os.path.join(path, shard["name"] + ".index.npy"), mmap_mode="r")
+        ids.update(index["dataset_id"].tolist())
+    return ids
+
+
+class ShardWriter:
+    """Kesimlarni ketma-ket shardlarga yozadi, manifest faqat shard to'liq yozilgandan keyin yangilanadi."""
+
+    def __init__(self, path, manifest, shard_size):
+        self.path = path
+        self.manifest = manifest
+        self.shard_size = shard_size
+        self.format = manifest["format"]
+        self.image_size = tuple(manifest["image_size"])
+        self.images, self.rows = [], []
+        self.tar, self.tar_name = None, None
+
+    def _next_name(self):
+        return "shard-%05d" % len(self.manifest["shards"])
+
+    def add(self, image_bytes, dataset_id, roi_id, label, camera_id, bazaar_id, snapshot_at, split):
+        offset, size = 0, 0
+        if self.format == FORMAT_NPY:
+            import cv2
+
+            img = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if img is None:
+                return False
+
+            h, w = self.image_size
+            self.images.append(cv2.resize(img, (w, h), interpolation=cv2.INTER_AREA))
+        else:
+            if self.tar is None:
+                self.tar_name = self._next_name()
+                self.tar = tarfile.open(os.path.join(self.path, self.tar_name + ".tar.tmp"), "w")
+
+            info = tarfile.TarInfo(name="%d-%s.jpg" % (dataset_id, roi_id))
+            info.size = len(image_bytes)
+            offset = self.tar.offset + len(info.tobuf(self.tar.format, self.tar.encoding, self.tar.errors))
+            size = info.size
+            self.tar.addfile(info, io.BytesIO(image_bytes))
+
+        self.rows.append((dataset_id, roi_id, label, camera_id, bazaar_id, snapshot_at, split, offset, size))
+        return True
+
+    def flush_if_full(self):
+        # Faqat qator chegarasida chaqiriladi, bitta qatorning kesimlari ikki shardga bo'linmaydi
+        if len(self.rows) >= self.shard_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+
+        name = self.tar_name if self.format == FORMAT_TAR else self._next_name()
+        index = np.array(self.rows, dtype=INDEX_DTYPE)
+
+        if self.format == FORMAT_NPY:
+            np.save(os.path.join(self.path, name + ".images.npy"), np.stack(self.images))
+        else:
+            self.tar.close()
+            os.replace(os.path.join(self.path, name + ".tar.tmp"), os.path.join(self.path, name + ".tar"))
+            self.tar, self.tar_name = None, None
+
+        np.save(os.path.join(self.path, name + ".index.npy"), index)
+
+        self.manifest["shards"].append({
+            "name": name,
+            "count": len(index),
+            "train": int((index["split"] == SPLIT_TRAIN).sum()),
+            "val": int((index["split"] == SPLIT_VAL).sum()),
+        })
+        save_manifest(self.path, self.manifest)
+
+        self.images, self.rows = [], []
+
+
+class StallShardDataset:
+    """
+    Eksport qilingan datasetni o'qish:
+
+        ds = StallShardDataset("/data/export", split="train")
+        image, label = ds[0]
+        for images, labels in ds.iter_batches(256): ...
+    """
+
+    def __init__(self, path, split=None):
+        self.path = path
+        self.manifest = load_manifest(path)
+        if self.manifest is None:
+            raise FileNotFoundError(os.path.join(path, MANIFEST_NAME))
+
+        self.format = self.manifest["format"]
+        self._shards, self._positions, self.index = [], [], []
+
+        for n, shard in enumerate(self.manifest["shards"]):
+            index = np.load(os.path.join(path, shard["name"] + ".index.npy"), mmap_mode="r")
+            self._shards.append(shard["name"])
+
+            positions = np.arange(len(index))
+            if split is not None:
+                positions = positions[index["split"] == SPLITS[split]]
+
+            self._positions.append(np.stack([np.full(len(positions), n), positions], axis=1))
+            self.index.append(index[positions])
+
+        self._positions = np.concatenate(self._positions) if self._positions else np.empty((0, 2), dtype=np.int64)
+        self.index = np.concatenate(self.index) if self.index else np.empty(0, dtype=INDEX_DTYPE)
+        self._data = {}
+
+    def __len__(self):
+        return len(self._positions)
+
+    @property
+    def labels(self):
+        return self.index["label"]
+
+    def _shard_data(self, n):
+        if n not in self._data:
+            name = self._shards[n]
+            if self.format == FORMAT_NPY:
+                self._data[n] = np.load(os.path.join(self.path, name + ".images.npy"), mmap_mode="r")
+            else:
+                with open(os.path.join(self.path, name + ".tar"), "rb") as f:
+                    self._data[n] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._data[n]
+
+    def __getitem__(self, i):
+        n, position = self._positions[i]
+        data = self._shard_data(int(n))
+        row = self.index[i]
+
+        if self.format == FORMAT_NPY:
+            return data[position], int(row["label"])
+
+        import cv2
+
+        buf = np.frombuffer(data, dtype=np.uint8, count=int(row["size"]), offset=int(row["offset"]))
+        return cv2.imdecode(buf, cv2.IMREAD_COLOR), int(row["label"])
+
+    def iter_batches(self, batch_size, shuffle=False, seed=0):
+        order = np.arange(len(self))
+        if shuffle:
+            np.random.default_rng(seed).shuffle(order)
+
+        for start in range(0, len(order), batch_size):
+            items = [self[int(i)] for i in order[start:start + batch_size]]
+            images = [img for img, _ in items]
+            # tar formatida kesimlar asl o'lchamda, shuning uchun ro'yxat qaytadi
+            if self.format == FORMAT_NPY:
+                images = np.stack(images)
+            yield images, np.array([label for _, label in items], dtype=np.uint8)
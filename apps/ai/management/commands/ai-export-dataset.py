@@ -0,0 +1,93 @@
+import os
+import shutil
+
+from django.core.management import BaseCommand, CommandError
+
+from apps.ai.dataset import (
+    FORMATS, FORMAT_NPY, MANIFEST_VERSION, ShardWriter, exported_ids, load_manifest, save_manifest, split_of
+)
+from apps.ai.models import StallDataSet
+from smartbozor.mixins import ReadReplicaCommandMixin
+from apps.camera.models import Camera
+from smartbozor.storages import stall_training_storage
+
+
+class Command(ReadReplicaCommandMixin, BaseCommand):
+    help = "STATUS_GENERATED kesimlarini memory-map qilinadigan shardlarga eksport qilish (inkremental)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", type=str, default=None,
+                            help="Eksport papkasi (default: STALL_TRAINING_DATASET_DIR/export)")
+        parser.add_argument("--format", choices=FORMATS, default=FORMAT_NPY)
+        parser.add_argument("--shard-size", type=int, default=2048)
+        parser.add_argument("--image-size", type=int, nargs=2, default=(96, 96), metavar=("H", "W"))
+        parser.add_argument("--val-percent", type=int, default=10)
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--rebuild", action="store_true", help="Eski eksportni o'chirib, qaytadan yaratish")
+
+    def handle(self, *args, **options):
+        path = options["path"] or stall_training_storage.path("export")
+
+        if options["rebuild"] and os.path.exists(path):
+            shutil.rmtree(path)
+        os.makedirs(path, exist_ok=True)
+
+        manifest = load_manifest(path)
+        if manifest is None:
+            manifest = {
+                "version": MANIFEST_VERSION,
+                "format": options["format"],
+                "image_size": list(options["image_size"]),
+                "val_percent": options["val_percent"],
+                "shards": [],
+            }
+            save_manifest(path, manifest)
+        elif (manifest["format"] != options["format"]
+              or manifest["val_percent"] != options["val_percent"]
+              or manifest["image_size"] != list(options["image_size"])):
+            raise CommandError("Eksport parametrlari manifestdan farq qiladi, --rebuild bilan qayta yarating")
+
+        done = exported_ids(path, manifest)
+        ids = [i for i in StallDataSet.objects.filter(
+            status=StallDataSet.STATUS_GENERATED,
+        ).order_by('id').values_list('id', flat=True) if i not in done]
+        print("New rows:", len(ids))
+
+        writer = ShardWriter(path, manifest, options["shard_size"])
+        cameras = dict()
+        added, missing = 0, 0
+
+        batch_size = options["batch_size"]
+        for start in range(0, len(ids), batch_size):
+            rows = StallDataSet.objects.filter(id__in=ids[start:start + batch_size]).order_by('id')
+            for row in rows:
+                if row.camera_id not in cameras:
+                    cameras[row.camera_id] = Camera.objects.filter(id=row.camera_id).values_list('roi', flat=True).first()
+
+                snapshot_at = int(row.snapshot_at.timestamp()) if row.snapshot_at else 0
+                for crop in row.training_crops(cameras[row.camera_id]):
+                    if not os.path.exists(crop["to"]):
+                        missing += 1
+                        continue
+
+                    with open(crop["to"], "rb") as f:
+                        image_bytes = f.read()
+
+                    if writer.add(
+                        image_bytes,
+                        dataset_id=row.id,
+                        roi_id=crop["id"],
+                        label=1 if crop["is_occupied"] else 0,
+                        camera_id=row.camera_id,
+                        bazaar_id=row.bazaar_id,
+                        snapshot_at=snapshot_at,
+                        split=split_of(row.camera_id, crop["id"], manifest["val_percent"]),
+                    ):
+                        added += 1
+
+                writer.flush_if_full()
+
+            print("\tprocessed:", min(start + batch_size, len(ids)), "crops:", added, "missing:", missing)
+
+        writer.flush()
+        print("Shards:", len(manifest["shards"]), "crops:", sum(s["count"] for s in manifest["shards"]))
@@ -1,14 +1,11 @@
 import json
 import os
-import re
 import subprocess
-from pathlib import Path
 
 from django.core.management import BaseCommand
 
 from apps.ai.models import StallDataSet
 from apps.main.models import Bazaar
-from smartbozor.storages import stall_training_storage
 
 
 class Command(BaseCommand):
@@ -38,23 +35,14 @@ class Command(BaseCommand):
                 if not row.camera.roi:
                     continue
 
-                occupied = {ab["id"]: ab["is_occupied"] for ab in row.data}
-
                 from_path = row.image.path
-                out_dir_tpl = stall_training_storage.path(os.path.join("train", "{0}", os.path.dirname(row.image.name)))
-                file_prefix = Path(os.path.basename(from_path)).stem
-
-                roi_data = []
-                for roi in row.camera.roi:
-                    if roi["type"] != 0:
-                        continue
+                out_dir_tpl = row.training_dir_tpl
+                file_prefix = row.training_file_prefix
 
-                    is_occupied = occupied.get(roi["id"], False)
-                    roi_data.append({
-                        "id": roi["id"],
-                        "to": os.path.join(out_dir_tpl.format("band" if is_occupied else "bosh"), file_prefix + "-" + roi["id"] + "-" + str(len(roi_data)) + ".jpg"),
-                        "points": roi["points"],
-                    })
+                roi_data = [
+                    {"id": crop["id"], "to": crop["to"], "points": crop["points"]}
+                    for crop in row.training_crops(row.camera.roi)
+                ]
 
                 ai_gen_data.append({
                     "src": from_path,
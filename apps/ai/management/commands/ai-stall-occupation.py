@@ -8,6 +8,7 @@ from django.utils import timezone
 
 from apps.ai.models import StallOccupation
 from apps.camera.models import Camera
+from apps.main import workdays
 from apps.main.models import Bazaar
 from apps.stall.models import StallStatus, Stall
 
@@ -49,9 +50,12 @@ class Command(BaseCommand):
         today_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
         today_end = today_start + timedelta(days=1)
 
-        for bazaar in Bazaar.objects.order_by('id').all():
+        bazaars = list(Bazaar.objects.order_by('id').all())
+        working = {bazaar.id for bazaar in workdays.working_today(bazaars)}
+
+        for bazaar in bazaars:
             print("Checking ", str(bazaar), "...")
-            if not bazaar.is_working_day:
+            if bazaar.id not in working:
                 print("\tish kuni emas")
                 continue
 
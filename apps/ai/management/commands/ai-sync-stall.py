@@ -9,13 +9,82 @@ from django.core.management import BaseCommand
 from django.utils import timezone
 
 from apps.ai.models import StallDataSet
+from apps.ai.phash import FrameIndex, decode_hashes, encode_hashes, roi_hashes
 from apps.camera.models import Camera
 from apps.main.models import Bazaar
 
 
+DEDUP_OFF = "off"
+DEDUP_SKIP = "skip"
+DEDUP_LABEL = "label"
+
+LABELLED_STATUS = (StallDataSet.STATUS_MARKED_MODERATED, StallDataSet.STATUS_GENERATED)
+
+
 class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dedup",
+            choices=[DEDUP_OFF, DEDUP_SKIP, DEDUP_LABEL],
+            default=DEDUP_SKIP,
+            help="Belgilangan (MARKED_MODERATED, GENERATED) kadrga deyarli bir xil kadrlar: "
+                 "skip - DUPLICATE deb belgilash, label - o'sha kadr ma'lumotini nusxalab MARKED qilish",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=int,
+            default=6,
+            help="ROI dHash uchun Hamming masofasi chegarasi (64 bitdan, default: 6)",
+        )
+
+    def backfill_hashes(self, data_dir, bazaar_id, snapshot_after, cameras):
+        """Hashi yo'q belgilangan kadrlar (dedup qo'shilishidan oldingilar) uchun phash"""
+        roi_by_camera = {cam.id: cam.roi for cam in cameras}
+        qs = StallDataSet.objects.filter(
+            bazaar_id=bazaar_id,
+            snapshot_at__gte=snapshot_after,
+            status__in=LABELLED_STATUS,
+            phash__isnull=True,
+        ).only('id', 'camera_id', 'image')
+
+        batch, n = [], 0
+        for row in qs.iterator(chunk_size=500):
+            hashes = roi_hashes(os.path.join(data_dir, row.image.name), roi_by_camera.get(row.camera_id))
+            if not hashes:
+                continue
+
+            row.phash = encode_hashes(hashes)
+            batch.append(row)
+            if len(batch) >= 500:
+                StallDataSet.objects.bulk_update(batch, ['phash'])
+                n += len(batch)
+                batch = []
+
+        if batch:
+            StallDataSet.objects.bulk_update(batch, ['phash'])
+            n += len(batch)
+
+        return n
+
+    def build_index(self, bazaar_id, snapshot_after, threshold):
+        indexes, statuses = dict(), dict()
+        qs = StallDataSet.objects.filter(
+            bazaar_id=bazaar_id,
+            snapshot_at__gte=snapshot_after,
+            phash__isnull=False,
+            status__in=LABELLED_STATUS,
+        ).values_list('id', 'camera_id', 'status', 'phash')
+
+        for frame_id, camera_id, status, phash in qs.iterator(chunk_size=2000):
+            index = indexes.setdefault(camera_id, FrameIndex(threshold))
+            index.add(decode_hashes(phash), frame_id)
+            statuses[frame_id] = status
+
+        return indexes, statuses
+
     def handle(self, *args, **options):
         data_dir = settings.STALL_DATASET_DIR
+        dedup, threshold = options["dedup"], options["threshold"]
 
         snapshot_after = StallDataSet.get_snapshot_after()
 
@@ -30,6 +99,14 @@ class Command(BaseCommand):
                 cam_hash = hashlib.md5(str(cam.device_sn).encode('utf-8')).hexdigest().lower()
                 camera_by_hash[cam_hash] = cam
 
+            indexes, statuses = dict(), dict()
+            if dedup != DEDUP_OFF:
+                hashed = self.backfill_hashes(data_dir, bazaar.id, snapshot_after, cameras)
+                if hashed:
+                    print("\t hashed labelled:", hashed)
+                indexes, statuses = self.build_index(bazaar.id, snapshot_after, threshold)
+            duplicates = 0
+
             path_bazaar = os.path.join(data_dir, str(bazaar.id))
             for day in days:
                 path_year = os.path.join(path_bazaar, str(day.year))
@@ -67,20 +144,50 @@ class Command(BaseCommand):
                             if cam_hash not in camera_by_hash:
                                 continue
 
-                            # roi = camera_by_hash[cam_hash].roi
-                            # if not roi or len(roi) == 0:
-                            #     continue
-
-                            data_set.append(StallDataSet(
+                            camera = camera_by_hash[cam_hash]
+                            row = StallDataSet(
                                 bazaar_id=bazaar.id,
-                                camera_id=camera_by_hash[cam_hash].id,
+                                camera_id=camera.id,
                                 image=image,
                                 status=StallDataSet.STATUS_NEW,
                                 snapshot_at=snapshot_at,
-                            ))
+                            )
+
+                            if dedup != DEDUP_OFF:
+                                row.phash = encode_hashes(roi_hashes(os.path.join(data_dir, image), camera.roi))
+                                if row.phash:
+                                    self.check_duplicate(row, decode_hashes(row.phash), indexes, statuses, dedup,
+                                                         threshold)
+                                    if row.status != StallDataSet.STATUS_NEW:
+                                        duplicates += 1
+
+                            data_set.append(row)
 
                     if data_set:
                         StallDataSet.objects.bulk_create(data_set)
 
                     images = images[20:]
 
+            if dedup != DEDUP_OFF:
+                print("\t duplicates:", duplicates)
+
+    def check_duplicate(self, row, hashes, indexes, statuses, dedup, threshold):
+        index = indexes.setdefault(row.camera_id, FrameIndex(threshold))
+        matches = index.match(hashes)
+        if not matches:
+            return
+
+        # Faqat belgilangan kadrga o'xshashlari: NEW kadr keyin WRONG bo'lishi mumkin, unga o'xshashlar yo'qolmasin
+        labelled = sorted(m for m in matches if statuses.get(m) in LABELLED_STATUS)
+        if not labelled:
+            return
+
+        if dedup == DEDUP_LABEL:
+            source = StallDataSet.objects.filter(id=labelled[-1]).values_list('data', flat=True).first()
+            if source:
+                row.data = source
+                row.status = StallDataSet.STATUS_MARKED
+                return
+
+        row.status = StallDataSet.STATUS_DUPLICATE
+
@@ -8,9 +8,10 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from django.core.management import BaseCommand
 
 from apps.ai.models import StallDataSet
+from smartbozor.mixins import ReadReplicaCommandMixin
 
 
-class Command(BaseCommand):
+class Command(ReadReplicaCommandMixin, BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument(
             "--batch-size",
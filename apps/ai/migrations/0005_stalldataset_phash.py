@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0004_stalloccupation'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "ALTER TABLE ai_stalldataset ADD COLUMN phash JSONB DEFAULT NULL;",
+            reverse_sql="ALTER TABLE ai_stalldataset DROP COLUMN phash;",
+        ),
+        migrations.AddField(
+            model_name='stalldataset',
+            name='phash',
+            field=models.JSONField(blank=True, default=None, null=True, verbose_name='ROI dHash'),
+        ),
+    ]
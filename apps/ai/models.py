@@ -1,5 +1,7 @@
+import os
 import uuid
 from datetime import timedelta, datetime
+from pathlib import Path
 
 from django.db import models
 from django.utils import timezone
@@ -7,7 +9,7 @@ from django.utils.translation import gettext_lazy as _
 
 from apps.camera.models import Camera
 from apps.main.models import Bazaar
-from smartbozor.storages import stall_storage
+from smartbozor.storages import stall_storage, stall_training_storage
 
 
 class StallDataSet(models.Model):
@@ -16,6 +18,7 @@ class StallDataSet(models.Model):
     STATUS_MARKED_MODERATED = 2
     STATUS_GENERATED = 3
     STATUS_WRONG = -1
+    STATUS_DUPLICATE = -2
 
     bazaar = models.ForeignKey(Bazaar, on_delete=models.RESTRICT, verbose_name=_("Bozor"))
     camera = models.ForeignKey(Camera, on_delete=models.RESTRICT, verbose_name=_("Kamera"))
@@ -23,6 +26,7 @@ class StallDataSet(models.Model):
     data = models.JSONField(verbose_name="AI data")
     status = models.SmallIntegerField(default=STATUS_NEW, db_index=True)
     snapshot_at = models.DateTimeField(null=True, default=None, blank=True, verbose_name="Snapshot date")
+    phash = models.JSONField(null=True, default=None, blank=True, verbose_name="ROI dHash")
 
     @classmethod
     def get_snapshot_after(cls):
@@ -32,6 +36,37 @@ class StallDataSet(models.Model):
             datetime(snapshot_after_data.year, snapshot_after_data.month, snapshot_after_data.day)
         )
 
+    @property
+    def training_dir_tpl(self):
+        return stall_training_storage.path(os.path.join("train", "{0}", os.path.dirname(self.image.name)))
+
+    @property
+    def training_file_prefix(self):
+        return Path(os.path.basename(self.image.name)).stem
+
+    def training_crops(self, roi_list):
+        # ai-gen-stall yaratadigan kesimlar: train/{band|bosh}/<papka>/<nom>-<roi>-<n>.jpg
+        occupied = {ab["id"]: ab["is_occupied"] for ab in (self.data or [])}
+        out_dir_tpl, file_prefix = self.training_dir_tpl, self.training_file_prefix
+
+        crops = []
+        for roi in roi_list or []:
+            if roi["type"] != 0:
+                continue
+
+            is_occupied = occupied.get(roi["id"], False)
+            crops.append({
+                "id": roi["id"],
+                "is_occupied": is_occupied,
+                "to": os.path.join(
+                    out_dir_tpl.format("band" if is_occupied else "bosh"),
+                    file_prefix + "-" + roi["id"] + "-" + str(len(crops)) + ".jpg"
+                ),
+                "points": roi["points"],
+            })
+
+        return crops
+
     class Meta:
         managed = False
 
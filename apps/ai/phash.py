@@ -0,0 +1,121 @@
+import cv2
+import numpy as np
+
+HASH_SIZE = 8
+
+
+def dhash(gray):
+    small = cv2.resize(gray, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def roi_hashes(image_path, roi_list):
+    """Har bir rasta (type=0) ROI kesimi uchun dHash: {roi_id: int}"""
+    if not roi_list:
+        return None
+
+    gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return None
+
+    height, width = gray.shape
+    result = {}
+    for roi in roi_list:
+        if roi["type"] != 0:
+            continue
+
+        points = np.array([[p["x"], p["y"]] for p in roi["points"]], dtype=np.int32)
+        x, y, w, h = cv2.boundingRect(points)
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, width), min(y + h, height)
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            continue
+
+        result[roi["id"]] = dhash(gray[y0:y1, x0:x1])
+
+    return result or None
+
+
+def encode_hashes(hashes):
+    # JSON kalitlari baribir satr: bazadan o'qilgan va yangi hisoblangan hashlar bir xil kalitli bo'lsin
+    return {str(k): "%016x" % v for k, v in hashes.items()} if hashes else None
+
+
+def decode_hashes(data):
+    return {k: int(v, 16) for k, v in data.items()} if data else {}
+
+
+class BKTree:
+    def __init__(self):
+        # node: [hash, [value, ...], {distance: node}]
+        self.root = None
+
+    def add(self, h, value):
+        if self.root is None:
+            self.root = [h, [value], {}]
+            return
+
+        node = self.root
+        while True:
+            d = hamming(h, node[0])
+            if d == 0:
+                node[1].append(value)
+                return
+
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [h, [value], {}]
+                return
+
+            node = child
+
+    def search(self, h, threshold):
+        if self.root is None:
+            return []
+
+        found, stack = [], [self.root]
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= threshold:
+                found.extend(node[1])
+
+            for dist, child in node[2].items():
+                if d - threshold <= dist <= d + threshold:
+                    stack.append(child)
+
+        return found
+
+
+class FrameIndex:
+    """
+    Kamera bo'yicha kadrlar indeksi: har bir ROI uchun alohida BK-tree.
+    Kadr dublikat hisoblanadi, agar uning barcha ROI kesimlari bitta kadrga threshold ichida yaqin bo'lsa.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.trees = {}
+
+    def add(self, hashes, frame_id):
+        for roi_id, h in hashes.items():
+            self.trees.setdefault(roi_id, BKTree()).add(h, frame_id)
+
+    def match(self, hashes):
+        candidates = None
+        for roi_id, h in hashes.items():
+            tree = self.trees.get(roi_id)
+            if tree is None:
+                return set()
+
+            found = set(tree.search(h, self.threshold))
+            candidates = found if candidates is None else candidates & found
+            if not candidates:
+                return set()
+
+        return candidates or set()
@@ -1,3 +1,62 @@
-from django.test import TestCase
+import datetime
+import hashlib
+import os
+import shutil
+import tempfile
 
-# Create your tests here.
+import cv2
+import numpy as np
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.ai.models import StallDataSet
+from apps.camera.models import Camera
+from apps.main.models import Region, District, Bazaar
+
+ROI = [{"id": 1, "type": 0, "points": [{"x": 0, "y": 0}, {"x": 100, "y": 0}, {"x": 100, "y": 100}, {"x": 0, "y": 100}]}]
+
+
+class SyncStallDedupTest(TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+
+        region = Region.objects.create(name_uz="Toshkent")
+        district = District.objects.create(region=region, name_uz="Chilonzor")
+        self.bazaar = Bazaar.objects.create(district=district, name_uz="Bozor", slug="bozor")
+        self.camera = Camera.objects.create(bazaar=self.bazaar, device_sn="SN1", name="Camera 1", roi=ROI)
+
+        rng = np.random.default_rng(0)
+        self.frame = cv2.resize(rng.integers(0, 256, (8, 9)).astype(np.uint8), (160, 120))
+
+    def write_frame(self, at, brightness=0):
+        cam_hash = hashlib.md5(self.camera.device_sn.encode("utf-8")).hexdigest().lower()
+        local = timezone.localtime(at)
+        image = os.path.join(
+            str(self.bazaar.id), str(local.year), str(local.month).zfill(2), str(local.day).zfill(2),
+            cam_hash, local.strftime("%Y-%m-%d-%H-%M-%S") + ".jpg"
+        )
+        path = os.path.join(self.data_dir, image)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        cv2.imwrite(path, np.clip(self.frame.astype(np.int16) + brightness, 0, 255).astype(np.uint8))
+        return image
+
+    def test_near_duplicate_of_labelled_frame(self):
+        labelled_at = timezone.now() - datetime.timedelta(days=1)
+        labelled = StallDataSet.objects.create(
+            bazaar=self.bazaar,
+            camera=self.camera,
+            image=self.write_frame(labelled_at),
+            data=[{"id": 1, "is_occupied": True}],
+            status=StallDataSet.STATUS_MARKED_MODERATED,
+            snapshot_at=labelled_at,
+        )
+        image = self.write_frame(timezone.now() - datetime.timedelta(hours=1), brightness=2)
+
+        with override_settings(STALL_DATASET_DIR=self.data_dir):
+            call_command("ai-sync-stall")
+
+        labelled.refresh_from_db()
+        self.assertIsNotNone(labelled.phash)
+        self.assertEqual(StallDataSet.objects.get(image=image).status, StallDataSet.STATUS_DUPLICATE)
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 
+from apps.api.caching import invalidate_tokens
 from apps.api.models import DeviceToken
 
 
@@ -13,4 +14,6 @@ class DeviceTokenAdmin(admin.ModelAdmin):
 
     @admin.action(description=_("Qurilmani ochish"))
     def reset_lock(self, request, queryset):
+        keys = list(queryset.values_list("key", flat=True))
         queryset.update(pin_attempt=dict())
+        invalidate_tokens(keys)
@@ -1,9 +1,9 @@
 import datetime
 
-from django.utils import timezone
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 
+from .caching import get_token, touch
 from .models import DeviceToken
 
 
@@ -13,12 +13,12 @@ class DeviceTokenAuthentication(TokenAuthentication):
 
     def authenticate_credentials(self, key):
         try:
-            token = self.model.objects.select_related("user").get(key=key)
+            token = get_token(key)
         except self.model.DoesNotExist:
             raise AuthenticationFailed("invalid_token")
 
-        token.last_used = timezone.localtime()
-        token.save(update_fields=["last_used"])
+        # last_used Redis'da yig'iladi va flush_token_last_used orqali bazaga yoziladi
+        touch(key)
 
         if not token.user.is_active:
             raise AuthenticationFailed("user_inactive")
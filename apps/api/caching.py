@@ -0,0 +1,59 @@
+import datetime
+import pickle
+import time
+
+from django.db import transaction
+
+from apps.api.models import DeviceToken
+from smartbozor.redis import REDIS_CLIENT
+
+TOKEN_CACHE_KEY = "api:device_token:{0}"
+TOKEN_CACHE_TTL = 60
+LAST_USED_KEY = "api:device_token:last_used"
+
+
+def get_token(key):
+    """DeviceToken (user bilan). Yo'q bo'lsa DeviceToken.DoesNotExist"""
+    raw = REDIS_CLIENT.get(TOKEN_CACHE_KEY.format(key))
+    if raw is not None:
+        return pickle.loads(raw)
+
+    token = DeviceToken.objects.select_related("user").get(key=key)
+    REDIS_CLIENT.set(TOKEN_CACHE_KEY.format(key), pickle.dumps(token), ex=TOKEN_CACHE_TTL)
+    return token
+
+
+def invalidate_tokens(keys):
+    keys = [TOKEN_CACHE_KEY.format(key) for key in keys]
+    if not keys:
+        return
+
+    REDIS_CLIENT.delete(*keys)
+    # Tranzaksiya tugaguncha boshqa so'rov eski qiymatni qayta keshlab qo'yishi mumkin
+    transaction.on_commit(lambda: REDIS_CLIENT.delete(*keys))
+
+
+def invalidate_user_tokens(user_id):
+    invalidate_tokens(list(DeviceToken.objects.filter(user_id=user_id).values_list("key", flat=True)))
+
+
+def touch(key):
+    REDIS_CLIENT.hset(LAST_USED_KEY, key, int(time.time()))
+
+
+def flush_last_used():
+    """Redis'dagi last_used qiymatlarini bitta bulk UPDATE bilan bazaga yozish"""
+    pipe = REDIS_CLIENT.pipeline()
+    pipe.hgetall(LAST_USED_KEY)
+    pipe.delete(LAST_USED_KEY)
+    data, __ = pipe.execute()
+    if not data:
+        return 0
+
+    tokens = [
+        DeviceToken(key=key.decode(), last_used=datetime.datetime.fromtimestamp(int(ts), tz=datetime.timezone.utc))
+        for key, ts in data.items()
+    ]
+    # O'chirilgan tokenlar uchun UPDATE shunchaki hech narsa qilmaydi
+    DeviceToken.objects.bulk_update(tokens, ["last_used"], batch_size=500)
+    return len(tokens)
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.api.caching import invalidate_tokens, invalidate_user_tokens
+from apps.api.models import DeviceToken
+
+
+@receiver(post_save, sender=DeviceToken)
+def device_token_saved(sender, instance, **kwargs):
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_delete, sender=DeviceToken)
+def device_token_deleted(sender, instance, **kwargs):
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, created, **kwargs):
+    # is_active va boshqa maydonlar keshlangan token.user ichida
+    if not created:
+        invalidate_user_tokens(instance.pk)
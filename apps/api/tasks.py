@@ -1,5 +1,6 @@
 from django.db import transaction
 
+from apps.api.caching import flush_last_used
 from apps.stall.models import Stall, StallStatus
 from smartbozor.celery import app
 
@@ -20,3 +21,7 @@ def stall_reset_payment_progress(stall_id, stall_status_id):
             ss.payment_progress = 0
             ss.save()
 
+
+@app.task()
+def flush_token_last_used():
+    flush_last_used()
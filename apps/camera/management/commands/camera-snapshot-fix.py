@@ -4,6 +4,7 @@ from django.conf import settings
 from django.core.management import BaseCommand
 
 from apps.camera.models import Camera
+from apps.camera.tasks import generate_screenshot_variants
 from apps.main.models import Bazaar
 
 
@@ -20,4 +21,8 @@ class Command(BaseCommand):
                 if os.path.exists(file_path) and os.path.getsize(file_path) < 1000 and cam.screenshot:
                     print("Fixed:", cam.id)
                     cam.screenshot = None
+                    cam.screenshot_hash = None
                     cam.save()
+                elif cam.screenshot and not cam.screenshot_hash:
+                    print("Variants:", cam.id)
+                    generate_screenshot_variants.delay(cam.id)
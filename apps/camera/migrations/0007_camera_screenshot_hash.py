@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0006_camera_use_ai'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='camera',
+            name='screenshot_hash',
+            field=models.CharField(blank=True, default=None, editable=False, max_length=16, null=True),
+        ),
+    ]
@@ -28,6 +28,20 @@ class Camera(models.Model):
     is_active = models.BooleanField(default=True, verbose_name=_("Active"))
     is_online = models.BooleanField(default=False, verbose_name=_("Online"), editable=False)
     use_ai = models.BooleanField(default=False, verbose_name=_("Use AI"))
+    screenshot_hash = models.CharField(max_length=16, null=True, blank=True, default=None, editable=False)
+
+    VARIANTS_DIR = "camera/thumb"
+
+    @classmethod
+    def screenshot_variant_name(cls, bazaar_id, camera_id, digest, kind, ext):
+        return os.path.join(cls.VARIANTS_DIR, str(bazaar_id), f"{camera_id}-{kind}-{digest}.{ext}")
+
+    def screenshot_variant_url(self, kind, ext="webp"):
+        if not self.screenshot or not self.screenshot_hash:
+            return None
+
+        name = self.screenshot_variant_name(self.bazaar_id, self.id, self.screenshot_hash, kind, ext)
+        return settings.MEDIA_URL + name
 
     @cached_property
     def total_info(self):
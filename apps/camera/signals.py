@@ -7,7 +7,7 @@ from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 
 from apps.camera.models import Camera
-from apps.camera.tasks import update_camera_info, run_update_camera_info
+from apps.camera.tasks import run_update_camera_info
 
 
 @receiver(pre_save, sender=Camera)
@@ -41,5 +41,5 @@ def after_camera_saved(instance, **kwargs):
 
     fields = {'username', 'password', 'roi', 'camera_port', 'use_ai'}
     if fields & set(changed.keys()):
-        run_update_camera_info(instance.pk)
+        run_update_camera_info(instance.bazaar_id, instance.pk)
 
@@ -1,7 +1,7 @@
 import datetime
-import json
 import os
 from contextlib import ExitStack
+from functools import partial
 
 import requests
 from django.conf import settings
@@ -15,7 +15,10 @@ from smartbozor.celery import app
 from smartbozor.redis import REDIS_CLIENT
 
 ACCESS_TOKEN = os.environ.get("CONTROL_ACCESS_TOKEN")
-CAMERA_INFO_KEY = "camera_task:{}"
+CAMERA_DIRTY_KEY = "bazaar_camera_dirty:{}"
+CAMERA_PUSH_KEY = "bazaar_camera_push:{}"
+CAMERA_PUSH_DEBOUNCE = 5
+CAMERA_PUSH_TIMEOUT = 7 * 24 * 3600
 BAZAAR_SNAPSHOT_UPDATE_KEY = "bazaar_snapshot_update:{}"
 
 
@@ -32,73 +35,116 @@ def calc_countdown():
     return countdown
 
 
-def run_update_camera_info(camera_id):
-    res = update_camera_info.apply_async(kwargs={'camera_id': camera_id})
+def run_update_camera_info(bazaar_id, *camera_ids):
+    if not camera_ids:
+        return False
+
+    # Tranzaksiya bekor qilinsa kalit qolib ketib, keyingi o'zgarishlarni ~10 daqiqa to'sib qo'ymasin
+    transaction.on_commit(partial(_schedule_push, bazaar_id, camera_ids))
+
+    return True
+
+
+def _schedule_push(bazaar_id, camera_ids):
+    dirty_key = CAMERA_DIRTY_KEY.format(bazaar_id)
+    REDIS_CLIENT.sadd(dirty_key, *camera_ids)
+    REDIS_CLIENT.expire(dirty_key, CAMERA_PUSH_TIMEOUT)
+
+    # Bazaar uchun bitta kechiktirilgan task, rejalashtirilgan bo'lsa kameralar faqat to'plamga qo'shiladi
+    push_key = CAMERA_PUSH_KEY.format(bazaar_id)
+    if REDIS_CLIENT.set(push_key, "-", nx=True, ex=CAMERA_PUSH_DEBOUNCE + 600):
+        push_cameras_info.apply_async(
+            kwargs={'bazaar_id': bazaar_id},
+            countdown=CAMERA_PUSH_DEBOUNCE,
+        )
 
-    key = CAMERA_INFO_KEY.format(camera_id)
-    old_task_id = REDIS_CLIENT.getset(key, res.id)
 
-    if old_task_id and old_task_id.decode() != res.id:
-        app.control.revoke(old_task_id.decode(), terminate=True)
+def camera_device_info(camera):
+    rois = []
+    if isinstance(camera.roi, list):
+        rois = camera.roi
 
-    REDIS_CLIENT.expire(key, 7 * 24 * 3600)
-    return res
+    return {
+        "ip": camera.camera_ip,
+        "port": camera.camera_port,
+        "username": camera.username,
+        "password": camera.password,
+        "stream_port": camera.camera_port,
+        "rois": rois,
+        "use_ai": camera.use_ai,
+    }
 
 
 @app.task(bind=True, ignore_result=True, max_retries=None)
-def update_camera_info(self, camera_id, started_at=None):
+def push_cameras_info(self, bazaar_id, started_at=None):
     now = int(datetime.datetime.now(datetime.timezone.utc).timestamp())
 
     if started_at is None:
         started_at = now
 
-    if now - started_at > 7 * 24 * 3600:
-        print(f"{camera_id}: timeout")
+    dirty_key, push_key = CAMERA_DIRTY_KEY.format(bazaar_id), CAMERA_PUSH_KEY.format(bazaar_id)
+
+    if now - started_at > CAMERA_PUSH_TIMEOUT:
+        print(f"bazaar[{bazaar_id}]: timeout")
+        REDIS_CLIENT.delete(dirty_key, push_key)
         return
 
-    try:
-        camera = Camera.objects.get(pk=camera_id)
-
-        if camera.device_sn and camera.bazaar.server_ip and camera.bazaar.server_user and camera.bazaar.app_version != '-':
-            print(f"update: cam={camera.id}")
-            rois = []
-            if isinstance(camera.roi, list):
-                rois = camera.roi
-
-            data = {
-                camera.device_sn: {
-                    "ip": camera.camera_ip,
-                    "port": camera.camera_port,
-                    "username": camera.username,
-                    "password": camera.password,
-                    "stream_port": camera.camera_port,
-                    "rois": rois,
-                    "use_ai": camera.use_ai,
-                }
-            }
-
-            url = f"http://{camera.bazaar.server_ip}:1984/api/update-devices"
-            print(f"\tpost: {url}")
-            print(f"\tdata: {json.dumps(data)}")
-
-            resp = requests.post(url, json=data, headers={
-                "Authorization": f"Bearer {ACCESS_TOKEN}"
-            }, timeout=15)
+    # Shu paytdan keyingi o'zgarishlar yangi task rejalashtiradi
+    REDIS_CLIENT.delete(push_key)
+    pipe = REDIS_CLIENT.pipeline()
+    pipe.smembers(dirty_key)
+    pipe.delete(dirty_key)
+    camera_ids = sorted(int(v) for v in pipe.execute()[0])
+    if not camera_ids:
+        return
 
-            if resp.status_code == 200:
-                print(f"\t{resp.text}")
-            else:
-                print(f"\tstatus={resp.status_code}")
-    except Camera.DoesNotExist:
-        print(f"\tcamera not found")
+    try:
+        bazaar = Bazaar.objects.get(pk=bazaar_id)
+        if not bazaar.server_ip or not bazaar.server_user or bazaar.app_version == '-':
+            return
+
+        data = {
+            camera.device_sn: camera_device_info(camera)
+            for camera in Camera.objects.filter(bazaar_id=bazaar_id, id__in=camera_ids).order_by('id')
+            if camera.device_sn
+        }
+        if not data:
+            return
+
+        url = f"http://{bazaar.server_ip}:1984/api/update-devices"
+        print(f"update: bazaar={bazaar_id} cameras={len(data)}")
+        print(f"\tpost: {url}")
+
+        resp = requests.post(url, json=data, headers={
+            "Authorization": f"Bearer {ACCESS_TOKEN}"
+        }, timeout=15 + len(data) // 10)
+
+        if resp.status_code == 200:
+            print(f"\t{resp.text}")
+        else:
+            print(f"\tstatus={resp.status_code}")
+    except Bazaar.DoesNotExist:
+        print(f"\tbazaar not found")
     except Exception as e:
         print(f"\terror={e}")
-        raise self.retry(exc=e, countdown=calc_countdown(), kwargs={
-            'camera_id': camera_id,
+        countdown = calc_countdown()
+        REDIS_CLIENT.sadd(dirty_key, *camera_ids)
+        REDIS_CLIENT.expire(dirty_key, CAMERA_PUSH_TIMEOUT)
+        REDIS_CLIENT.set(push_key, self.request.id or "-", ex=countdown + 600)
+        raise self.retry(exc=e, countdown=countdown, kwargs={
+            'bazaar_id': bazaar_id,
             'started_at': started_at,
         })
 
 
+@app.task(ignore_result=True)
+def update_camera_info(camera_id, started_at=None):
+    # Navbatda qolgan eski tasklar uchun: bazaar push'iga qo'shiladi
+    bazaar_id = Camera.objects.filter(pk=camera_id).values_list('bazaar_id', flat=True).first()
+    if bazaar_id:
+        run_update_camera_info(bazaar_id, camera_id)
+
+
 def run_sync_cameras(bazaar_id, force_update=False):
     key = BAZAAR_SNAPSHOT_UPDATE_KEY.format(bazaar_id)
     result = REDIS_CLIENT.set(key, "-", nx=True, ex=3600)
@@ -212,8 +258,7 @@ def sync_cameras(bazaar_id, force_update=False, clear_redis_key=False):
                         cam.is_online = False
 
             print(f"Update camera count: {len(update_cameras)}")
-            for cam_id in update_cameras.values():
-                run_update_camera_info(cam_id)
+            run_update_camera_info(bazaar.id, *update_cameras.values())
 
             for cam in camera_set:
                 snapshot_url = f"{host}/api/snapshot/{cam.device_sn}"
@@ -222,6 +267,35 @@ def sync_cameras(bazaar_id, force_update=False, clear_redis_key=False):
                 save_screenshot(cam, snapshot_url, force_update)
                 cam.save()
 
+                # Faqat rasm o'zgargan bo'lsa (har sinxronlashda har kamera uchun task emas)
+                if cam.screenshot and screenshot_changed(cam):
+                    transaction.on_commit(partial(generate_screenshot_variants.delay, cam.id))
+
+
+def screenshot_changed(cam):
+    from apps.camera.thumbnails import file_digest
+
+    path = os.path.join(settings.MEDIA_ROOT, cam.screenshot.name)
+    return os.path.exists(path) and file_digest(path) != cam.screenshot_hash
+
+
+@app.task(ignore_result=True)
+def generate_screenshot_variants(camera_id):
+    from apps.camera.thumbnails import make_screenshot_variants
+
+    camera = Camera.objects.filter(pk=camera_id).first()
+    if camera is None:
+        return
+
+    try:
+        digest = make_screenshot_variants(camera)
+    except Exception as e:
+        print(f"{camera_id}: variants error={e}")
+        return
+
+    if digest != camera.screenshot_hash:
+        Camera.objects.filter(pk=camera_id).update(screenshot_hash=digest)
+
 
 def save_screenshot(cam, snapshot_url, force_update):
     if not cam.device_sn:
@@ -0,0 +1,65 @@
+import glob
+import hashlib
+import os
+
+from django.conf import settings
+
+from apps.camera.models import Camera
+
+# kind -> (max o'lcham, formatlar)
+VARIANTS = {
+    "thumb": ((480, 270), ("webp", "jpg")),
+    "preview": ((1280, 720), ("webp",)),
+}
+
+
+def file_digest(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def remove_variants(bazaar_id, camera_id, keep=None):
+    pattern = os.path.join(settings.MEDIA_ROOT, Camera.VARIANTS_DIR, str(bazaar_id), f"{camera_id}-*")
+    for path in glob.glob(pattern):
+        if keep is None or f"-{keep}." not in os.path.basename(path):
+            os.remove(path)
+
+
+def make_screenshot_variants(camera):
+    from PIL import Image
+
+    if not camera.screenshot:
+        return None
+
+    src = os.path.join(settings.MEDIA_ROOT, camera.screenshot.name)
+    if not os.path.exists(src):
+        return None
+
+    digest = file_digest(src)
+    with Image.open(src) as img:
+        img = img.convert("RGB")
+        for kind, (size, formats) in VARIANTS.items():
+            variant = None
+            for ext in formats:
+                name = Camera.screenshot_variant_name(camera.bazaar_id, camera.id, digest, kind, ext)
+                path = os.path.join(settings.MEDIA_ROOT, name)
+                if os.path.exists(path):
+                    continue
+
+                if variant is None:
+                    variant = img.copy()
+                    variant.thumbnail(size, Image.LANCZOS)
+
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = path + ".tmp"
+                if ext == "webp":
+                    variant.save(tmp_path, "WEBP", quality=75, method=4)
+                else:
+                    variant.save(tmp_path, "JPEG", quality=80, optimize=True, progressive=True)
+                os.replace(tmp_path, path)
+
+    remove_variants(camera.bazaar_id, camera.id, keep=digest)
+    return digest
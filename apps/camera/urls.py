@@ -1,7 +1,7 @@
 from django.urls import path
 
 from apps.camera.views import CameraBazaarChoiceView, CameraListView, CameraPreview, CameraRoiEditView, \
-    CameraVerifyView, CameraAiPreview
+    CameraVerifyView, CameraAiPreview, CameraAiSnapshotView
 
 app_name = 'camera'
 urlpatterns = [
@@ -10,5 +10,6 @@ urlpatterns = [
     path("verify/", CameraVerifyView.as_view(), name="verify"),
     path("preview/<int:pk>/", CameraPreview.as_view(), name="preview"),
     path("preview-ai/<int:pk>/", CameraAiPreview.as_view(), name="preview-ai"),
+    path("preview-ai/<int:pk>/image/", CameraAiSnapshotView.as_view(), name="preview-ai-image"),
     path("roi/<int:pk>/", CameraRoiEditView.as_view(), name="roi"),
 ]
\ No newline at end of file
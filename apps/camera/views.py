@@ -3,7 +3,6 @@ import os
 from os import remove, removedirs
 from urllib.parse import urlparse, parse_qs
 
-import requests
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
@@ -17,8 +16,11 @@ from django.views.generic import TemplateView, ListView, DetailView
 from apps.camera.models import Camera
 from apps.camera.serializers import CameraRoiSerializer
 from apps.camera.tasks import BAZAAR_SNAPSHOT_UPDATE_KEY, run_sync_cameras
+from apps.camera.thumbnails import remove_variants
 from apps.main.models import Bazaar
+from smartbozor.edge import edge_fetch
 from smartbozor.helpers import to_int
+from smartbozor.mixins import AsyncPermissionRequiredMixin
 from smartbozor.redis import REDIS_CLIENT
 from smartbozor.security import camera_signer
 
@@ -83,7 +85,9 @@ class CameraListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
                     if cam.screenshot:
                         cam.screenshot.delete()
                         cam.screenshot = None
+                        cam.screenshot_hash = None
                         cam.save()
+                        remove_variants(cam.bazaar_id, cam.id)
                         messages.success(self.request, _("Screenshot muvaffaqiyatli o'chirildi."))
                 finally:
                     pass
@@ -162,24 +166,6 @@ class CameraAiPreview(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
     template_name = 'camera/preview-ai.j2'
     permission_required = "camera.view_camera"
 
-    def render_to_response(self, context, **response_kwargs):
-        if self.request.GET.get("image", "false").lower() == "true":
-            camera = self.object # type: Camera
-            access_token = os.environ.get("CONTROL_ACCESS_TOKEN")
-            try:
-                snapshot_url = f"http://{camera.bazaar.server_ip}:1984/api/ai/snapshot/{camera.device_sn}"
-                response = requests.get(snapshot_url, headers={
-                    "Authorization": f"Bearer {access_token}"
-                }, timeout=10)
-                response.raise_for_status()
-
-                content_type = response.headers.get("Content-Type", "image/jpeg")
-                return HttpResponse(response.content, content_type=content_type)
-            except Exception as e:
-                raise e
-
-        return super().render_to_response(context, **response_kwargs)
-
     def get_queryset(self):
         return super().get_queryset().filter(is_active=True)
 
@@ -190,6 +176,31 @@ class CameraAiPreview(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
         return context
 
 
+class CameraAiSnapshotView(AsyncPermissionRequiredMixin, View):
+    permission_required = "camera.view_camera"
+
+    # Bir kamerani bir necha operator ko'rsa ham edge serverga soniyada bitta so'rov boradi
+    CACHE_TTL = 1.0
+
+    async def get(self, request, pk):
+        camera = await Camera.objects.select_related("bazaar").filter(pk=pk, is_active=True).afirst()
+        if camera is None:
+            raise Http404
+
+        try:
+            resp = await edge_fetch(
+                camera.bazaar.server_ip,
+                f"/api/ai/snapshot/{camera.device_sn}",
+                ttl=self.CACHE_TTL,
+            )
+        except Exception as e:
+            return HttpResponse(str(e), status=502)
+
+        response = HttpResponse(resp.content, content_type=resp.content_type or "image/jpeg")
+        response["Cache-Control"] = "no-store"
+        return response
+
+
 class CameraRoiEditView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
     model = Camera
     permission_required = "camera.change_camera"
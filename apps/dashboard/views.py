@@ -8,12 +8,16 @@ from django.utils.translation import gettext_lazy as _
 from django.views.generic import TemplateView
 
 from apps.dashboard.filters import MonthFilter
+from apps.main import workdays
 from apps.main.models import Bazaar
+from apps.restroom import ingest as restroom_ingest
+from apps.restroom.models import Restroom, RestroomDaily
 from apps.stall.models import Stall, StallStatus
-from smartbozor.mixins import NormalizeDataMixin
+from smartbozor.fanout import fanout
+from smartbozor.mixins import NormalizeDataMixin, ReadReplicaMixin
 
 
-class DashboardIndexView(NormalizeDataMixin, LoginRequiredMixin, TemplateView):
+class DashboardIndexView(NormalizeDataMixin, LoginRequiredMixin, ReadReplicaMixin, TemplateView):
     template_name = 'dashboard/index.j2'
 
     def get(self, request, pk=0, *args, **kwargs):
@@ -47,20 +51,40 @@ class DashboardIndexView(NormalizeDataMixin, LoginRequiredMixin, TemplateView):
 
         bazaars_id = [row.id for row in bazaars]
 
-        stall_count_by_bazaar = {row["bazaar_id"]: row["total"] for row in Stall.objects.filter(
-            section__area__bazaar_id__in=bazaars_id
-        ).values(bazaar_id=F("section__area__bazaar_id")).annotate(
-            total=Count("id")
-        ).values("bazaar_id", "total")}
+        rows = fanout({
+            "stall_count": Stall.objects.filter(
+                section__area__bazaar_id__in=bazaars_id
+            ).values(bazaar_id=F("section__area__bazaar_id")).annotate(
+                total=Count("id")
+            ).values("bazaar_id", "total"),
+            "stall_paid": MonthFilter(data, queryset=StallStatus.objects.filter(
+                stall__section__area__bazaar_id__in=bazaars_id
+            )).qs.filter(is_paid=True).values("date", "payment_method").annotate(
+                total=Coalesce(Sum("price"), 0)
+            ).values("date", "payment_method", "total"),
+            "stall_occupied": MonthFilter(data, queryset=StallStatus.objects.filter(
+                is_occupied=True,
+                stall__section__area__bazaar_id__in=bazaars_id
+            )).qs.values("date").annotate(
+                n=Count("id")
+            ).values_list("date", "n"),
+            "restroom_ids": Restroom.objects.filter(
+                bazaar_id__in=bazaars_id
+            ).values_list("id", flat=True),
+            "restroom_paid": MonthFilter(data, queryset=RestroomDaily.objects.filter(
+                restroom__bazaar_id__in=bazaars_id
+            )).qs.values("payment_method").annotate(
+                total=Coalesce(Sum("amount"), 0),
+                n=Coalesce(Sum("count"), 0),
+            ).values("payment_method", "total", "n"),
+        })
+
+        stall_count_by_bazaar = {row["bazaar_id"]: row["total"] for row in rows["stall_count"]}
 
         md = calendar.monthrange(selected_month.year, selected_month.month)[1]
 
         stall_total_by_data, stall_total_by_payment_method = {}, {}
-        for row in MonthFilter(data, queryset=StallStatus.objects.filter(
-                stall__section__area__bazaar_id__in=bazaars_id
-        )).qs.filter(is_paid=True).values("date", "payment_method").annotate(
-            total=Coalesce(Sum("price"), 0)
-        ).values("date", "payment_method", "total"):
+        for row in rows["stall_paid"]:
 
             pm = row["payment_method"]
             stall_total_by_payment_method[pm] = stall_total_by_payment_method.get(pm, 0) + row["total"]
@@ -82,7 +106,7 @@ class DashboardIndexView(NormalizeDataMixin, LoginRequiredMixin, TemplateView):
                     (_("Rastlar"), _("{0} ta").format(sum(stall_count_by_bazaar.values()))),
                     (_("Do'konlar"), _("{0} ta").format(0)),
                     (_("Avtoturargohlar"), _("{0} ta").format(0)),
-                    (_("Xojatxonalar"), _("{0} ta").format(0)),
+                    (_("Xojatxonalar"), _("{0} ta").format(len(rows["restroom_ids"]))),
                     (_("Daromad"), _("{0} so'm").format(
                         intcomma(sum(stall_total_by_payment_method.values()))
                     ))
@@ -109,24 +133,11 @@ class DashboardIndexView(NormalizeDataMixin, LoginRequiredMixin, TemplateView):
                 "data": [0] * md,
             })
 
-        total_month_stalls, stall_total_by_day = 0, [0] * md
-        for day_n in range(1, md + 1):
-            day = selected_month.replace(day=day_n)
-            for bazaar in bazaars:  # type: Bazaar
-                if bazaar.check_working_day(day):
-                    sc = stall_count_by_bazaar.get(bazaar.id, 0)
-                    stall_total_by_day[day_n - 1] += sc
-                    total_month_stalls += sc
-
-        stall_occupied_qs = MonthFilter(data, queryset=StallStatus.objects.filter(
-            is_occupied=True,
-            stall__section__area__bazaar_id__in=bazaars_id
-        )).qs.values("date").annotate(
-            n=Count("id")
-        ).values_list("date", "n")
+        stall_total_by_day = workdays.working_total_by_day(bazaars, stall_count_by_bazaar, selected_month)
+        total_month_stalls = sum(stall_total_by_day)
 
         stall_occupied, stall_occupied_by_day = 0, [0] * md
-        for (so_date, so_n) in sorted(stall_occupied_qs):
+        for (so_date, so_n) in sorted(rows["stall_occupied"]):
             if stall_total_by_day[so_date.day - 1] > 0:
                 stall_occupied_by_day[so_date.day - 1] += so_n
                 stall_occupied += so_n
@@ -179,4 +190,26 @@ class DashboardIndexView(NormalizeDataMixin, LoginRequiredMixin, TemplateView):
             ]
         ))
 
+        # Hojatxonalar: oy RestroomDaily'dan, bugun jonli Redis hisoblagichlaridan
+        if rows["restroom_ids"]:
+            restroom_live = restroom_ingest.live(rows["restroom_ids"]).values()
+            restroom_by_payment_method = {row["payment_method"]: row["total"] for row in rows["restroom_paid"]}
+
+            sections.append((
+                _("Hojatxonalar bo'yicha"),
+                "bi bi-door-open", [
+                    (_("Hozir ichkarida"), _("{0} ta").format(sum(row["inside"] for row in restroom_live))),
+                    (_("Bugun kirishlar"), _("{0} ta").format(sum(row["enter"] for row in restroom_live))),
+                    (_("Bugungi daromad"), _("{0} so'm").format(
+                        intcomma(sum(row["revenue"] for row in restroom_live))
+                    )),
+                    (_("Kirishlar"), _("{0} ta").format(sum(row["n"] for row in rows["restroom_paid"]))),
+                    (_("Daromad"), _("{0} so'm").format(intcomma(sum(restroom_by_payment_method.values())))),
+                ] + [
+                    (Bazaar.PAYMENT_METHOD_DICT.get(pm), _("{0} so'm").format(
+                        intcomma(val)
+                    )) for pm, val in sorted(restroom_by_payment_method.items())
+                ]
+            ))
+
         context["sections"] = sections
@@ -1,6 +1,9 @@
+import os
+
 from django.conf import settings
 from django.contrib import admin
 from django.template.context_processors import request
+from django.urls import reverse
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 
@@ -51,14 +54,15 @@ class BazaarAdmin(admin.ModelAdmin):
     def get_qr_codes_link(self, obj):
         links = []
         titles = [
-            (obj.stall_pdf, _("Rastalar")),
-            (obj.shop_pdf, _("Do'konlar")),
-            (obj.rent_pdf, _("Ijara buyumlari")),
-            (obj.parking_pdf, _("Avtoturargoh")),
+            ("stall", obj.stall_pdf, _("Rastalar")),
+            ("shop", obj.shop_pdf, _("Do'konlar")),
+            ("rent", obj.rent_pdf, _("Ijara buyumlari")),
+            ("parking", obj.parking_pdf, _("Avtoturargoh")),
         ]
-        for pdf, title in titles:
+        for kind, pdf, title in titles:
             if pdf:
-                links.append(format_html('<a href="{}" target="_blank">{}</a>', pdf.url, title))
+                url = reverse("main:bazaar-qr-pdf", args=[obj.id, kind, os.path.basename(pdf.name)])
+                links.append(format_html('<a href="{}" target="_blank">{}</a>', url, title))
 
         return format_html(" | ".join(links))
 
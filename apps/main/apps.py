@@ -7,3 +7,6 @@ class MainConfig(AppConfig):
     name = 'apps.main'
     verbose_name = _("Asosiy")
     verbose_name_plural = _("Asosiy")
+
+    def ready(self):
+        from apps.main import signals
@@ -0,0 +1,586 @@
+import contextlib
+import csv
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import time
+import uuid
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.account.models import User
+from apps.ai.models import StallOccupation
+from apps.api.models import DeviceToken
+from apps.camera.models import Camera
+from apps.main.models import Region, District, Bazaar, Area, Section
+from apps.parking.models import Parking, ParkingPrice, ParkingCamera, ParkingStatus
+from apps.rent.models import Thing, ThingData, ThingStatus
+from apps.shop.models import Shop, ShopPayment
+from apps.stall.models import Stall, StallStatus
+from smartbozor.instrumentation import Recorder
+from smartbozor.partition import PARTITIONED_TABLES, PartitionedTable, ensure_partitions, partition_sizes
+
+# Sintetik bozor ma'lumotlari (bench-seed) va asosiy yo'llar bo'yicha o'lchovlar (bench-run).
+# Bir xil seed va kun bilan bir xil ma'lumot hosil bo'ladi, natijalar commitlar orasida JSON orqali solishtiriladi.
+
+SLUG_PREFIX = "bench-"
+USERNAME = "bench"
+
+SCALES = {
+    "small": dict(regions=1, districts=2, bazaars=2, areas=2, sections=2, stalls=50, shops=20, things=2,
+                  thing_count=20, parkings=1, cars=40, roi_per_camera=12),
+    "medium": dict(regions=2, districts=4, bazaars=10, areas=3, sections=4, stalls=400, shops=150, things=3,
+                   thing_count=50, parkings=2, cars=150, roi_per_camera=12),
+    "large": dict(regions=4, districts=12, bazaars=40, areas=4, sections=5, stalls=1500, shops=500, things=4,
+                  thing_count=100, parkings=3, cars=400, roi_per_camera=12),
+}
+
+STATUS_TABLES = [
+    StallStatus._meta.db_table,
+    ShopPayment._meta.db_table,
+    ThingStatus._meta.db_table,
+    ParkingStatus._meta.db_table,
+    StallOccupation._meta.db_table,
+]
+
+PAYMENT_METHODS = (Bazaar.PAYMENT_METHOD_CASH, Bazaar.PAYMENT_METHOD_CLICK, Bazaar.PAYMENT_METHOD_PAYME)
+PAYMENT_WEIGHTS = (60, 25, 15)
+ALL_DAYS = sum(day for day, __ in Bazaar.DAY_CHOICES)
+
+PLATE_LETTERS = "ABCDEHKMOPTXY"
+
+
+def bench_bazaars():
+    return Bazaar.objects.filter(slug__startswith=SLUG_PREFIX).order_by("id")
+
+
+def _aware(day, minutes):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time()) + datetime.timedelta(minutes=minutes))
+
+
+def _days(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += datetime.timedelta(days=1)
+
+
+def _copy(table, columns, rows):
+    """rows generatorini CSV ko'rinishida COPY bilan yozadi"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    count = 0
+    for row in rows:
+        writer.writerow(["" if v is None else v for v in row])
+        count += 1
+    buf.seek(0)
+
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '')", buf)
+
+    return count
+
+
+def ensure_history_partitions(start, today):
+    """Seed oralig'i uchun o'tgan davrlarning bo'limlari ham kerak"""
+    with transaction.atomic(), connection.cursor() as cursor:
+        for pt in PARTITIONED_TABLES:
+            if pt.use_days:
+                ahead = (today - start).days + pt.ahead
+            else:
+                ahead = (today.year - start.year) * 12 + today.month - start.month + pt.ahead
+
+            span = PartitionedTable(pt.table, pt.column, granularity=pt.granularity, ahead=ahead)
+            ensure_partitions(cursor, span, today=start)
+
+
+def seed(scale="small", months=3, seed=42, occupation_days=1, log=print):
+    if bench_bazaars().exists():
+        raise ValueError("Bench data already exists, use an empty database")
+
+    conf = SCALES[scale]
+    rng = random.Random(seed)
+    today = timezone.localdate()
+    start = today.replace(day=1) - relativedelta(months=months - 1)
+
+    ensure_history_partitions(start, today)
+
+    with transaction.atomic():
+        bazaars = _seed_objects(rng, conf)
+    log("bazaars:", len(bazaars))
+
+    stalls = list(Stall.objects.filter(section__area__bazaar__in=bazaars).order_by("id").values_list("id", "price"))
+    shops = list(Shop.objects.filter(section__area__bazaar__in=bazaars).order_by("id").values_list("id", "rent_price"))
+    things = list(ThingData.objects.filter(bazaar__in=bazaars).order_by("id"))
+    parkings = list(
+        Parking.objects.filter(bazaar__in=bazaars).order_by("id").prefetch_related("parkingprice_set")
+    )
+
+    for month_start in _months(start, today):
+        month_end = min(month_start + relativedelta(months=1, days=-1), today)
+        days = list(_days(month_start, month_end))
+
+        with transaction.atomic():
+            n = _copy(
+                StallStatus._meta.db_table,
+                ["stall_id", "date", "is_occupied", "is_paid", "payment_method", "price", "occupied_at", "paid_at"],
+                _stall_rows(rng, stalls, days),
+            )
+            log(f"{month_start:%Y-%m}", "stall status:", n)
+
+            n = _copy(
+                ShopPayment._meta.db_table,
+                ["shop_id", "date", "payment_method", "amount", "paid_at"],
+                _shop_rows(rng, shops, days),
+            )
+            log(f"{month_start:%Y-%m}", "shop payment:", n)
+
+            n = _copy(
+                ThingStatus._meta.db_table,
+                ["bazaar_id", "thing_id", "number", "date", "is_occupied", "is_paid", "payment_method", "price",
+                 "occupied_at", "paid_at"],
+                _thing_rows(rng, things, days),
+            )
+            log(f"{month_start:%Y-%m}", "thing status:", n)
+
+            n = _copy(
+                ParkingStatus._meta.db_table,
+                ["parking_id", "date", "number", "is_paid", "payment_method", "price", "duration", "enter_count",
+                 "leave_count", "enter_at", "leave_at", "paid_at"],
+                _parking_rows(rng, parkings, days, conf["cars"]),
+            )
+            log(f"{month_start:%Y-%m}", "parking status:", n)
+
+    cameras = list(Camera.objects.filter(bazaar__in=bazaars).order_by("id"))
+    days = list(_days(today - datetime.timedelta(days=occupation_days - 1), today))
+    with transaction.atomic():
+        n = _copy(
+            StallOccupation._meta.db_table,
+            ["camera_id", "roi_id", "state", "check_at"],
+            _occupation_rows(rng, cameras, days),
+        )
+    log("stall occupation:", n)
+
+    with connection.cursor() as cursor:
+        for table in STATUS_TABLES:
+            cursor.execute(f"ANALYZE {table}")
+
+
+def _months(start, end):
+    month = start
+    while month <= end:
+        yield month
+        month += relativedelta(months=1)
+
+
+def _seed_objects(rng, conf):
+    regions = Region.objects.bulk_create([
+        Region(name_uz=f"Bench viloyat {i + 1}") for i in range(conf["regions"])
+    ])
+    districts = District.objects.bulk_create([
+        District(region=regions[i % len(regions)], name_uz=f"Bench tuman {i + 1}") for i in range(conf["districts"])
+    ])
+    bazaars = Bazaar.objects.bulk_create([
+        Bazaar(
+            district=districts[i % len(districts)],
+            name_uz=f"Bench bozor {i + 1}",
+            slug=f"{SLUG_PREFIX}{i + 1}",
+            working_days=ALL_DAYS,
+            payment_methods=sum(PAYMENT_METHODS),
+            click_merchant_id=1, click_merchant_user_id=1, click_service_id=1, click_secret_key="bench",
+        )
+        for i in range(conf["bazaars"])
+    ])
+
+    areas = Area.objects.bulk_create([
+        Area(bazaar=bazaar, name_uz=f"Blok {i + 1}") for bazaar in bazaars for i in range(conf["areas"])
+    ])
+    sections = Section.objects.bulk_create([
+        Section(area=area, name_uz=f"Bo'lim {i + 1}") for area in areas for i in range(conf["sections"])
+    ])
+    sections_by_bazaar = {}
+    for section in sections:
+        sections_by_bazaar.setdefault(section.area.bazaar_id, []).append(section)
+
+    stalls, shops = [], []
+    for bazaar in bazaars:
+        bazaar_sections = sections_by_bazaar[bazaar.id]
+        for n in range(conf["stalls"]):
+            stalls.append(Stall(
+                section=bazaar_sections[n % len(bazaar_sections)],
+                number=str(n + 1),
+                price=rng.choice((5000, 10000, 15000, 20000)),
+            ))
+        for n in range(conf["shops"]):
+            shops.append(Shop(
+                section=bazaar_sections[n % len(bazaar_sections)],
+                number=f"m{n + 1}",
+                owner=f"Tadbirkor {n + 1}",
+                rent_price=rng.choice((20000, 30000, 50000)),
+            ))
+    stalls = Stall.objects.bulk_create(stalls, batch_size=5000)
+    Shop.objects.bulk_create(shops, batch_size=5000)
+
+    things = Thing.objects.bulk_create([Thing(name_uz=f"Bench buyum {i + 1}") for i in range(conf["things"])])
+    ThingData.objects.bulk_create([
+        ThingData(thing=thing, bazaar=bazaar, count=conf["thing_count"], price=rng.choice((3000, 5000)))
+        for bazaar in bazaars for thing in things
+    ])
+
+    parkings = Parking.objects.bulk_create([
+        Parking(bazaar=bazaar, name=str(i + 1), billing_mode=Parking.BILLING_MODE_EXIT)
+        for bazaar in bazaars for i in range(conf["parkings"])
+    ])
+    ParkingPrice.objects.bulk_create([
+        ParkingPrice(parking=parking, duration=duration, price=price)
+        for parking in parkings for duration, price in ((0, 0), (900, 3000), (3600, 5000), (4 * 3600, 10000))
+    ])
+    ParkingCamera.objects.bulk_create([
+        ParkingCamera(parking=parking, role=role, token="%032x" % rng.getrandbits(128))
+        for parking in parkings for role in (ParkingCamera.ROLE_ENTER, ParkingCamera.ROLE_EXIT)
+    ])
+
+    cameras = []
+    per_camera = conf["roi_per_camera"]
+    for bazaar in bazaars:
+        numbers = [stall.number for stall in stalls if stall.section.area.bazaar_id == bazaar.id]
+        for n, i in enumerate(range(0, len(numbers), per_camera)):
+            roi = []
+            for k, number in enumerate(numbers[i:i + per_camera]):
+                x, y = (k % 4) * 0.25, (k // 4) * 0.33
+                roi.append({
+                    "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "type": Camera.TYPE_STALL,
+                    "value": number,
+                    "points": [[x, y], [x + 0.2, y], [x + 0.2, y + 0.3], [x, y + 0.3]],
+                })
+            cameras.append(Camera(bazaar=bazaar, name=f"Kamera {n + 1}", roi=roi, use_ai=True))
+    Camera.objects.bulk_create(cameras)
+
+    user, __ = User.objects.get_or_create(username=USERNAME, defaults={"is_staff": True, "is_superuser": True})
+    user.set_unusable_password()
+    user.save()
+    user.allowed_bazaar.add(*bazaars)
+
+    DeviceToken.objects.filter(user=user).delete()
+    DeviceToken.objects.create(
+        user=user, bazaar=bazaars[0], name="bench", pin=make_password("0000"), is_active=True
+    )
+
+    return bazaars
+
+
+def _payment(rng, occupied_at, is_paid):
+    if not is_paid:
+        return 0, None
+
+    return rng.choices(PAYMENT_METHODS, PAYMENT_WEIGHTS)[0], occupied_at + datetime.timedelta(minutes=rng.randint(1, 240))
+
+
+def _stall_rows(rng, stalls, days):
+    for day in days:
+        for stall_id, price in stalls:
+            if rng.random() > 0.7:
+                continue
+
+            occupied_at = _aware(day, rng.randint(6 * 60, 11 * 60))
+            is_paid = rng.random() < 0.85
+            payment_method, paid_at = _payment(rng, occupied_at, is_paid)
+            yield stall_id, day, True, is_paid, payment_method, price, occupied_at, paid_at
+
+
+def _shop_rows(rng, shops, days):
+    for day in days:
+        for shop_id, rent_price in shops:
+            if rng.random() > 1 / 7:
+                continue
+
+            paid_at = _aware(day, rng.randint(8 * 60, 18 * 60))
+            amount = rent_price * rng.choice((1, 7, 7, 30))
+            yield shop_id, day, rng.choices(PAYMENT_METHODS, PAYMENT_WEIGHTS)[0], amount, paid_at
+
+
+def _thing_rows(rng, things, days):
+    for day in days:
+        for td in things:
+            for number in range(1, td.count + 1):
+                if rng.random() > 0.5:
+                    continue
+
+                occupied_at = _aware(day, rng.randint(6 * 60, 14 * 60))
+                is_paid = rng.random() < 0.9
+                payment_method, paid_at = _payment(rng, occupied_at, is_paid)
+                yield td.bazaar_id, td.thing_id, number, day, True, is_paid, payment_method, td.price, occupied_at, \
+                    paid_at
+
+
+def _plate(rng):
+    return "{0:02d}{1}{2:03d}{3}{4}".format(
+        rng.randint(1, 95), rng.choice(PLATE_LETTERS), rng.randint(1, 999),
+        rng.choice(PLATE_LETTERS), rng.choice(PLATE_LETTERS),
+    )
+
+
+def _parking_rows(rng, parkings, days, cars):
+    now = timezone.now()
+    for parking in parkings:
+        prices = sorted((p.duration, p.price) for p in parking.parkingprice_set.all())
+        for day in days:
+            for __ in range(rng.randint(cars // 2, cars)):
+                enter_at = _aware(day, rng.randint(6 * 60, 20 * 60))
+                duration = rng.randint(5 * 60, 5 * 3600)
+                leave_at = enter_at + datetime.timedelta(seconds=duration)
+                if leave_at > now:
+                    leave_at, duration = None, 0
+
+                price = 0
+                if leave_at:
+                    price = max((p for d, p in prices if d <= duration), default=0)
+
+                is_paid = price > 0 and rng.random() < 0.8
+                payment_method, paid_at = _payment(rng, leave_at, is_paid)
+                yield parking.id, day, _plate(rng), is_paid, payment_method, price, duration, 1, \
+                    1 if leave_at else 0, enter_at, leave_at, paid_at
+
+
+def _occupation_rows(rng, cameras, days):
+    # AI har 5 daqiqada faqat band rastalarni yozadi
+    now = timezone.now()
+    for day in days:
+        for camera in cameras:
+            for roi in camera.roi:
+                if rng.random() > 0.6:
+                    continue
+
+                begin = rng.randint(7 * 60, 11 * 60)
+                for minute in range(begin, begin + rng.randint(30, 8 * 60), 5):
+                    check_at = _aware(day, minute)
+                    if check_at > now:
+                        break
+                    yield camera.id, roi["id"], 1, check_at
+
+
+class BenchContext:
+    """bench-run case'lari uchun umumiy obyektlar"""
+
+    def __init__(self):
+        self.user = User.objects.get(username=USERNAME)
+        self.bazaar = bench_bazaars().first()
+        if self.bazaar is None:
+            raise ValueError("Bench data not found, run bench-seed first")
+
+        self.stall = Stall.objects.select_related("section__area").filter(
+            section__area__bazaar=self.bazaar
+        ).order_by("id").first()
+        self.device_token = DeviceToken.objects.filter(user=self.user, is_active=True).first()
+        self.camera = ParkingCamera.objects.filter(
+            parking__bazaar=self.bazaar, role=ParkingCamera.ROLE_ENTER
+        ).order_by("id").first()
+
+        host = next((h for h in settings.ALLOWED_HOSTS if h and "*" not in h and not h.startswith(".")), "localhost")
+        self.client = Client(HTTP_HOST=host)
+        self.client.force_login(self.user)
+        self.anonymous = Client(HTTP_HOST=host)
+        self.rng = random.Random(0)
+
+    def get(self, url, client=None, **extra):
+        response = (client or self.client).get(url, **extra)
+        if response.status_code >= 400:
+            raise ValueError(f"GET {url}: {response.status_code}")
+        # Stream javoblar ham to'liq o'qiladi
+        return b"".join(response) if response.streaming else response.content
+
+
+def case_report_total_revenue(ctx):
+    ctx.get(reverse("report:total-revenue"))
+
+
+def case_dashboard(ctx):
+    ctx.get(reverse("dashboard:index"))
+
+
+def case_dashboard_bazaar(ctx):
+    ctx.get(reverse("dashboard:index-bazaar", args=[ctx.bazaar.id]))
+
+
+def case_stall_list(ctx):
+    ctx.get(reverse("stall:list", args=[ctx.bazaar.id]))
+
+
+def case_device_sync(ctx):
+    ctx.get(reverse("api:sync-data"), HTTP_AUTHORIZATION=f"Token {ctx.device_token.key}")
+
+
+def case_qr_png(ctx):
+    ctx.get(reverse("stall:qr-code", args=[ctx.stall.id]))
+
+
+def case_qr_page(ctx):
+    stall = ctx.stall
+    ctx.get(reverse("stall-qr", kwargs={
+        "bazaar_id": stall.section.area.bazaar_id,
+        "area_id": stall.section.area_id,
+        "section_id": stall.section_id,
+        "number": stall.number,
+    }), client=ctx.anonymous)
+
+
+def case_anpr_ingest(ctx):
+    xml = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<EventNotificationAlert xmlns="http://www.hikvision.com/ver20/XMLSchema">'
+        f'<macAddress>00:00:00:00:00:00</macAddress><dateTime>{timezone.localtime().isoformat()}</dateTime>'
+        f'<ANPR><licensePlate>{_plate(ctx.rng)}</licensePlate><direction>forward</direction></ANPR>'
+        '</EventNotificationAlert>'
+    ).encode()
+
+    response = ctx.anonymous.post(reverse("action", args=["enter", ctx.camera.token]), {
+        "anpr.xml": SimpleUploadedFile("anpr.xml", xml, content_type="text/xml"),
+    })
+    if response.status_code >= 400:
+        raise ValueError(f"ANPR: {response.status_code}")
+
+
+def case_ai_stall_occupation(ctx):
+    with contextlib.redirect_stdout(io.StringIO()):
+        call_command("ai-stall-occupation")
+
+
+CASES = {
+    "report-total-revenue": case_report_total_revenue,
+    "dashboard": case_dashboard,
+    "dashboard-bazaar": case_dashboard_bazaar,
+    "stall-list": case_stall_list,
+    "device-sync": case_device_sync,
+    "qr-png": case_qr_png,
+    "qr-page": case_qr_page,
+    "anpr-ingest": case_anpr_ingest,
+    "ai-stall-occupation": case_ai_stall_occupation,
+}
+
+# Og'ir case'lar kamroq takrorlanadi
+REPEAT_DIVISOR = {
+    "ai-stall-occupation": 5,
+}
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def measure(func, ctx, repeat, warmup):
+    for __ in range(warmup):
+        func(ctx)
+
+    times, queries = [], []
+    for __ in range(repeat):
+        recorder = Recorder("bench")
+        with contextlib.ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+
+            started = time.perf_counter()
+            func(ctx)
+            times.append((time.perf_counter() - started) * 1000)
+        queries.append(recorder.queries)
+
+    return {
+        "runs": repeat,
+        "min_ms": round(min(times), 3),
+        "median_ms": round(statistics.median(times), 3),
+        "p95_ms": round(_percentile(times, 95), 3),
+        "max_ms": round(max(times), 3),
+        "queries": max(queries),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def environment():
+    with connection.cursor() as cursor:
+        sizes = partition_sizes(cursor, STATUS_TABLES)
+        cursor.execute("SHOW server_version")
+        pg_version = cursor.fetchone()[0]
+
+    rows = {}
+    for table, __, __, __, __, n in sizes:
+        rows[table] = rows.get(table, 0) + n
+
+    return {
+        "revision": git_revision(),
+        "created_at": timezone.now().isoformat(),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "postgres": pg_version,
+        "cpu_count": os.cpu_count(),
+        "bazaars": bench_bazaars().count(),
+        "stalls": Stall.objects.filter(section__area__bazaar__slug__startswith=SLUG_PREFIX).count(),
+        "rows": rows,
+    }
+
+
+def run(names=None, repeat=20, warmup=3, log=print):
+    names = names or list(CASES)
+    unknown = set(names) - set(CASES)
+    if unknown:
+        raise ValueError("Unknown cases: " + ", ".join(sorted(unknown)))
+
+    # O'lchovga instrumentation middleware'ning Redis yozuvlari aralashmasin
+    with override_settings(INSTRUMENTATION=False):
+        ctx = BenchContext()
+        results = {}
+        for name in names:
+            n = max(repeat // REPEAT_DIVISOR.get(name, 1), 1)
+            results[name] = measure(CASES[name], ctx, n, warmup)
+            row = results[name]
+            log(f"{name:<24} median {row['median_ms']:>10.2f} ms  p95 {row['p95_ms']:>10.2f} ms  "
+                f"queries {row['queries']:>5}")
+
+    return {"environment": environment(), "results": results}
+
+
+def compare(old, new, log=print):
+    """Ikki natija fayli bo'yicha median o'zgarishi"""
+    for name, row in new["results"].items():
+        before = old.get("results", {}).get(name)
+        if not before:
+            log(f"{name:<24} {row['median_ms']:>10.2f} ms (new)")
+            continue
+
+        delta = (row["median_ms"] - before["median_ms"]) / before["median_ms"] * 100 if before["median_ms"] else 0
+        log(f"{name:<24} {before['median_ms']:>10.2f} -> {row['median_ms']:>10.2f} ms {delta:>+8.1f}%  "
+            f"queries {before['queries']} -> {row['queries']}")
+
+
+def default_output(result):
+    stamp = timezone.localtime().strftime("%Y%m%d-%H%M%S")
+    name = f"{stamp}-{result['environment']['revision'] or 'local'}.json"
+    return os.path.join(settings.BASE_DIR, "benchmarks", "results", name)
+
+
+def save(result, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
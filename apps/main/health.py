@@ -0,0 +1,180 @@
+import asyncio
+import json
+import os
+import time
+
+from django.utils import timezone
+
+from apps.main.models import Bazaar
+from smartbozor import navigation
+from smartbozor.redis import REDIS_CLIENT
+
+ACCESS_TOKEN = os.environ.get("CONTROL_ACCESS_TOKEN")
+EDGE_PORT = 1984
+
+HEALTH_STREAM_KEY = "bazaar_health:{}"
+HEALTH_LATEST_KEY = "bazaar_health_latest"
+HEALTH_UPTIME_KEY = "bazaar_uptime:{}"
+
+# 1 daqiqalik intervalda ~7 kunlik tarix
+HEALTH_STREAM_MAXLEN = 10080
+# Bundan eski holat sahifada "eskirgan" deb ko'rsatiladi (probe_bazaars beat'i ishlamayapti)
+HEALTH_STALE_AFTER = 5 * 60
+
+
+async def _read_info(ip, timeout):
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, EDGE_PORT), timeout)
+    try:
+        writer.write((
+            "GET /api/info HTTP/1.0\r\n"
+            f"Host: {ip}:{EDGE_PORT}\r\n"
+            f"Authorization: Bearer {ACCESS_TOKEN}\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode())
+        await writer.drain()
+        raw = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+
+    head, _, body = raw.partition(b"\r\n\r\n")
+    if b" 200 " not in head.split(b"\r\n", 1)[0]:
+        return None
+
+    return json.loads(body)
+
+
+async def probe(bazaar_id, ip, timeout=3.0):
+    result = {
+        "id": bazaar_id,
+        "online": False,
+        "latency": None,
+        "files_count": 0,
+        "cameras_count": 0,
+        "states_count": -1,
+        "at": int(time.time()),
+    }
+    if not ip:
+        return result
+
+    started = time.monotonic()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(ip, EDGE_PORT), timeout)
+        result["latency"] = round((time.monotonic() - started) * 1000, 1)
+        result["online"] = True
+        writer.close()
+    except Exception:
+        return result
+
+    try:
+        info = await _read_info(ip, timeout)
+        if info:
+            result["files_count"] = info.get("files_count", 0)
+            result["cameras_count"] = info.get("cameras_count", 0)
+            result["states_count"] = info.get("states_count", -1)
+    except Exception:
+        pass
+
+    return result
+
+
+async def probe_all(bazaars, concurrency=100, timeout=3.0):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(bazaar_id, ip):
+        async with semaphore:
+            return await probe(bazaar_id, ip, timeout)
+
+    return await asyncio.gather(*[run(bazaar_id, ip) for bazaar_id, ip in bazaars])
+
+
+def save_results(results):
+    today = timezone.localtime().date().isoformat()
+    uptime_key = HEALTH_UPTIME_KEY.format(today)
+
+    pipe = REDIS_CLIENT.pipeline(transaction=False)
+    for row in results:
+        pipe.xadd(HEALTH_STREAM_KEY.format(row["id"]), {
+            "online": int(row["online"]),
+            "latency": row["latency"] if row["latency"] is not None else "",
+            "files": row["files_count"],
+            "cameras": row["cameras_count"],
+            "states": row["states_count"],
+        }, maxlen=HEALTH_STREAM_MAXLEN, approximate=True)
+        pipe.hset(HEALTH_LATEST_KEY, row["id"], json.dumps(row))
+        pipe.hincrby(uptime_key, f"{row['id']}:n", 1)
+        if row["online"]:
+            pipe.hincrby(uptime_key, f"{row['id']}:up", 1)
+
+    pipe.expire(uptime_key, 40 * 24 * 3600)
+    pipe.execute()
+
+
+def run_probe(concurrency=100, timeout=3.0):
+    """Barcha bozorlarni tekshiradi, natijani Redis'ga va o'zgargan is_online ni bazaga yozadi"""
+    bazaars = list(Bazaar.objects.order_by("id").values_list("id", "server_ip", "is_online"))
+    results = asyncio.run(probe_all(
+        [(bazaar_id, ip) for bazaar_id, ip, _ in bazaars],
+        concurrency=concurrency,
+        timeout=timeout,
+    ))
+    save_results(results)
+
+    was_online = {bazaar_id: is_online for bazaar_id, _, is_online in bazaars}
+    any_changed = False
+    for online in (True, False):
+        changed = [r["id"] for r in results if r["online"] == online and was_online[r["id"]] != online]
+        if changed:
+            Bazaar.objects.filter(id__in=changed).update(is_online=online)
+            any_changed = True
+
+    # update() signal yubormaydi: menyu keshidagi is_online eskirmasin
+    if any_changed:
+        navigation.invalidate_all()
+
+    return results
+
+
+def snapshot_row(bazaar):
+    """Bazaar.check_online natijasi -> save_results qatori"""
+    return {
+        "id": bazaar.id,
+        "online": bool(bazaar.is_online),
+        "latency": None,
+        "files_count": bazaar.files_count,
+        "cameras_count": bazaar.cameras_count,
+        "states_count": bazaar.states_count,
+        "at": int(time.time()),
+    }
+
+
+def latest_snapshot():
+    return {int(k): json.loads(v) for k, v in REDIS_CLIENT.hgetall(HEALTH_LATEST_KEY).items()}
+
+
+def uptime(day=None):
+    day = day or timezone.localtime().date()
+    counters = {k.decode(): int(v) for k, v in REDIS_CLIENT.hgetall(HEALTH_UPTIME_KEY.format(day.isoformat())).items()}
+
+    result = dict()
+    for key, n in counters.items():
+        bazaar_id, kind = key.split(":")
+        if kind == "n" and n > 0:
+            result[int(bazaar_id)] = round(100 * counters.get(f"{bazaar_id}:up", 0) / n, 1)
+
+    return result
+
+
+def history(bazaar_id, seconds=24 * 3600):
+    start = int((time.time() - seconds) * 1000)
+    rows = []
+    for entry_id, fields in REDIS_CLIENT.xrange(HEALTH_STREAM_KEY.format(bazaar_id), min=start):
+        fields = {k.decode(): v.decode() for k, v in fields.items()}
+        rows.append({
+            "at": int(entry_id.decode().split("-")[0]) // 1000,
+            "online": fields["online"] == "1",
+            "latency": float(fields["latency"]) if fields["latency"] else None,
+            "files_count": int(fields["files"]),
+            "cameras_count": int(fields["cameras"]),
+            "states_count": int(fields["states"]),
+        })
+    return rows
@@ -0,0 +1,193 @@
+import csv
+import datetime
+import io
+import uuid
+from types import SimpleNamespace
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.main.models import Bazaar, ImportRow
+from apps.shop.models import Shop
+from apps.stall.models import Stall
+
+# Rasta/magazin importi: Excel oqim bilan o'qiladi, to'g'ri qatorlar COPY bilan main_importrow ga yoziladi,
+# farq (yangi/tahrir/o'chirish) SQL'da hisoblanadi va tasdiqlanganda bitta qisqa tranzaksiyada qo'llanadi.
+
+IMPORT_TTL = datetime.timedelta(days=1)
+
+KIND_STALL = ImportRow.KIND_STALL
+KIND_SHOP = ImportRow.KIND_SHOP
+
+# Bozordagi joriy obyektlar: id, number, price, owner
+CURRENT_SQL = {
+    KIND_STALL: """
+        SELECT s.id, s.number, s.price::bigint AS price, NULL::varchar AS owner
+        FROM stall_stall AS s
+        JOIN main_section AS sec ON sec.id = s.section_id
+        JOIN main_area AS a ON a.id = sec.area_id
+        WHERE a.bazaar_id = %(bazaar_id)s
+    """,
+    KIND_SHOP: """
+        SELECT s.id, s.number, s.rent_price AS price, s.owner
+        FROM shop_shop AS s
+        JOIN main_section AS sec ON sec.id = s.section_id
+        JOIN main_area AS a ON a.id = sec.area_id
+        WHERE a.bazaar_id = %(bazaar_id)s
+    """,
+}
+
+SAME_SQL = {
+    KIND_STALL: "cur.price = imp.price",
+    KIND_SHOP: "cur.price = imp.price AND lower(trim(COALESCE(cur.owner, ''))) = lower(imp.owner)",
+}
+
+IMPORT_SQL = """
+    SELECT line, number, owner, price FROM main_importrow
+    WHERE import_id = %(import_id)s AND kind = %(kind)s AND bazaar_id = %(bazaar_id)s AND user_id = %(user_id)s
+"""
+
+
+def _with(kind):
+    return f"WITH cur AS ({CURRENT_SQL[kind]}), imp AS ({IMPORT_SQL}) "
+
+
+def read_sheet(file):
+    """Birinchi (sarlavha) va bo'sh qatorlarsiz, read_only rejimda"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        for n, row in enumerate(workbook.active.iter_rows(values_only=True)):
+            if n == 0 or all(cell is None for cell in row):
+                continue
+
+            yield n + 1, row
+    finally:
+        workbook.close()
+
+
+def stage(kind, user, bazaar, rows):
+    """rows: [(line, number, owner, price)] -> import_id"""
+    import_id = uuid.uuid4()
+    now = timezone.now().isoformat()
+    columns = ["import_id", "kind", "user_id", "bazaar_id", "created_at", "line", "number", "price"]
+    if kind == KIND_SHOP:
+        columns.append("owner")
+
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for line, number, owner, price in rows:
+        row = [import_id, kind, user.id, bazaar.id, now, line, number, price]
+        if kind == KIND_SHOP:
+            row.append(owner)
+        writer.writerow(row)
+    buf.seek(0)
+
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {ImportRow._meta.db_table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf
+        )
+
+    return import_id
+
+
+def _params(kind, import_id, user, bazaar, **kwargs):
+    return dict(kind=kind, import_id=str(import_id), user_id=user.id, bazaar_id=bazaar.id, **kwargs)
+
+
+def diff(kind, import_id, user, bazaar):
+    """{"insert": [...], "update": [...], "delete": [...], "skip": [...]} - import sahifasi uchun"""
+    result = {"insert": [], "update": [], "delete": [], "skip": []}
+    with connection.cursor() as cursor:
+        cursor.execute(_with(kind) + f"""
+            SELECT CASE
+                       WHEN cur.id IS NULL THEN 'insert'
+                       WHEN imp.line IS NULL THEN 'delete'
+                       WHEN {SAME_SQL[kind]} THEN 'skip'
+                       ELSE 'update'
+                   END,
+                   COALESCE(imp.number, cur.number), cur.price, cur.owner, imp.price, imp.owner
+            FROM imp
+            FULL OUTER JOIN cur ON cur.number = imp.number
+            ORDER BY imp.line NULLS LAST, cur.id
+        """, _params(kind, import_id, user, bazaar))
+
+        for action, number, cur_price, cur_owner, price, owner in cursor.fetchall():
+            current = SimpleNamespace(number=number, price=cur_price, rent_price=cur_price, owner=cur_owner or "")
+            if action == "insert":
+                result[action].append((number, price) if kind == KIND_STALL else (number, owner, price))
+            elif action == "update":
+                result[action].append((current, price) if kind == KIND_STALL else (current, owner, price))
+            else:
+                result[action].append(current)
+
+    return result
+
+
+def apply(kind, import_id, user, bazaar, section_id, delete=True):
+    """
+    Farqni qo'llaydi. Topilmaganlar: delete=True - o'chiriladi, aks holda (magazin) is_active=False.
+    Import topilmasa (muddati o'tgan yoki boshqa foydalanuvchiniki) False.
+    """
+    params = _params(kind, import_id, user, bazaar, section_id=section_id)
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Bir bozorga bir vaqtda bitta import
+        Bazaar.objects.select_for_update().filter(pk=bazaar.id).first()
+
+        cursor.execute(f"SELECT EXISTS ({IMPORT_SQL})", params)
+        if not cursor.fetchone()[0]:
+            return False
+
+        cursor.execute(_with(kind) + """
+            SELECT cur.id FROM cur WHERE NOT EXISTS (SELECT 1 FROM imp WHERE imp.number = cur.number)
+        """, params)
+        delete_ids = [row[0] for row in cursor.fetchall()]
+
+        if kind == KIND_STALL:
+            cursor.execute(_with(kind) + f"""
+                UPDATE stall_stall AS s SET price = imp.price
+                FROM cur JOIN imp ON imp.number = cur.number
+                WHERE s.id = cur.id AND NOT ({SAME_SQL[kind]})
+            """, params)
+            cursor.execute(_with(kind) + """
+                INSERT INTO stall_stall (section_id, number, price)
+                SELECT %(section_id)s, imp.number, imp.price FROM imp
+                WHERE NOT EXISTS (SELECT 1 FROM cur WHERE cur.number = imp.number)
+                ORDER BY imp.line
+            """, params)
+        else:
+            cursor.execute(_with(kind) + f"""
+                UPDATE shop_shop AS s SET owner = imp.owner, rent_price = imp.price, is_active = TRUE
+                FROM cur JOIN imp ON imp.number = cur.number
+                WHERE s.id = cur.id AND NOT ({SAME_SQL[kind]})
+            """, params)
+            cursor.execute(_with(kind) + """
+                INSERT INTO shop_shop (section_id, number, owner, rent_price, is_active)
+                SELECT %(section_id)s, imp.number, imp.owner, imp.price, TRUE FROM imp
+                WHERE NOT EXISTS (SELECT 1 FROM cur WHERE cur.number = imp.number)
+                ORDER BY imp.line
+            """, params)
+
+        if delete_ids:
+            # ORM orqali: bog'liq (CASCADE) yozuvlar ham o'chadi, RESTRICT bo'lsa xato
+            if kind == KIND_STALL:
+                Stall.objects.filter(id__in=delete_ids).delete()
+            else:
+                qs = Shop.objects.filter(id__in=delete_ids)
+                if delete:
+                    qs.delete()
+                else:
+                    qs.update(is_active=False)
+
+        discard(import_id)
+
+    return True
+
+
+def discard(import_id):
+    ImportRow.objects.filter(import_id=import_id).delete()
+
+
+def cleanup():
+    return ImportRow.objects.filter(created_at__lt=timezone.now() - IMPORT_TTL).delete()[0]
@@ -1,11 +1,17 @@
 from django.core.management.base import BaseCommand
+
+from apps.main.health import save_results, snapshot_row
 from apps.main.models import Bazaar
-import subprocess
+
 
 class Command(BaseCommand):
     help = "Ping asosida barcha bozorlarni tekshirib, online/offline statusini yangilaydi"
 
     def handle(self, *args, **options):
-        for bazaar in Bazaar.check_online(True):
+        bazaars = Bazaar.check_online(True)
+        # Bozorlar holati sahifasi (health.latest_snapshot) ham yangilansin
+        save_results([snapshot_row(bazaar) for bazaar in bazaars])
+
+        for bazaar in bazaars:
             status = "🟢 ONLINE" if bazaar.is_online else "🔴 OFFLINE"
             self.stdout.write(f"{bazaar.name} [{bazaar.server_ip}]: {status}")
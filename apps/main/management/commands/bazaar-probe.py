@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.main.health import run_probe
+
+
+class Command(BaseCommand):
+    help = "Barcha edge serverlarni asyncio orqali parallel tekshirib, holat tarixini Redis stream'ga yozadi"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=int, default=60, help="Tekshiruvlar orasidagi soniya (default: 60)")
+        parser.add_argument("--timeout", type=float, default=3.0)
+        parser.add_argument("--concurrency", type=int, default=100)
+        parser.add_argument("--once", action="store_true", help="Bir marta tekshirib chiqish")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            self.run_once(options)
+
+            if options["once"]:
+                break
+
+            time.sleep(max(1.0, options["interval"] - (time.monotonic() - started)))
+
+    def run_once(self, options):
+        results = run_probe(concurrency=options["concurrency"], timeout=options["timeout"])
+
+        n = sum(1 for r in results if r["online"])
+        self.stdout.write(f"{time.strftime('%H:%M:%S')} online: {n}/{len(results)}")
@@ -0,0 +1,30 @@
+import json
+
+from django.core.management import BaseCommand, CommandError
+
+from apps.main.bench import CASES, run, compare, default_output, save
+
+
+class Command(BaseCommand):
+    help = "Asosiy yo'llar bo'yicha benchmark (bench-seed ma'lumotlarida), natija JSON faylga"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--case", action="append", choices=sorted(CASES), help="Faqat shu case(lar)")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument("--output", help="Natija fayli (standart: benchmarks/results/<vaqt>-<commit>.json)")
+        parser.add_argument("--compare", help="Oldingi natija fayli bilan solishtirish")
+
+    def handle(self, *args, **options):
+        try:
+            result = run(options["case"], max(options["repeat"], 1), max(options["warmup"], 0))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        path = options["output"] or default_output(result)
+        save(result, path)
+        print("Saved:", path)
+
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                compare(json.load(f), result)
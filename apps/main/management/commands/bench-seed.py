@@ -0,0 +1,22 @@
+from django.core.management import BaseCommand, CommandError
+
+from apps.main.bench import SCALES, seed
+
+
+class Command(BaseCommand):
+    help = "Benchmark uchun deterministik sintetik bozor ma'lumotlari (bo'sh bazada)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+        parser.add_argument("--months", type=int, default=3, help="Necha oylik holat/to'lov tarixi")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--occupation-days", type=int, default=1, help="AI band/bo'sh yozuvlari necha kunlik")
+
+    def handle(self, *args, **options):
+        if options["months"] < 1 or options["occupation_days"] < 1:
+            raise CommandError("--months and --occupation-days must be positive")
+
+        try:
+            seed(options["scale"], options["months"], options["seed"], options["occupation_days"])
+        except ValueError as e:
+            raise CommandError(str(e))
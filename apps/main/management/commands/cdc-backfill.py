@@ -0,0 +1,22 @@
+from django.core.management import BaseCommand, CommandError
+
+from smartbozor.cdc import CDC_TABLES, DRAIN_BATCH_SIZE, backfill
+
+
+class Command(BaseCommand):
+    help = "CDC jadvallari tarixini ClickHouse'ga yuklash (drain bilan bir vaqtda ishlashi mumkin)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--table", action="append", help="Faqat shu jadval(lar), masalan stall_stallstatus")
+        parser.add_argument("--batch-size", type=int, default=DRAIN_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        tables = options["table"] or list(CDC_TABLES)
+        unknown = set(tables) - set(CDC_TABLES)
+        if unknown:
+            raise CommandError("Unknown table: " + ", ".join(sorted(unknown)))
+
+        for table in tables:
+            print(table)
+            total = backfill(table, options["batch_size"])
+            print("\t", "done:", total)
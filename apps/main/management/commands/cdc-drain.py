@@ -0,0 +1,26 @@
+import time
+
+from django.core.management import BaseCommand
+
+from smartbozor.cdc import DRAIN_BATCH_SIZE, drain
+
+
+class Command(BaseCommand):
+    help = "cdc_outbox'dagi o'zgarishlarni tartib bilan ClickHouse'ga o'tkazish"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=DRAIN_BATCH_SIZE)
+        parser.add_argument("--interval", type=float, default=2.0, help="Outbox bo'sh bo'lganda kutish (soniya)")
+        parser.add_argument("--once", action="store_true", help="Outbox bo'shaguncha o'tkazib chiqish")
+
+    def handle(self, *args, **options):
+        while True:
+            count = drain(options["batch_size"])
+            if count:
+                print("Drained:", count)
+                continue
+
+            if options["once"]:
+                break
+
+            time.sleep(options["interval"])
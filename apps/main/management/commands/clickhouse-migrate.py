@@ -0,0 +1,19 @@
+from django.core.management import BaseCommand
+
+from smartbozor.clickhouse import migrate, show_migrations
+
+
+class Command(BaseCommand):
+    help = "clickhouse/migrations ichidagi SQL migratsiyalarni ketma-ket qo'llash"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--list", action="store_true", help="Migratsiyalar holatini ko'rsatish")
+        parser.add_argument("--fake", action="store_true", help="Bajarmasdan qo'llangan deb belgilash")
+
+    def handle(self, *args, **options):
+        if options["list"]:
+            show_migrations()
+            return
+
+        done = migrate(fake=options["fake"])
+        print("Applied:", len(done))
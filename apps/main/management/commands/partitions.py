@@ -1,18 +1,51 @@
 from django.core.management import BaseCommand
-from django.db import connection
+from django.db import connection, transaction
+from humanize import naturalsize
 
-from smartbozor.partition import create_partition_table_sql
+from smartbozor.partition import (
+    PARTITIONED_TABLES, archive_partition, cold_partitions, ensure_partitions, get_partitioned_table, partition_sizes
+)
 
 
 class Command(BaseCommand):
+    help = "Vaqt bo'yicha bo'lingan jadvallar: bo'limlarni oldindan yaratish, eski bo'limlarni arxivlash, hajm hisoboti"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--table", action="append", default=None, help="Faqat shu jadval(lar)")
+        parser.add_argument("--archive", action="store_true", help="Saqlash muddati o'tgan bo'limlarni ajratish/arxivlash")
+        parser.add_argument("--dry-run", action="store_true", help="Arxivlanadigan bo'limlarni faqat ko'rsatish")
+        parser.add_argument("--report", action="store_true", help="Bo'limlar hajmi")
+
     def handle(self, *args, **options):
-        with connection.cursor() as cursor:
-            for i in range(1, 6):
-                cursor.execute(create_partition_table_sql("stall_stallstatus", i))
-                cursor.execute(create_partition_table_sql("shop_shoppayment", i))
-                cursor.execute(create_partition_table_sql("shop_shopstatus", i))
-                cursor.execute(create_partition_table_sql("rent_thingstatus", i))
-                cursor.execute(create_partition_table_sql("ai_stalldataset", i))
-                cursor.execute(create_partition_table_sql("ai_stalloccupation", i))
+        tables = [get_partitioned_table(t) for t in options["table"]] if options["table"] else PARTITIONED_TABLES
+
+        if options["report"]:
+            with connection.cursor() as cursor:
+                rows = partition_sizes(cursor, [pt.table for pt in tables])
+
+            total = 0
+            for table, name, start, end, size, n in rows:
+                total += size
+                print(f"{name:<40} {start or '-':>10} - {end or '-':<10} {naturalsize(size, binary=True):>10} {n:>12}")
+            print("Total:", naturalsize(total, binary=True))
+            return
+
+        for pt in tables:
+            with transaction.atomic(), connection.cursor() as cursor:
+                created = ensure_partitions(cursor, pt)
+            if created:
+                print(pt.table, "created:", ", ".join(created))
+
+            if not options["archive"]:
+                continue
+
+            with connection.cursor() as cursor:
+                cold = cold_partitions(cursor, pt)
 
+            for name, start, end in cold:
+                if options["dry_run"]:
+                    print(pt.table, "cold:", name, start, end)
+                    continue
 
+                path = archive_partition(pt, name)
+                print(pt.table, "archived:", name, path or "(detached)")
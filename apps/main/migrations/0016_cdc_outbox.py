@@ -0,0 +1,66 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:00
+
+from django.db import migrations
+
+# smartbozor.cdc dagi SQL va jadvallar shu migratsiya yozilgan paytdagi holatida
+CDC_TABLES = (
+    "stall_stallstatus",
+    "rent_thingstatus",
+    "shop_shoppayment",
+    "parking_parkingstatus",
+    "main_receipt",
+    "payment_click",
+    "payment_payme",
+)
+
+OUTBOX_SQL = """
+CREATE TABLE cdc_outbox
+(
+    id         BIGSERIAL PRIMARY KEY,
+    table_name VARCHAR(64) NOT NULL,
+    op         CHAR(1)     NOT NULL,
+    row        JSONB       NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION cdc_capture_trg() RETURNS trigger AS $$
+BEGIN
+    -- Bo'lingan jadvallarda TG_TABLE_NAME bo'lim nomi bo'ladi, shuning uchun ota jadval nomi argumentda
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO cdc_outbox (table_name, op, row) VALUES (TG_ARGV[0], 'D', to_jsonb(OLD));
+    ELSE
+        INSERT INTO cdc_outbox (table_name, op, row) VALUES (TG_ARGV[0], left(TG_OP, 1), to_jsonb(NEW));
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+OUTBOX_REVERSE_SQL = """
+DROP FUNCTION IF EXISTS cdc_capture_trg() CASCADE;
+DROP TABLE IF EXISTS cdc_outbox;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_bazaar_vat_percent'),
+        ('stall', '0004_stall_daily_payment_limit'),
+        ('rent', '0004_auto_20251229_1609'),
+        ('shop', '0005_shopbalance'),
+        ('parking', '0007_alter_parkingprice_cash_receipts'),
+        ('payment', '0005_point_pointproduct'),
+    ]
+
+    operations = [
+        migrations.RunSQL(OUTBOX_SQL, reverse_sql=OUTBOX_REVERSE_SQL),
+    ] + [
+        migrations.RunSQL(
+            f"CREATE TRIGGER {table}_cdc AFTER INSERT OR UPDATE OR DELETE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION cdc_capture_trg('{table}');",
+            reverse_sql=f"DROP TRIGGER IF EXISTS {table}_cdc ON {table};",
+        )
+        for table in CDC_TABLES
+    ]
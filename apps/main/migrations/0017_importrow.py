@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0016_cdc_outbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('import_id', models.UUIDField(db_index=True)),
+                ('kind', models.CharField(max_length=10)),
+                ('line', models.IntegerField()),
+                ('number', models.CharField(max_length=20)),
+                ('owner', models.CharField(blank=True, default=None, max_length=200, null=True)),
+                ('price', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('bazaar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.bazaar')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Import qatori',
+                'verbose_name_plural': 'Import qatorlari',
+            },
+        ),
+    ]
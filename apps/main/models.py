@@ -8,6 +8,7 @@ from django.db import models
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from apps.main import workdays
 from smartbozor.translation import i18n
 
 ACCESS_TOKEN = os.environ.get("CONTROL_ACCESS_TOKEN")
@@ -112,15 +113,12 @@ class Bazaar(models.Model):
             self.payme_username) and bool(self.payme_password)
 
     def check_working_day(self, day):
-        if day > timezone.localtime().date():
-            return False
-
-        n = 1 << (day.isoweekday() - 1)
-        return bool(self.working_days & n)
+        return workdays.is_working_day(self, day)
 
     @property
     def is_working_day(self):
-        return self.check_working_day(timezone.localtime().today().date())
+        today = timezone.localtime().date()
+        return workdays.is_working_day(self, today, today)
 
     @property
     def working_days_display(self):
@@ -258,3 +256,23 @@ class Receipt(models.Model):
         managed = False
         verbose_name = _("Chek")
         verbose_name_plural = _("Cheklar")
+
+
+class ImportRow(models.Model):
+    """Excel importning tekshirilgan qatorlari (tasdiqlangunga qadar serverda saqlanadi)"""
+    KIND_STALL = "stall"
+    KIND_SHOP = "shop"
+
+    import_id = models.UUIDField(db_index=True)
+    kind = models.CharField(max_length=10)
+    user = models.ForeignKey("account.User", on_delete=models.CASCADE)
+    bazaar = models.ForeignKey(Bazaar, on_delete=models.CASCADE)
+    line = models.IntegerField()
+    number = models.CharField(max_length=20)
+    owner = models.CharField(max_length=200, null=True, blank=True, default=None)
+    price = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Import qatori")
+        verbose_name_plural = _("Import qatorlari")
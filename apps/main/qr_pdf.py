@@ -0,0 +1,287 @@
+import hashlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import fitz
+from PIL import Image
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from apps.main.models import Bazaar
+from apps.parking.models import Parking
+from apps.rent.models import ThingData, Thing
+from apps.shop.models import Shop
+from apps.stall.models import Stall
+from smartbozor.qrcode import QR_MARGIN_MM, QR_SIZE_MM, QR_TEXT_MARGIN_MM, QR_TITLE_MARGIN_MM, mm_to_px, qr_matrix, \
+    template_png, render_many
+
+DPI = 72
+SAVE_URL = "qr-codes/pdf"
+
+
+class QrVectorRenderer:
+    """
+    generate_qr_code'ning PDF varianti: shablon hujjatga bitta rasm sifatida bir marta qo'shiladi,
+    QR modullari va matnlar vektor bilan chiziladi. Har bir hujjat uchun alohida obyekt.
+    """
+    FONT_ALIAS = "qrfont"
+
+    def __init__(self, template="rasta-click.png", font_name="Orbitron-Black.ttf", template_scale=4):
+        self.template_stream, self.size = template_png(template, template_scale)
+        self.template_xref = 0
+        self.font_file = str(settings.BASE_DIR / "assets" / "fonts" / font_name)
+        self.font = fitz.Font(fontfile=self.font_file)
+        self.font_pages = set()
+
+    def draw(self, page, rect, data, title, text, *,
+             qr_code_top=QR_MARGIN_MM,
+             title_margin=QR_TITLE_MARGIN_MM,
+             text_margin=QR_TEXT_MARGIN_MM,
+             qr_code_size=QR_SIZE_MM,
+             title_font_size=100,
+             text_font_size=250,
+             ):
+        W, H = self.size
+
+        # insert_image(keep_proportion=True) kabi: markazda, proporsiya saqlanadi
+        scale = min(rect.width / W, rect.height / H)
+        ox = rect.x0 + (rect.width - W * scale) / 2
+        oy = rect.y0 + (rect.height - H * scale) / 2
+        target = fitz.Rect(ox, oy, ox + W * scale, oy + H * scale)
+        if self.template_xref:
+            page.insert_image(target, xref=self.template_xref)
+        else:
+            self.template_xref = page.insert_image(target, stream=self.template_stream)
+
+        matrix = qr_matrix(data)
+        qr_px = mm_to_px(qr_code_size)
+        x0 = ox + (W - qr_px) // 2 * scale
+        y0 = oy + mm_to_px(qr_code_top) * scale
+        cell = qr_px * scale / len(matrix)
+
+        shape = page.new_shape()
+        shape.draw_rect(fitz.Rect(x0, y0, x0 + qr_px * scale, y0 + qr_px * scale))
+        shape.finish(color=None, fill=(1, 1, 1), width=0)
+
+        # Qatordagi ketma-ket qora modullar bitta to'rtburchak
+        for r, row in enumerate(matrix):
+            c, n = 0, len(row)
+            while c < n:
+                if not row[c]:
+                    c += 1
+                    continue
+
+                start = c
+                while c < n and row[c]:
+                    c += 1
+                shape.draw_rect(fitz.Rect(x0 + start * cell, y0 + r * cell, x0 + c * cell, y0 + (r + 1) * cell))
+        shape.finish(color=None, fill=(0, 0, 0), width=0)
+        shape.commit()
+
+        if page.number not in self.font_pages:
+            page.insert_font(fontname=self.FONT_ALIAS, fontfile=self.font_file)
+            self.font_pages.add(page.number)
+
+        def draw_text(txt, size_px, margin_px):
+            size = size_px * scale
+            x = ox + (W * scale - self.font.text_length(txt, fontsize=size)) / 2
+            # Pillow matnni ascender chizig'idan, fitz esa baseline'dan joylashtiradi
+            y = oy + margin_px * scale + self.font.ascender * size
+            # Pillow stroke_width=3 tashqariga, PDF chizig'i esa o'rtadan: 6px, fontsize'ga nisbatan
+            page.insert_text((x, y), txt, fontsize=size, fontname=self.FONT_ALIAS,
+                             color=(0, 0, 0), fill=(1, 1, 1), render_mode=2, border_width=6 / size_px)
+
+        draw_text(title, title_font_size, title_margin)
+        draw_text(text, text_font_size, text_margin)
+
+
+
+
+class RentLabel:
+    def __init__(self, bazaar, thing, number):
+        self.bazaar = bazaar
+        self.bazaar_id = bazaar.id
+        self.thing = thing
+        self.thing_id = thing.id
+        self.number = number
+
+    @property
+    def qr_image_file(self):
+        return Thing.get_qr_img_file(self.bazaar, self.thing, self.number)
+
+    @property
+    def qr_label(self):
+        return Thing.get_qr_label(self.bazaar, self.thing, self.number)
+
+
+def load_stall_pdf_data(bazaar):
+    stall_list = list(Stall.objects.filter(section__area__bazaar_id=bazaar.id).order_by('id').prefetch_related("section__area").all())
+    def stall_map(stall):
+        return f"{stall.section.area_id}-{stall.section_id}-{stall.id}"
+
+    return stall_list, stall_map
+
+
+def load_shop_pdf_data(bazaar):
+    shop_list = list(Shop.objects.filter(section__area__bazaar_id=bazaar.id).order_by('id').prefetch_related("section__area").all())
+    def shop_map(shop):
+        return f"{shop.section.area_id}-{shop.section_id}-{shop.id}"
+
+    return shop_list, shop_map
+
+
+def load_rent_pdf_data(bazaar):
+    thing_data = list(ThingData.objects.prefetch_related("thing").filter(
+        bazaar_id=bazaar.id
+    ).order_by('thing_id').all())
+
+    rent_list = []
+    for thd in thing_data:
+        for number in range(1, thd.count + 1):
+            rent_list.append(RentLabel(bazaar, thd.thing, number))
+
+    def rent_map(thing):
+        return f"{thing.bazaar_id}-{thing.thing_id}-{thing.number}"
+
+    return rent_list, rent_map
+
+
+def load_parking_pdf_data(bazaar):
+    parking_list = list(Parking.objects.filter(
+        bazaar_id=bazaar.id
+    ).order_by("id").all())
+
+    def parking_map(parking):
+        return f"{parking.id}"
+
+    return parking_list, parking_map
+
+
+LOADERS = {
+    "stall": load_stall_pdf_data,
+    "shop": load_shop_pdf_data,
+    "rent": load_rent_pdf_data,
+    "parking": load_parking_pdf_data,
+}
+
+
+def add_cut_line(page, dash_mm=10, line_width_pt=0.7, color=(0, 0, 0)):
+    r = page.rect
+    x = (r.width / 2)
+    p1, p2 = (x, 0), (x, r.height)
+
+    page.draw_line(p1=p1, p2=p2, color=color, width=line_width_pt, dashes="[10 10] 0")
+
+
+def resize_image(image_file, x=2):
+    img = Image.open(image_file)
+    width, height = img.size
+    new_size = (width // x, height // x)
+    resized_img = img.resize(new_size, Image.LANCZOS)
+    buf = io.BytesIO()
+    resized_img.save(buf, format="PNG")
+    buf.seek(0)
+    resized_img.close()
+    return buf
+
+
+def get_sizes():
+    a4_w_pt, a4_h_pt = fitz.paper_size("a4-l")
+    a5_w_pt = 148 / 25.4 * DPI
+    a5_h_pt = 210 / 25.4 * DPI
+
+    return a4_w_pt, a4_h_pt, a5_w_pt, a5_h_pt, 0
+
+
+def build_pdf(prefix, bazaar_id, vector=False, progress=True, render_workers=1):
+    """Bitta bozorning bitta turdagi PDF'i. Natija: (bozor nomi, prefix, holat)"""
+    a4_w_pt, a4_h_pt, a5_w_pt, a5_h_pt, margin_pt = get_sizes()
+    save_path = settings.MEDIA_ROOT / SAVE_URL
+
+    bazaar = Bazaar.objects.get(pk=bazaar_id)
+    data_list, map_fn = LOADERS[prefix](bazaar)
+    # Rejim o'zgarsa PDF qayta yig'iladi
+    data_hash = hashlib.sha256(("-".join(sorted(map(map_fn, data_list))) + ("-vector" if vector else "")).encode()).hexdigest()
+    file_name = f"{prefix}-{timezone.localtime().date():%Y-%m-%d}-{data_hash}.pdf"
+
+    field_name = f"{prefix}_pdf"
+    pdf_file = getattr(bazaar, field_name)
+    if pdf_file:
+        if pdf_file.name.endswith(f"-{data_hash}.pdf"):
+            return bazaar.name, prefix, "already built"
+
+        if os.path.exists(pdf_file.path):
+            os.remove(pdf_file.path)
+
+    if not vector:
+        # Keshda yo'q PNG'lar oldindan (kerak bo'lsa parallel) yaratiladi
+        image_files = render_many([row.qr_label for row in data_list], workers=render_workers)
+
+    doc = fitz.open()
+    renderers = {}
+    idx = -1
+    for idx, row in enumerate(data_list):
+        if progress:
+            print(f"\t{prefix}: {idx + 1} / {len(data_list)}", end='\r')
+
+        if idx % 2 == 0:
+            page = doc.new_page(width=a4_w_pt, height=a4_h_pt)
+            rect = fitz.Rect(margin_pt, margin_pt, margin_pt + a5_w_pt, margin_pt + a5_h_pt)
+        else:
+            rect = fitz.Rect(margin_pt + a5_w_pt + margin_pt, margin_pt,
+                             margin_pt + a5_w_pt + margin_pt + a5_w_pt, margin_pt + a5_h_pt)
+
+        if vector:
+            template, data, title, text = row.qr_label
+            if template not in renderers:
+                renderers[template] = QrVectorRenderer(template)
+            renderers[template].draw(page, rect, data, title, text)
+        else:
+            page.insert_image(rect, stream=resize_image(image_files[idx], 4), keep_proportion=True)
+
+        if idx % 2 == 1:
+            add_cut_line(page)
+
+    if idx < 0:
+        return bazaar.name, prefix, "not found"
+
+    if vector:
+        doc.subset_fonts()
+    doc.save(save_path / file_name, garbage=4, deflate=True)
+    doc.close()
+
+    setattr(bazaar, field_name, SAVE_URL + "/" + file_name)
+    bazaar.save(update_fields=[field_name])
+    return bazaar.name, prefix, "saved"
+
+
+def _build_job(prefix, bazaar_id, vector):
+    try:
+        return build_pdf(prefix, bazaar_id, vector, progress=False)
+    finally:
+        connections.close_all()
+
+
+def build_all(prefixes, workers=1, vector=False):
+    bazaar_ids = list(Bazaar.objects.order_by('id').values_list("id", flat=True))
+
+    if workers <= 1:
+        for prefix in prefixes:
+            for bazaar_idx, bazaar_id in enumerate(bazaar_ids):
+                # Bozorlar ketma-ket, PNG'lar esa barcha yadrolarda
+                name, __, status = build_pdf(prefix, bazaar_id, vector, render_workers=None)
+                print(name, f"[{bazaar_idx + 1} / {len(bazaar_ids)}]", prefix, status + " " * 10)
+        return
+
+    jobs = [(prefix, bazaar_id) for prefix in prefixes for bazaar_id in bazaar_ids]
+
+    # Fork qilinganda ochiq ulanishlar bolalarga o'tmasligi kerak
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as executor:
+        futures = [executor.submit(_build_job, prefix, bazaar_id, vector) for prefix, bazaar_id in jobs]
+        for done_idx, future in enumerate(as_completed(futures)):
+            name, prefix, status = future.result()
+            print(f"[{done_idx + 1} / {len(jobs)}]", name, prefix, status)
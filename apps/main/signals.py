@@ -0,0 +1,37 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from apps.account.models import User
+from apps.main.models import Bazaar, District, Region
+from apps.rent.models import Thing
+from smartbozor import navigation
+
+
+@receiver(m2m_changed, sender=User.allowed_bazaar.through)
+def allowed_bazaar_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear", "pre_clear"):
+        return
+
+    if not reverse:
+        user_ids = [instance.pk]
+    elif action == "pre_clear":
+        # post_clear'da pk_set yo'q: kimlar bog'langanini oldindan olamiz
+        user_ids = list(instance.user_set.values_list("id", flat=True))
+    else:
+        user_ids = list(pk_set or ())
+
+    navigation.invalidate_user(*user_ids)
+    transaction.on_commit(lambda: navigation.invalidate_user(*user_ids))
+
+
+@receiver(post_save, sender=Bazaar)
+@receiver(post_delete, sender=Bazaar)
+@receiver(post_save, sender=District)
+@receiver(post_delete, sender=District)
+@receiver(post_save, sender=Region)
+@receiver(post_delete, sender=Region)
+@receiver(post_save, sender=Thing)
+@receiver(post_delete, sender=Thing)
+def navigation_changed(sender, **kwargs):
+    transaction.on_commit(navigation.invalidate_all)
@@ -0,0 +1,40 @@
+from django.db import connection, transaction
+
+from apps.main import health, importer
+from smartbozor.cdc import drain
+from smartbozor.celery import app
+from smartbozor.partition import PARTITIONED_TABLES, archive_partition, cold_partitions, ensure_partitions
+
+
+@app.task
+def maintain_partitions(archive=True):
+    for pt in PARTITIONED_TABLES:
+        with transaction.atomic(), connection.cursor() as cursor:
+            ensure_partitions(cursor, pt)
+
+        if not archive:
+            continue
+
+        with connection.cursor() as cursor:
+            cold = cold_partitions(cursor, pt)
+
+        for name, __, __ in cold:
+            archive_partition(pt, name)
+
+
+@app.task
+def drain_cdc_outbox(max_batches=100):
+    # Bitta ishga tushishda outbox'ning ko'p qismini bo'shatish, qolgani keyingi safar
+    for __ in range(max_batches):
+        if not drain():
+            break
+
+
+@app.task
+def cleanup_import_rows():
+    importer.cleanup()
+
+
+@app.task
+def probe_bazaars():
+    health.run_probe()
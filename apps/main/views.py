@@ -1,15 +1,25 @@
+import datetime
+import hmac
 import os
 import subprocess
+import time
 
 import requests
 from django.conf import settings
-from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from django.http import HttpResponse
+from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin, UserPassesTestMixin
+from django.http import HttpResponse, Http404, StreamingHttpResponse
+from django.shortcuts import redirect
+from django.views import View
 from django.views.generic import TemplateView
 from django_jinja.views.generic import DetailView
 
 from apps.camera.serializers import DeviceInfo
+from apps.main import health
 from apps.main.models import Bazaar
+from smartbozor import instrumentation
+from smartbozor.edge import edge_stream
+from smartbozor.mixins import AsyncPermissionRequiredMixin
+from smartbozor.qrcode import send_file
 
 
 ACCESS_TOKEN = os.environ.get("CONTROL_ACCESS_TOKEN")
@@ -25,7 +35,23 @@ class MainBazaarOnline(LoginRequiredMixin, PermissionRequiredMixin, TemplateView
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["result"] = Bazaar.check_online(False, check_files_count=True)
+        snapshot, uptime = health.latest_snapshot(), health.uptime()
+
+        result = []
+        for bazaar in Bazaar.objects.order_by("id").all():
+            row = snapshot.get(bazaar.id)
+            bazaar.files_count = row["files_count"] if row else "-"
+            bazaar.cameras_count = row["cameras_count"] if row else "-"
+            bazaar.states_count = row["states_count"] if row else "-"
+            bazaar.latency = row["latency"] if row else None
+            bazaar.checked_at = datetime.datetime.fromtimestamp(row["at"], tz=datetime.timezone.utc) if row else None
+            bazaar.is_stale = not row or time.time() - row["at"] > health.HEALTH_STALE_AFTER
+            bazaar.uptime = uptime.get(bazaar.id)
+            if row:
+                bazaar.is_online = row["online"]
+            result.append(bazaar)
+
+        context["result"] = result
         return context
 
 
@@ -145,21 +171,24 @@ class MainBazaarSmartBozorControl(LoginRequiredMixin, PermissionRequiredMixin, D
         return context
 
 
-class MainBazaarData(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
-    model = Bazaar
+class MainBazaarData(AsyncPermissionRequiredMixin, View):
     permission_required = "main.bazaar_online"
 
-    def render_to_response(self, context, **response_kwargs):
-        try:
-            resp = requests.get(f"http://{self.object.server_ip}:1984/snapshot/data/{self.kwargs['path']}", headers={
-                "Authorization": f"Bearer {ACCESS_TOKEN}"
-            }, timeout=10)
-            resp.raise_for_status()
+    async def get(self, request, pk, path):
+        bazaar = await Bazaar.objects.filter(pk=pk).only("id", "server_ip").afirst()
+        if bazaar is None:
+            raise Http404
 
-            return HttpResponse(resp.content, content_type=resp.headers['content-type'])
+        try:
+            upstream = await edge_stream(bazaar.server_ip, f"/snapshot/data/{path}")
         except Exception as e:
             return HttpResponse(str(e))
 
+        response = StreamingHttpResponse(upstream.body(), content_type=upstream.content_type)
+        if upstream.content_length:
+            response["Content-Length"] = upstream.content_length
+        return response
+
 
 class MainBazaarTestDiscovery(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
     model = Bazaar
@@ -202,3 +231,72 @@ class MainBazaarRunSnapshot(LoginRequiredMixin, PermissionRequiredMixin, DetailV
             context["error"] = str(exc)
 
         return context
+
+
+class MainBazaarQrPdf(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
+    model = Bazaar
+    permission_required = "main.view_bazaar"
+    KINDS = ("stall", "shop", "rent", "parking")
+
+    def render_to_response(self, context, **response_kwargs):
+        kind, name = self.kwargs["kind"], self.kwargs["name"]
+        if kind not in self.KINDS:
+            raise Http404
+
+        pdf_file = getattr(self.object, f"{kind}_pdf")
+        if not pdf_file or not os.path.exists(pdf_file.path):
+            raise Http404
+
+        # Fayl nomida ma'lumotlar xeshi bor: eski nom so'ralsa joriy faylga yo'naltiramiz
+        current = os.path.basename(pdf_file.name)
+        if name != current:
+            return redirect("main:bazaar-qr-pdf", self.object.id, kind, current)
+
+        data_hash = current.rsplit("-", 1)[-1].removesuffix(".pdf")
+        return send_file(self.request, settings.MEDIA_ROOT / pdf_file.name, "application/pdf", data_hash, immutable=True)
+
+
+class MainInstrumentationView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    template_name = 'main/instrumentation.j2'
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        try:
+            minutes = min(max(int(self.request.GET.get("minutes", 60)), 1), 120)
+        except ValueError:
+            minutes = 60
+
+        result = []
+        for name, row in instrumentation.window(minutes).items():
+            count = row["count"] or 1
+            result.append({
+                "name": name,
+                "count": int(row["count"]),
+                "queries": row["queries"] / count,
+                "duplicates": row["duplicates"] / count,
+                "db_ms": row["db_ms"] / count,
+                "time_ms": row["time_ms"] / count,
+                "over_budget": int(row["over_budget"]),
+                "similar": instrumentation.top_similar(name) if row["similar"] else [],
+            })
+
+        context["minutes"] = minutes
+        context["result"] = sorted(result, key=lambda r: r["queries"] * r["count"], reverse=True)
+        return context
+
+
+class MainMetricsView(View):
+    """Prometheus text format"""
+
+    def get(self, request, *args, **kwargs):
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        allowed = (settings.METRICS_TOKEN and hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode())) or \
+            (request.user.is_authenticated and request.user.is_staff)
+        if not allowed:
+            raise Http404
+
+        return HttpResponse(instrumentation.prometheus_text(), content_type="text/plain; version=0.0.4")
+
@@ -0,0 +1,96 @@
+import calendar
+import datetime
+from functools import lru_cache
+
+from django.utils import timezone
+
+# Bayram/qo'shimcha ish kunlari manbalari: callable(year, month) -> [(bazaar_id | None, date, is_working), ...]
+# bazaar_id=None barcha bozorlarga tegishli. Hot-path'lar (matritsa, is_working_day) o'zgarmaydi.
+OVERRIDE_SOURCES = []
+
+
+@lru_cache(maxsize=128)
+def weekday_bits(year, month):
+    """Oyning har bir kuni uchun Bazaar.working_days bitmaskidagi biti: 1 << (isoweekday - 1)"""
+    import numpy as np
+
+    md = calendar.monthrange(year, month)[1]
+    first = datetime.date(year, month, 1).weekday()
+    bits = np.left_shift(1, (np.arange(md) + first) % 7).astype(np.int32)
+    bits.flags.writeable = False
+    return bits
+
+
+def _overrides(year, month):
+    result = []
+    for source in OVERRIDE_SOURCES:
+        result.extend(source(year, month))
+    return result
+
+
+def working_matrix(bazaars, month, today=None):
+    """
+    (len(bazaars), oy kunlari) o'lchamli bool matritsa.
+    Bazaar.check_working_day bilan bir xil: kelajakdagi kunlar ish kuni hisoblanmaydi.
+    """
+    import numpy as np
+
+    today = today or timezone.localtime().date()
+    masks = np.fromiter((b.working_days or 0 for b in bazaars), dtype=np.int32, count=len(bazaars))
+    matrix = (masks[:, None] & weekday_bits(month.year, month.month)[None, :]) != 0
+
+    overrides = _overrides(month.year, month.month)
+    if overrides:
+        index = {b.id: i for i, b in enumerate(bazaars)}
+        for bazaar_id, day, is_working in overrides:
+            if bazaar_id is None:
+                matrix[:, day.day - 1] = is_working
+            elif bazaar_id in index:
+                matrix[index[bazaar_id], day.day - 1] = is_working
+
+    if (month.year, month.month) > (today.year, today.month):
+        matrix[:] = False
+    elif (month.year, month.month) == (today.year, today.month):
+        matrix[:, today.day:] = False
+
+    return matrix
+
+
+def working_days_count(bazaars, month, ds=1, de=None, today=None):
+    """Har bir bozor uchun [ds, de] oraliqdagi ish kunlari soni: {bazaar_id: n}"""
+    matrix = working_matrix(bazaars, month, today)
+    counts = matrix[:, ds - 1:de or matrix.shape[1]].sum(axis=1)
+    return {b.id: int(n) for b, n in zip(bazaars, counts)}
+
+
+def working_total_by_day(bazaars, weights, month, today=None):
+    """Kunlar bo'yicha ishlagan bozorlar og'irliklari yig'indisi (masalan rastalar soni): [int] * oy kunlari"""
+    import numpy as np
+
+    matrix = working_matrix(bazaars, month, today)
+    vector = np.fromiter((weights.get(b.id, 0) for b in bazaars), dtype=np.int64, count=len(bazaars))
+    return [int(n) for n in vector @ matrix]
+
+
+def is_working_day(bazaar, day, today=None):
+    today = today or timezone.localtime().date()
+    if day > today:
+        return False
+
+    result = None
+    for bazaar_id, override_day, is_working in _overrides(day.year, day.month):
+        if override_day == day and bazaar_id in (None, bazaar.id):
+            result = is_working
+
+    if result is not None:
+        return result
+
+    # weekday_bits bilan bir xil bit, numpy'siz (to'lov va ANPR yo'llarida)
+    return bool((bazaar.working_days or 0) & (1 << day.weekday()))
+
+
+def working_today(bazaars):
+    """Bugun ishlaydigan bozorlar"""
+    today = timezone.localtime().date()
+    matrix = working_matrix(bazaars, today, today)
+    return [b for b, ok in zip(bazaars, matrix[:, today.day - 1]) if ok]
@@ -1,5 +1,4 @@
 import hashlib
-import os
 import secrets
 import string
 
@@ -13,7 +12,7 @@ from django.utils.translation import gettext_lazy as _
 
 from apps.main.models import Bazaar
 from smartbozor.helpers import UploadTo, int_to_base36
-from smartbozor.qrcode import generate_qr_code
+from smartbozor.qrcode import qr_png_file
 
 ALPHABET = string.ascii_lowercase + string.digits
 
@@ -36,18 +35,11 @@ class Parking(models.Model):
 
     @property
     def qr_image_file(self):
-        cache_path = settings.MEDIA_ROOT / "qr-codes" / "parking" / str(self.id // 1000)
-        os.makedirs(cache_path, exist_ok=True)
+        return qr_png_file(*self.qr_label)
 
-        cache_file = cache_path / f"{self.qr_data}.png"
-        if os.path.exists(cache_file):
-            return cache_file
-
-        img = generate_qr_code("rasta-click.png", f"{settings.QR_CODE_LINK_HOST}/p/{self.qr_data}/", "AVTOTURARGOH", str(self.id))
-        img.save(cache_file, format="PNG", optimize=True, compress_level=9, dpi=(300, 300))
-        img.close()
-
-        return cache_file
+    @property
+    def qr_label(self):
+        return "rasta-click.png", f"{settings.QR_CODE_LINK_HOST}/p/{self.qr_data}/", "AVTOTURARGOH", str(self.id)
 
     @property
     def qr_data(self):
@@ -3,7 +3,6 @@ from types import SimpleNamespace
 from django.db.models import Count, Sum, Min
 from django.db.models.functions import Coalesce
 from django.utils import timezone
-from prompt_toolkit.validation import Validator
 
 from apps.parking.models import Parking, ParkingStatus
 from apps.rent.models import ThingData, ThingStatus
@@ -108,7 +107,7 @@ class ProviderRent:
             )
 
             if number > thing_data.count or number < 0:
-                raise Validator
+                raise ValueError
         except:
             raise ProviderException(-31050, "Stall not found")
 
@@ -30,7 +30,8 @@ from apps.payment.providers.payme_shop import PaymeShop
 from apps.payment.providers.payme_stall import PaymeStall
 from apps.payment.serializers import PaymentSerializer, ClickSerializer
 from apps.rent.models import ThingData, ThingStatus
-from apps.shop.models import Shop, ShopStatus, ShopPayment
+from apps.shop.balance import balance_by_shop, month_payments_by_shop
+from apps.shop.models import Shop
 from apps.stall.models import Stall, StallStatus
 from smartbozor.helpers import to_snake_case, run_clickhouse_sql, to_int
 
@@ -133,27 +134,12 @@ class PaymentQrShopView(PaymentQrScanMixin, TemplateView):
         context["shop"] = self.shop
         context["bazaar"] = self.shop.section.area.bazaar
 
-        context['total_rent'] = ShopStatus.objects.filter(
-            shop_id=self.shop.id
-        ).filter(is_occupied=True).aggregate(
-            total_amount=Coalesce(Sum("rent_price"), 0)
-        )["total_amount"]
-
-        context['total_payment'] = ShopPayment.objects.filter(
-            shop_id=self.shop.id
-        ).aggregate(
-            total_amount=Coalesce(Sum("amount"), 0)
-        )["total_amount"]
-
-        start = timezone.localtime().today().date().replace(day=1)
-        end = start + relativedelta(months=1, days=-1)
-
-        context['current_month_total_payment'] = ShopPayment.objects.filter(
-            shop_id=self.shop.id,
-            date__range=(start, end),
-        ).aggregate(
-            total_amount=Coalesce(Sum("amount"), 0)
-        )["total_amount"]
+        balance = balance_by_shop([self.shop.id]).get(self.shop.id)
+        context['total_rent'] = balance.rent_total if balance else 0
+        context['total_payment'] = balance.paid_total if balance else 0
+        context['current_month_total_payment'] = sum(
+            amount for __, amount in month_payments_by_shop([self.shop.id], timezone.localtime().date())[self.shop.id]
+        )
 
         payment_amount = 0
         try:
@@ -2,6 +2,7 @@ from django.core.management import BaseCommand
 from django.db import connection
 from django.utils import timezone
 
+from apps.main import workdays
 from apps.main.models import Bazaar
 from apps.rent.models import ThingStatus, ThingData
 
@@ -11,10 +12,7 @@ class Command(BaseCommand):
         thing_status_table = ThingStatus._meta.db_table
         thing_data_table = ThingData._meta.db_table
 
-        bazaars_id = []
-        for bazaar in Bazaar.objects.order_by('id').all():
-            if bazaar.is_working_day:
-                bazaars_id.append(bazaar.id)
+        bazaars_id = [bazaar.id for bazaar in workdays.working_today(list(Bazaar.objects.order_by('id').all()))]
 
         if not bazaars_id:
             print("Bugun bozorlar ishlamaydi")
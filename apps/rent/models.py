@@ -1,12 +1,10 @@
-import os
-
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 from apps.main.models import Bazaar
-from smartbozor.qrcode import generate_qr_code
+from smartbozor.qrcode import qr_png_file
 from smartbozor.translation import i18n
 
 
@@ -23,20 +21,14 @@ class Thing(models.Model):
         )
 
     @classmethod
-    def get_qr_img_file(cls, bazaar, thing, number):
-        cache_path = settings.MEDIA_ROOT / "qr-codes" / "rent" / str(bazaar.id // 1000)
-        os.makedirs(cache_path, exist_ok=True)
-
+    def get_qr_label(cls, bazaar, thing, number):
         qr_data = cls.get_qr_data(bazaar, thing, number)
-        cache_file = cache_path / f"{qr_data}.png"
-        if os.path.exists(cache_file):
-            return cache_file
+        # Faol tildan qat'i nazar bir xil yorliq (va kesh kaliti): har til uchun alohida PNG yaratilmasin
+        return "rasta-click.png", f"{settings.QR_CODE_LINK_HOST}/r/{qr_data}/", thing.name_uz.upper(), str(number)
 
-        img = generate_qr_code("rasta-click.png", f"{settings.QR_CODE_LINK_HOST}/r/{qr_data}/", thing.name.upper(), str(number))
-        img.save(cache_file, format="PNG", optimize=True, compress_level=9, dpi=(300, 300))
-        img.close()
-
-        return cache_file
+    @classmethod
+    def get_qr_img_file(cls, bazaar, thing, number):
+        return qr_png_file(*cls.get_qr_label(bazaar, thing, number))
 
     def __str__(self):
         return self.name
@@ -11,7 +11,7 @@ from humanize import intcomma
 from apps.main.models import Bazaar
 from apps.rent.forms import ThingCashForm
 from apps.rent.models import ThingData, ThingStatus, Thing
-from smartbozor.qrcode import render_qr_png_file
+from smartbozor.qrcode import serve_qr_png
 
 
 class RentBazaarChoice(LoginRequiredMixin, TemplateView):
@@ -222,7 +222,7 @@ class RentQrCode(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
         if self.kwargs.get('bazaar_id') not in bazaars_id:
             raise Http404
 
-        return ThingData.objects.get(
+        return ThingData.objects.select_related("bazaar", "thing").get(
             bazaar_id=self.kwargs.get('bazaar_id'),
             thing_id=self.kwargs.get('thing_id')
         )
@@ -232,4 +232,4 @@ class RentQrCode(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
         if self.kwargs['number'] > obj.count:
             raise Http404
 
-        return render_qr_png_file(obj.get_qr_image_file(self.kwargs.get('number')))
+        return serve_qr_png(self.request, Thing.get_qr_label(obj.bazaar, obj.thing, self.kwargs['number']))
@@ -0,0 +1,555 @@
+import csv
+import hashlib
+import importlib.util
+import json
+import os
+import time
+from collections import defaultdict
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db.models import Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+from django.utils.text import slugify
+from django.utils.translation import gettext_lazy as _
+
+from apps.main.models import Bazaar
+from apps.shop.models import Shop, ShopPayment
+from apps.stall.models import Stall
+from smartbozor.db_router import use_replica
+from smartbozor.helpers import uz_month
+from smartbozor.redis import REDIS_CLIENT
+
+FORMAT_XLSX = "xlsx"
+FORMAT_CSV = "csv"
+FORMAT_PARQUET = "parquet"
+
+CONTENT_TYPES = {
+    FORMAT_XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    FORMAT_CSV: "text/csv",
+    FORMAT_PARQUET: "application/vnd.apache.parquet",
+}
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+EXPORT_JOB_KEY = "export_job:{}"
+EXPORT_DIR = "exports"
+# Bir xil so'rov shu vaqt ichida qayta kelsa, tayyor fayl qaytariladi
+EXPORT_TTL = 10 * 60
+# Navbatdagi/ishlayotgan ish kaliti run_export time_limit (1 soat) va navbat kutishidan uzoqroq yashaydi
+EXPORT_JOB_TTL = 2 * 60 * 60
+EXPORT_ITERATOR_CHUNK = 2000
+
+EXPORTS = dict()
+
+
+def register_export(cls):
+    EXPORTS[cls.name] = cls
+    return cls
+
+
+def parquet_available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+class Export:
+    name = None
+    title = None
+    sheet_name = "Sheet"
+    formats = (FORMAT_XLSX, FORMAT_CSV, FORMAT_PARQUET)
+
+    # (sarlavha, kenglik, xlsx format nomi)
+    columns = []
+
+    def __init__(self, params):
+        self.params = params
+
+    @classmethod
+    def available_formats(cls):
+        return [f for f in cls.formats if f != FORMAT_PARQUET or parquet_available()]
+
+    def filename(self, fmt):
+        return "{}-{:%Y-%m-%d-%H-%M}.{}".format(slugify(str(self.title)), timezone.localtime(), fmt)
+
+    def get_columns(self):
+        return self.columns
+
+    def rows(self):
+        raise NotImplementedError
+
+    def xlsx_formats(self, workbook):
+        return {
+            "header": workbook.add_format({
+                'bg_color': '#263D54',
+                'bold': True,
+                'align': 'center',
+                'valign': 'vcenter',
+                'font_color': 'white',
+                'border': 1
+            }),
+            "uzs": workbook.add_format({
+                'num_format': '#,##0 "so\'m"',
+                'align': 'right'
+            }),
+            "number": workbook.add_format({
+                'num_format': '#,##0',
+                'align': 'right'
+            }),
+            "center": workbook.add_format({
+                "align": "center",
+            }),
+            "text": None,
+        }
+
+    def xlsx_options(self):
+        return {'constant_memory': True}
+
+    def write_xlsx(self, path):
+        import xlsxwriter
+
+        workbook = xlsxwriter.Workbook(path, self.xlsx_options())
+        worksheet = workbook.add_worksheet(name=self.sheet_name)
+        formats = self.xlsx_formats(workbook)
+
+        columns = self.get_columns()
+        for col, (title, width, __) in enumerate(columns):
+            worksheet.set_column(col, col, width=width)
+            worksheet.write(0, col, str(title), formats["header"])
+
+        column_formats = [formats[fmt] for __, __, fmt in columns]
+        for row, values in enumerate(self.rows(), start=1):
+            for col, value in enumerate(values):
+                worksheet.write(row, col, value, column_formats[col])
+
+        workbook.close()
+
+    def write_csv(self, path):
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow([str(title) for title, __, __ in self.get_columns()])
+            for values in self.rows():
+                writer.writerow(values)
+
+    def write_parquet(self, path, batch_size=50000):
+        if not parquet_available():
+            raise Exception(_("Parquet uchun pyarrow o'rnatilmagan"))
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        names = [str(title) for title, __, __ in self.get_columns()]
+        writer, batch = None, []
+
+        def flush():
+            nonlocal writer
+            table = pa.Table.from_pylist([dict(zip(names, values)) for values in batch])
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table.cast(writer.schema))
+
+        for values in self.rows():
+            batch.append(values)
+            if len(batch) >= batch_size:
+                flush()
+                batch = []
+
+        if batch or writer is None:
+            flush()
+        writer.close()
+
+    def write(self, path, fmt):
+        getattr(self, f"write_{fmt}")(path)
+
+
+@register_export
+class StallExport(Export):
+    name = "stall"
+    sheet_name = "Rastalar"
+    columns = [
+        (_("Rasta raqami"), 12, "center"),
+        (_("Narxi"), 12, "uzs"),
+    ]
+
+    def __init__(self, params):
+        super().__init__(params)
+        self.bazaar = Bazaar.objects.get(pk=params["bazaar_id"])
+        self.title = f"{self.bazaar}-rastalar"
+
+    def rows(self):
+        return Stall.objects.filter(
+            section__area__bazaar_id=self.bazaar.id
+        ).order_by('id').values_list("number", "price").iterator(chunk_size=EXPORT_ITERATOR_CHUNK)
+
+
+@register_export
+class ShopExport(Export):
+    name = "shop"
+    sheet_name = "Magazinlar"
+    months = 4
+
+    def __init__(self, params):
+        super().__init__(params)
+        self.bazaar = Bazaar.objects.get(pk=params["bazaar_id"])
+        self.title = f"{self.bazaar}-magazinlar"
+        self.header_data, self.payment_data = self.export_payment()
+
+    def export_payment(self):
+        end = timezone.localtime().date().replace(day=1)
+        start = end - relativedelta(months=self.months)
+        start_ = start
+
+        qs = ShopPayment.objects.filter(
+            shop__section__area__bazaar_id=self.bazaar.id,
+            date__gte=start,
+        ).exclude(
+            paid_at__isnull=True
+        ).annotate(
+            month=TruncMonth('date')
+        ).values("shop_id", "month", "payment_method").annotate(
+            total_amount=Coalesce(Sum("amount"), 0)
+        ).values_list("shop_id", "month", "payment_method", "total_amount")
+
+        header_data = []
+        while start <= end:
+            header_data.append(f"{uz_month(start)} {start:%Y}")
+            start += relativedelta(months=1)
+
+        payment_data = defaultdict(lambda: [[0, 0] for __ in header_data])
+
+        def months_between(d1, d2):
+            return (d2.year - d1.year) * 12 + (d2.month - d1.month)
+
+        for shop_id, month, pm, total in qs.iterator(chunk_size=EXPORT_ITERATOR_CHUNK):
+            idx = months_between(start_, month)
+            payment_data[shop_id][idx][0 if pm == Bazaar.PAYMENT_METHOD_CASH else 1] = total
+
+        return header_data, payment_data
+
+    def get_columns(self):
+        columns = [
+            (_("Magazin raqami"), 12, "center"),
+            (_("Tadbirkor"), 30, "text"),
+            (_("Ijara narxi"), 12, "uzs"),
+        ]
+        for title in self.header_data:
+            columns.append((f"{title} " + _("Naqd"), 12, "number"))
+            columns.append((f"{title} Click", 12, "number"))
+        return columns
+
+    def rows(self):
+        for shop_id, number, owner, rent_price in Shop.objects.filter(
+                section__area__bazaar_id=self.bazaar.id
+        ).order_by('id').values_list("id", "number", "owner", "rent_price").iterator(chunk_size=EXPORT_ITERATOR_CHUNK):
+            values = [number, owner, rent_price]
+            for cash, click in self.payment_data[shop_id]:
+                values.extend([cash, click])
+            yield values
+
+    def write_xlsx(self, path):
+        import xlsxwriter
+
+        workbook = xlsxwriter.Workbook(path, self.xlsx_options())
+        worksheet = workbook.add_worksheet(name=self.sheet_name)
+        formats = self.xlsx_formats(workbook)
+
+        worksheet.write(0, 0, str(_("Magazin raqami")), formats["header"])
+        worksheet.write(0, 1, str(_("Tadbirkor")), formats["header"])
+        worksheet.write(0, 2, str(_("Ijara narxi")), formats["header"])
+
+        for idx, title in enumerate(self.header_data):
+            worksheet.merge_range(0, 3 + 2 * idx, 0, 4 + 2 * idx, f"{title}\n" + _("Naqd | Click"), formats["header"])
+
+        worksheet.set_column(0, 0, width=12)
+        worksheet.set_column(1, 1, width=30)
+        worksheet.set_column(2, 2, width=12)
+        worksheet.set_column(3, 3 + 2 * len(self.header_data), width=12)
+
+        for row, values in enumerate(self.rows(), start=1):
+            worksheet.write(row, 0, values[0], formats["center"])
+            worksheet.write(row, 1, values[1])
+            worksheet.write(row, 2, values[2], formats["uzs"])
+            for col, value in enumerate(values[3:], start=3):
+                worksheet.write(row, col, value, formats["number"])
+
+        workbook.close()
+
+
+@register_export
+class RevenueExport(Export):
+    name = "revenue"
+    title = "jami-daromad"
+    formats = (FORMAT_XLSX,)
+
+    def get_context(self):
+        from django.contrib.auth import get_user_model
+        from apps.report.views import ReportTotalRevenueView
+
+        user = get_user_model().objects.get(pk=self.params["user_id"])
+        bazaars = list(user.allowed_bazaar.order_by('id').all())
+
+        context = {"bazaars": bazaars}
+        ReportTotalRevenueView.update_report(self.params["query"], bazaars, context)
+        return context
+
+    def write_xlsx(self, path):
+        import xlsxwriter
+        from xlsxwriter.utility import xl_col_to_name
+
+        context = self.get_context()
+
+        # Jadval bozorlar soni bilan cheklangan va ikki qatorli birlashtirilgan sarlavhalar bor,
+        # constant_memory rejimi esa bunday sarlavhalarni yo'qotadi
+        workbook = xlsxwriter.Workbook(path)
+        worksheet = workbook.add_worksheet(name="Jami daromad")
+
+        header_format = workbook.add_format({
+            'bg_color': '#263D54',
+            'bold': True,
+            'align': 'center',
+            'valign': 'vcenter',
+            'font_color': 'white',
+            'border': 1
+        })
+
+        uzs_format = workbook.add_format({
+            'num_format': '#,##0 "so\'m"',
+            'align': 'right'
+        })
+
+        text_right_format = workbook.add_format({
+            "align": "right",
+        })
+
+        text_center_format = workbook.add_format({
+            "align": "center",
+        })
+
+
+        worksheet.write(0, 0, str(_("HUJJAT YARATILGAN SANA:")), text_right_format)
+        worksheet.merge_range(0, 1, 0, 5, f"{timezone.localtime().now():%d.%m.%Y %H:%M}")
+
+        worksheet.write(1, 0, str(_("SANA:")), text_right_format)
+        worksheet.merge_range(1, 1, 1, 5, str(context["range_title"]))
+
+        table_row = 3
+        worksheet.merge_range(table_row, 0, table_row + 1, 0, str(_("Bozor nomi")), header_format)
+        worksheet.merge_range(table_row, 1, table_row + 1, 1, str(_("Ish kuni")), header_format)
+
+        things = context["things"]
+        things_header = [
+            [row.name, [_("Mavjud"), _("Band"), _("Narxi"), _("To'langan"), _("Jami tushum")]] for row in things
+        ]
+        thing_header_count = len(things_header[0][1])
+
+        header = [
+            [_("Rasta"), [_("Mavjud"), _("Band"), _("To'langan"), _("Jami tushum")]],
+            [_("Magazin"), [_("Mavjud"), _("To'langan"), _("Jami tushum")]],
+            *things_header,
+            [_("Avtoturargoh"), [ _("Avtomobil soni"), _("To'langan"), _("Jami tushum")]],
+            [_("JAMI"), [_("TO'LANGAN"), _("TUSHUM")]]
+        ]
+
+        header_col = 2
+        for title, sub_title in header:
+            worksheet.merge_range(table_row, header_col, table_row, header_col + len(sub_title) - 1, str(title), header_format)
+
+            for n, st in enumerate(sub_title):
+                col = header_col + n
+                worksheet.write(table_row + 1, col,  str(st), header_format)
+
+            header_col += len(sub_title)
+
+        last_col = sum([len(st) for __, st in header]) + 1
+        worksheet.set_column(0, 0, width=25)
+        worksheet.set_column(1, last_col, width=12)
+
+        working_days = context["working_days"]
+        stall_count, stall_occupied_total, stall_paid_total = context["stall_count"], context["stall_occupied_total"], context["stall_paid_total"]
+        shop_count, shop_paid_total, shop_occupied_total = context["shop_count"], context["shop_paid_total"], context["shop_occupied_total"]
+        rent_count, rent_occupied_total, rent_paid_total = context["rent_count"], context["rent_occupied_total"], context["rent_paid_total"]
+        parking = context["parking"]
+
+        bazaar_thing_pt = dict()
+        for key, value in rent_paid_total.items():
+            bazaar_id, thing_id, pm = map(int, key.split("-"))
+            if bazaar_id not in bazaar_thing_pt:
+                bazaar_thing_pt[bazaar_id] = dict()
+
+            bazaar_thing_pt[bazaar_id][thing_id] = bazaar_thing_pt[bazaar_id].get(thing_id, 0) + value
+
+        paid_cols, total_cols = [], []
+        for row, bazaar in enumerate(context['bazaars'], start=table_row + 2):
+            worksheet.write(row, 0, bazaar.name)
+            worksheet.write(row, 1, _("{0} kun").format(working_days.get(bazaar.id, 0)), text_center_format)
+            # Stall
+            stall_c = stall_count.get(bazaar.id, {})
+            stall_ot = stall_occupied_total.get(bazaar.id, {})
+            stall_pt, shop_pt = 0, 0
+
+            for pm in Bazaar.PAYMENT_METHOD_DICT.keys():
+                stall_pt += stall_paid_total.get(f"{bazaar.id}-{pm}", 0)
+                shop_pt += shop_paid_total.get(f"{bazaar.id}-{pm}", 0)
+
+            worksheet.write(row, 2, stall_c.get("count", 0), text_center_format)
+            worksheet.write(row, 3, f"{stall_ot.get('count', 0)} / {stall_c.get('total', 0)}", text_center_format)
+            worksheet.write(row, 4, stall_pt, uzs_format)
+            worksheet.write(row, 5, stall_ot.get("total", 0), uzs_format)
+
+            # Shop
+            worksheet.write(row, 6, shop_count.get(bazaar.id, 0), text_center_format)
+            worksheet.write(row, 7, shop_pt, uzs_format)
+            worksheet.write(row, 8, shop_occupied_total.get(bazaar.id, 0), uzs_format)
+
+            paid_cols, total_cols = [4, 7], [5, 8]
+            thing_pt = bazaar_thing_pt.get(bazaar.id, {})
+            for n, thing in enumerate(things):
+                col, key = 9 + thing_header_count * n, f"{bazaar.id}-{thing.id}"
+                thing_d = rent_count.get(key, {})
+                thing_ot = rent_occupied_total.get(key, {})
+                worksheet.write(row, col + 0, thing_d.get("count", 0), text_center_format)
+                worksheet.write(row, col + 1, f"{thing_ot.get('count', 0)} / {thing_d.get('total', 0)}", text_center_format)
+                worksheet.write(row, col + 2, thing_d.get("price", 0), uzs_format)
+                worksheet.write(row, col + 3, thing_pt.get(thing.id, 0), uzs_format)
+                worksheet.write(row, col + 4, thing_ot.get("total", 0), uzs_format)
+
+                paid_cols.append(col + 3)
+                total_cols.append(col + 4)
+
+            col = 9 + thing_header_count * len(things)
+            worksheet.write(row, col + 0, parking.get(bazaar.id, {}).get("paid_count", 0), text_center_format)
+            worksheet.write(row, col + 1, parking.get(bazaar.id, {}).get("total_paid", 0), uzs_format)
+            worksheet.write(row, col + 2, parking.get(bazaar.id, {}).get("total", 0), uzs_format)
+
+            paid_cols.append(col + 1)
+            total_cols.append(col + 2)
+
+            paid_sum_args = ",".join([f"{xl_col_to_name(c)}{row + 1}" for c in paid_cols])
+            worksheet.write_formula(row, col + 3, f"=SUM({paid_sum_args})", uzs_format)
+
+            total_sum_args = ",".join([f"{xl_col_to_name(c)}{row + 1}" for c in total_cols])
+            worksheet.write_formula(row, col + 4, f"=SUM({total_sum_args})", uzs_format)
+
+        row = table_row + len(context["bazaars"]) + 3
+        col = 9 + thing_header_count * len(things) + 3
+        worksheet.write(row, 0, str(_("JAMI")))
+
+        for col in paid_cols + total_cols + [col, col + 1]:
+            col_name = xl_col_to_name(col)
+            worksheet.write_formula(row, col, f"=SUM({col_name}{table_row + 3}:{col_name}{row})", uzs_format)
+
+        workbook.close()
+
+
+def job_key(user_id, name, params, fmt):
+    raw = json.dumps([user_id, name, params, fmt], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def job_path(key, fmt):
+    return os.path.join(settings.MEDIA_ROOT, EXPORT_DIR, f"{key}.{fmt}")
+
+
+def get_job(key):
+    data = REDIS_CLIENT.hgetall(EXPORT_JOB_KEY.format(key))
+    if not data:
+        return None
+
+    job = {k.decode(): v.decode() for k, v in data.items()}
+    job["params"] = json.loads(job.get("params", "{}"))
+    return job
+
+
+def start_export(user, name, params, fmt):
+    from apps.report.tasks import run_export
+
+    if name not in EXPORTS or fmt not in EXPORTS[name].available_formats():
+        raise ValueError(f"Unknown export: {name}.{fmt}")
+
+    key = job_key(user.id, name, params, fmt)
+    redis_key = EXPORT_JOB_KEY.format(key)
+
+    # Bir xil so'rovlar bitta ishga birlashadi, navbatdagi yoki tayyor ish qayta ishga tushirilmaydi
+    if not REDIS_CLIENT.hsetnx(redis_key, "status", STATUS_PENDING):
+        job = get_job(key)
+        if job and (job["status"] in (STATUS_PENDING, STATUS_RUNNING) or (
+                job["status"] == STATUS_DONE and os.path.exists(job_path(key, fmt)))):
+            return key
+
+        REDIS_CLIENT.hset(redis_key, "status", STATUS_PENDING)
+
+    REDIS_CLIENT.hset(redis_key, mapping={
+        "user_id": user.id,
+        "name": name,
+        "format": fmt,
+        "params": json.dumps(params, default=str),
+        "created_at": int(time.time()),
+        "error": "",
+        "filename": "",
+    })
+    REDIS_CLIENT.expire(redis_key, EXPORT_JOB_TTL)
+
+    run_export.delay(key)
+    return key
+
+
+# Kalit muddati o'tgan bo'lsa qayta yaratilmaydi (user_id'siz hash qolmasin)
+_UPDATE_JOB_SCRIPT = REDIS_CLIENT.register_script("""
+if redis.call("EXISTS", KEYS[1]) == 1 then
+    redis.call("HSET", KEYS[1], unpack(ARGV, 2))
+    redis.call("EXPIRE", KEYS[1], ARGV[1])
+    return 1
+end
+return 0
+""")
+
+
+def update_job(redis_key, ttl, **fields):
+    args = [ttl]
+    for name, value in fields.items():
+        args += [name, value]
+
+    return bool(_UPDATE_JOB_SCRIPT(keys=[redis_key], args=args))
+
+
+def execute_job(key):
+    job = get_job(key)
+    if job is None:
+        return
+
+    redis_key = EXPORT_JOB_KEY.format(key)
+    if not update_job(redis_key, EXPORT_JOB_TTL, status=STATUS_RUNNING):
+        return
+
+    fmt = job["format"]
+    path = job_path(key, fmt)
+    tmp_path = path + ".tmp"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    try:
+        with use_replica():
+            export = EXPORTS[job["name"]](job["params"])
+            export.write(tmp_path, fmt)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        update_job(redis_key, EXPORT_TTL, status=STATUS_FAILED, error=str(e))
+        raise
+
+    update_job(redis_key, EXPORT_TTL, status=STATUS_DONE, filename=export.filename(fmt))
+
+
+def cleanup_exports(max_age=EXPORT_TTL * 2):
+    export_dir = os.path.join(settings.MEDIA_ROOT, EXPORT_DIR)
+    if not os.path.isdir(export_dir):
+        return
+
+    now = time.time()
+    for name in os.listdir(export_dir):
+        path = os.path.join(export_dir, name)
+        if now - os.path.getmtime(path) > max_age:
+            os.remove(path)
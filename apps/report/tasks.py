@@ -0,0 +1,8 @@
+from apps.report.exports import execute_job, cleanup_exports
+from smartbozor.celery import app
+
+
+@app.task(ignore_result=True, time_limit=60 * 60, soft_time_limit=55 * 60)
+def run_export(key):
+    cleanup_exports()
+    execute_job(key)
@@ -1,3 +1,34 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import Permission
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.account.models import User
+from apps.main.models import Region, District, Bazaar
+from apps.rent.models import Thing, ThingData
+
+
+class ScanHeatObjectsTest(TestCase):
+    def setUp(self):
+        region = Region.objects.create(name_uz="Toshkent")
+        district = District.objects.create(region=region, name_uz="Chilonzor")
+        self.bazaar = Bazaar.objects.create(district=district, name_uz="Bozor", slug="bozor")
+
+        thing = Thing.objects.create(name_uz="Arava")
+        self.thing_data = ThingData.objects.create(thing=thing, bazaar=self.bazaar, count=5, price=1000)
+
+        self.user = User.objects.create_user("report", password="report")
+        self.user.user_permissions.add(Permission.objects.get(codename="can_view_total_scan"))
+        self.user.allowed_bazaar.add(self.bazaar)
+        self.client.force_login(self.user)
+
+    def test_rent_type(self):
+        objects = mock.Mock(result_rows=[(self.thing_data.id, 3, timezone.now() - datetime.timedelta(hours=1))])
+        hours = mock.Mock(result_rows=[(9, 3)])
+        with mock.patch("apps.report.views.run_clickhouse_sql", side_effect=[objects, hours]):
+            response = self.client.get(reverse("report:scan-heat-objects", args=[self.bazaar.id]), {"type": "r"})
 
-# Create your tests here.
+        self.assertContains(response, "<td>Arava</td>")
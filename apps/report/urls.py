@@ -1,10 +1,14 @@
 from django.urls import path
 
-from apps.report.views import ReportTotalRevenueView, ReportTotalScanView, ReportTotalClick
+from apps.report.views import ReportTotalRevenueView, ReportTotalScanView, ReportTotalClick, ReportExportView, \
+    ReportScanHeatView, ReportScanHeatObjectsView
 
 app_name = 'report'
 urlpatterns = [
     path("total-revenue/", ReportTotalRevenueView.as_view(), name="total-revenue"),
     path("total-scan/", ReportTotalScanView.as_view(), name="total-scan"),
+    path("scan-heat/", ReportScanHeatView.as_view(), name="scan-heat"),
+    path("scan-heat/<int:pk>/", ReportScanHeatObjectsView.as_view(), name="scan-heat-objects"),
     path("total-click/", ReportTotalClick.as_view(), name="total-click"),
+    path("export/<str:key>/", ReportExportView.as_view(), name="export"),
 ]
\ No newline at end of file
@@ -1,39 +1,46 @@
-import datetime
-from io import BytesIO
+import os
 
-import xlsxwriter
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.db.models import Sum, F, Case, When, Q, Count
 from django.db.models.functions import Coalesce
-from django.http import HttpResponse
-from django.utils import timezone
-from django.utils.text import slugify
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import redirect
+from django.urls import reverse
 from django.views.generic import TemplateView
 from django.utils.translation import gettext_lazy as _
-from xlsxwriter.utility import xl_col_to_name
 
 from apps.dashboard.filters import MonthFilter
+from apps.main import workdays
 from apps.main.models import Bazaar
-from apps.parking.models import ParkingStatus
+from apps.parking.models import ParkingStatus, Parking
 from apps.rent.models import ThingStatus, Thing, ThingData
+from apps.report.exports import FORMAT_XLSX, RevenueExport, start_export, get_job, job_path, CONTENT_TYPES, \
+    STATUS_DONE, STATUS_FAILED
 from apps.report.filter import ClickFilter
 from apps.shop.models import ShopPayment, ShopStatus, Shop
 from apps.stall.models import StallStatus, Stall
-from smartbozor.helpers import DayWeekCalendar, run_clickhouse_sql, range_d
-from smartbozor.mixins import NormalizeDataMixin
+from smartbozor.fanout import fanout
+from smartbozor.helpers import DayWeekCalendar, run_clickhouse_sql, bounds_d
+from smartbozor.mixins import NormalizeDataMixin, ReadReplicaMixin
 
 
-class ReportTotalRevenueView(NormalizeDataMixin, LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+class ReportTotalRevenueView(NormalizeDataMixin, LoginRequiredMixin, PermissionRequiredMixin, ReadReplicaMixin, TemplateView):
     TITLE = _("Jami daromad")
 
     template_name = 'report/total-revenue.j2'
     permission_required = 'report.can_view_total_revenue'
 
-    def render_to_response(self, context, **response_kwargs):
-        if self.request.GET.get("export", '0') == '1':
-            return self.export(context)
+    def get(self, request, *args, **kwargs):
+        if request.GET.get("export", '0') == '1':
+            params = request.GET.dict()
+            params.pop("export", None)
+            key = start_export(request.user, RevenueExport.name, {
+                "user_id": request.user.id,
+                "query": params,
+            }, FORMAT_XLSX)
+            return redirect("report:export", key)
 
-        return super().render_to_response(context, **response_kwargs)
+        return super().get(request, *args, **kwargs)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -42,300 +49,144 @@ class ReportTotalRevenueView(NormalizeDataMixin, LoginRequiredMixin, PermissionR
 
         context["bazaars"] = bazaars
 
-        self.update_report(self.request, bazaars, context)
+        self.update_report(self.request.GET.dict(), bazaars, context)
 
         return context
 
-    def export(self, context):
-        xls = BytesIO()
-
-        workbook = xlsxwriter.Workbook(xls, {'in_memory': True})
-        worksheet = workbook.add_worksheet(name="Jami daromad")
-
-        header_format = workbook.add_format({
-            'bg_color': '#263D54',
-            'bold': True,
-            'align': 'center',
-            'valign': 'vcenter',
-            'font_color': 'white',
-            'border': 1
-        })
-
-        uzs_format = workbook.add_format({
-            'num_format': '#,##0 "so\'m"',
-            'align': 'right'
-        })
-
-        text_right_format = workbook.add_format({
-            "align": "right",
-        })
-
-        text_center_format = workbook.add_format({
-            "align": "center",
-        })
-
-
-        worksheet.write(0, 0, str(_("HUJJAT YARATILGAN SANA:")), text_right_format)
-        worksheet.merge_range(0, 1, 0, 5, f"{timezone.localtime().now():%d.%m.%Y %H:%M}")
-
-        worksheet.write(1, 0, str(_("SANA:")), text_right_format)
-        worksheet.merge_range(1, 1, 1, 5, str(context["range_title"]))
-
-        table_row = 3
-        worksheet.merge_range(table_row, 0, table_row + 1, 0, str(_("Bozor nomi")), header_format)
-        worksheet.merge_range(table_row, 1, table_row + 1, 1, str(_("Ish kuni")), header_format)
-
-        things = context["things"]
-        things_header = [
-            [row.name, [_("Mavjud"), _("Band"), _("Narxi"), _("To'langan"), _("Jami tushum")]] for row in things
-        ]
-        thing_header_count = len(things_header[0][1])
-
-        header = [
-            [_("Rasta"), [_("Mavjud"), _("Band"), _("To'langan"), _("Jami tushum")]],
-            [_("Magazin"), [_("Mavjud"), _("To'langan"), _("Jami tushum")]],
-            *things_header,
-            [_("Avtoturargoh"), [ _("Avtomobil soni"), _("To'langan"), _("Jami tushum")]],
-            [_("JAMI"), [_("TO'LANGAN"), _("TUSHUM")]]
-        ]
-
-        header_col = 2
-        for title, sub_title in header:
-            worksheet.merge_range(table_row, header_col, table_row, header_col + len(sub_title) - 1, str(title), header_format)
-
-            for n, st in enumerate(sub_title):
-                col = header_col + n
-                worksheet.write(table_row + 1, col,  str(st), header_format)
-
-            header_col += len(sub_title)
-
-        last_col = sum([len(st) for __, st in header]) + 1
-        worksheet.set_column(0, 0, width=25)
-        worksheet.set_column(1, last_col, width=12)
-
-        working_days = context["working_days"]
-        stall_count, stall_occupied_total, stall_paid_total = context["stall_count"], context["stall_occupied_total"], context["stall_paid_total"]
-        shop_count, shop_paid_total, shop_occupied_total = context["shop_count"], context["shop_paid_total"], context["shop_occupied_total"]
-        rent_count, rent_occupied_total, rent_paid_total = context["rent_count"], context["rent_occupied_total"], context["rent_paid_total"]
-        parking = context["parking"]
-
-        bazaar_thing_pt = dict()
-        for key, value in rent_paid_total.items():
-            bazaar_id, thing_id, pm = map(int, key.split("-"))
-            if bazaar_id not in bazaar_thing_pt:
-                bazaar_thing_pt[bazaar_id] = dict()
-
-            bazaar_thing_pt[bazaar_id][thing_id] = bazaar_thing_pt[bazaar_id].get(thing_id, 0) + value
-
-        paid_cols, total_cols = [], []
-        for row, bazaar in enumerate(context['bazaars'], start=table_row + 2):
-            worksheet.write(row, 0, bazaar.name)
-            worksheet.write(row, 1, _("{0} kun").format(working_days.get(bazaar.id, 0)), text_center_format)
-            # Stall
-            stall_c = stall_count.get(bazaar.id, {})
-            stall_ot = stall_occupied_total.get(bazaar.id, {})
-            stall_pt, shop_pt = 0, 0
-
-            for pm in Bazaar.PAYMENT_METHOD_DICT.keys():
-                stall_pt += stall_paid_total.get(f"{bazaar.id}-{pm}", 0)
-                shop_pt += shop_paid_total.get(f"{bazaar.id}-{pm}", 0)
-
-            worksheet.write(row, 2, stall_c.get("count", 0), text_center_format)
-            worksheet.write(row, 3, f"{stall_ot.get('count', 0)} / {stall_c.get('total', 0)}", text_center_format)
-            worksheet.write(row, 4, stall_pt, uzs_format)
-            worksheet.write(row, 5, stall_ot.get("total", 0), uzs_format)
-
-            # Shop
-            worksheet.write(row, 6, shop_count.get(bazaar.id, 0), text_center_format)
-            worksheet.write(row, 7, shop_pt, uzs_format)
-            worksheet.write(row, 8, shop_occupied_total.get(bazaar.id, 0), uzs_format)
-
-            paid_cols, total_cols = [4, 7], [5, 8]
-            thing_pt = bazaar_thing_pt.get(bazaar.id, {})
-            for n, thing in enumerate(things):
-                col, key = 9 + thing_header_count * n, f"{bazaar.id}-{thing.id}"
-                thing_d = rent_count.get(key, {})
-                thing_ot = rent_occupied_total.get(key, {})
-                worksheet.write(row, col + 0, thing_d.get("count", 0), text_center_format)
-                worksheet.write(row, col + 1, f"{thing_ot.get('count', 0)} / {thing_d.get('total', 0)}", text_center_format)
-                worksheet.write(row, col + 2, thing_d.get("price", 0), uzs_format)
-                worksheet.write(row, col + 3, thing_pt.get(thing.id, 0), uzs_format)
-                worksheet.write(row, col + 4, thing_ot.get("total", 0), uzs_format)
-
-                paid_cols.append(col + 3)
-                total_cols.append(col + 4)
-
-            col = 9 + thing_header_count * len(things)
-            worksheet.write(row, col + 0, parking.get(bazaar.id, {}).get("paid_count", 0), text_center_format)
-            worksheet.write(row, col + 1, parking.get(bazaar.id, {}).get("total_paid", 0), uzs_format)
-            worksheet.write(row, col + 2, parking.get(bazaar.id, {}).get("total", 0), uzs_format)
-
-            paid_cols.append(col + 1)
-            total_cols.append(col + 2)
-
-            paid_sum_args = ",".join([f"{xl_col_to_name(c)}{row + 1}" for c in paid_cols])
-            worksheet.write_formula(row, col + 3, f"=SUM({paid_sum_args})", uzs_format)
-
-            total_sum_args = ",".join([f"{xl_col_to_name(c)}{row + 1}" for c in total_cols])
-            worksheet.write_formula(row, col + 4, f"=SUM({total_sum_args})", uzs_format)
-
-        row = table_row + len(context["bazaars"]) + 3
-        col = 9 + thing_header_count * len(things) + 3
-        worksheet.write(row, 0, str(_("JAMI")))
-
-        for col in paid_cols + total_cols + [col, col + 1]:
-            col_name = xl_col_to_name(col)
-            worksheet.write_formula(row, col, f"=SUM({col_name}{table_row + 3}:{col_name}{row})", uzs_format)
-
-        workbook.close()
-
-        xls.seek(0)
-
-        name = "jami-daromad"
-        response = HttpResponse(xls, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'inline; filename="{}-{:%Y-%m-%d-%H-%M}.xlsx"'.format(
-            slugify(name),
-            datetime.datetime.now()
-        )
-
-        return response
-
     @classmethod
-    def update_report(cls, request, bazaars, context):
+    def update_report(cls, params, bazaars, context):
         if not bazaars:
             return
 
-        data, months, selected_month = cls.normalize_data(request.GET.dict())
-        bazaars_id, working_days = [], dict()
-        for bazaar in bazaars:
-            bazaars_id.append(bazaar.id)
-
-            for day in range_d(selected_month, data["d"]):
-                working_days[bazaar.id] = working_days.get(bazaar.id, 0) + (1 if bazaar.check_working_day(day) else 0)
+        data, months, selected_month = cls.normalize_data(params)
+        bazaars_id = [bazaar.id for bazaar in bazaars]
+        working_days = workdays.working_days_count(bazaars, selected_month, *bounds_d(selected_month, data["d"]))
 
         context["working_days"] = working_days
 
-        context["stall_count"] = {
-            row["bazaar_id"]: {
-                "count": row["count"],
-                "total": working_days.get(row["bazaar_id"], 0) * row["count"]
-            } for row in Stall.objects.annotate(
+        rows = fanout({
+            "stall_count": Stall.objects.annotate(
                 bazaar_id=F("section__area__bazaar_id")
             ).filter(bazaar_id__in=bazaars_id).values("bazaar_id").annotate(
                 count=Count("id")
-            ).values("bazaar_id", "count")
-        }
-
-        context["stall_occupied_total"] = {
-            row["bazaar_id"]: row for row in
-            MonthFilter(data, queryset=StallStatus.objects.filter(
+            ).values("bazaar_id", "count"),
+            "stall_occupied_total": MonthFilter(data, queryset=StallStatus.objects.filter(
                 stall__section__area__bazaar_id__in=bazaars_id
             )).qs.filter(is_occupied=True).values(
                 bazaar_id=F("stall__section__area__bazaar_id"),
             ).annotate(
                 count=Count("id"),
                 total=Coalesce(Sum("price"), 0)
-            ).values("bazaar_id", "total", "count")
-        }
-
-        context["stall_paid_total"] = {
-            f"{row['bazaar_id']}-{row['pm']}": row["total"] for row in
-            MonthFilter(data, queryset=StallStatus.objects.filter(
+            ).values("bazaar_id", "total", "count"),
+            "stall_paid_total": MonthFilter(data, queryset=StallStatus.objects.filter(
                 stall__section__area__bazaar_id__in=bazaars_id
             )).qs.filter(is_paid=True).values(
                 bazaar_id=F("stall__section__area__bazaar_id"),
                 pm=F("payment_method")
             ).annotate(
                 total=Coalesce(Sum("price"), 0)
-            ).values("bazaar_id", "pm", "total")
-        }
-
-        context["shop_count"] = {
-            row["bazaar_id"]: row["count"] for row in Shop.objects.annotate(
+            ).values("bazaar_id", "pm", "total"),
+            "shop_count": Shop.objects.annotate(
                 bazaar_id=F("section__area__bazaar_id")
             ).filter(bazaar_id__in=bazaars_id).values("bazaar_id").annotate(
                 count=Count("id")
-            ).values("bazaar_id", "count")
-        }
-
-        context["shop_occupied_total"] = {
-            row["bazaar_id"]: row["total"] for row in
-            MonthFilter(data, apply_d=False, queryset=ShopStatus.objects.filter(
+            ).values("bazaar_id", "count"),
+            "shop_occupied_total": MonthFilter(data, apply_d=False, queryset=ShopStatus.objects.filter(
                 shop__section__area__bazaar_id__in=bazaars_id
             )).qs.values(
                 bazaar_id=F("shop__section__area__bazaar_id"),
             ).annotate(
                 total=Coalesce(Sum("rent_price"), 0)
-            ).values("bazaar_id", "total")
-        }
-
-        context["shop_paid_total"] = {
-            f"{row['bazaar_id']}-{row['pm']}": row["total"] for row in
-            MonthFilter(data, queryset=ShopPayment.objects.filter(
+            ).values("bazaar_id", "total"),
+            "shop_paid_total": MonthFilter(data, queryset=ShopPayment.objects.filter(
                 shop__section__area__bazaar_id__in=bazaars_id
             )).qs.values(
                 bazaar_id=F("shop__section__area__bazaar_id"),
                 pm=F("payment_method")
             ).annotate(
                 total=Coalesce(Sum("amount"), 0)
-            ).values("bazaar_id", "pm", "total")
+            ).values("bazaar_id", "pm", "total"),
+            "things": Thing.objects.order_by("id").all(),
+            "rent_count": ThingData.objects.filter(
+                bazaar_id__in=bazaars_id
+            ).all(),
+            "rent_occupied_total": MonthFilter(data, queryset=ThingStatus.objects.filter(
+                bazaar_id__in=bazaars_id
+            )).qs.filter(is_occupied=True).values(
+                "bazaar_id", "thing_id"
+            ).annotate(
+                count=Count("thing_id"),
+                total=Coalesce(Sum("price"), 0)
+            ).values("bazaar_id", "thing_id", "total", "count"),
+            "rent_paid_total": MonthFilter(data, queryset=ThingStatus.objects.filter(
+                bazaar_id__in=bazaars_id
+            )).qs.filter(is_paid=True).values(
+                "bazaar_id", "thing_id", pm=F("payment_method")
+            ).annotate(
+                total=Coalesce(Sum("price"), 0)
+            ).values("bazaar_id", "thing_id", "pm", "total"),
+            "parking": MonthFilter(data, queryset=ParkingStatus.objects.filter(
+                parking__bazaar_id__in=bazaars_id
+            )).qs.values(
+                bazaar_id=F("parking__bazaar_id"),
+            ).annotate(
+                free_count=Count("id", filter=Q(price=0), distinct=True),
+                paid_count=Count("id", filter=Q(price__gt=0), distinct=True),
+                unknown_count=Count("id", filter=Q(number=ParkingStatus.LICENSE_PLATE_UNKNOWN), distinct=True),
+                total=Sum("price"),
+                total_paid_cash=Sum(Case(When(Q(is_paid=True) & Q(payment_method=Bazaar.PAYMENT_METHOD_CASH), then=F("price")), default=0)),
+                total_paid_click=Sum(Case(When(Q(is_paid=True) & Q(payment_method=Bazaar.PAYMENT_METHOD_CLICK), then=F("price")), default=0)),
+                total_paid_payme=Sum(Case(When(Q(is_paid=True) & Q(payment_method=Bazaar.PAYMENT_METHOD_PAYME), then=F("price")), default=0)),
+                total_paid=Sum(Case(When(is_paid=True, then=F("price")), default=0)),
+            ).values("bazaar_id", "free_count", "paid_count", "unknown_count", "total", "total_paid", "total_paid_cash", "total_paid_click", "total_paid_payme"),
+        })
+
+        context["stall_count"] = {
+            row["bazaar_id"]: {
+                "count": row["count"],
+                "total": working_days.get(row["bazaar_id"], 0) * row["count"]
+            } for row in rows["stall_count"]
+        }
+
+        context["stall_occupied_total"] = {row["bazaar_id"]: row for row in rows["stall_occupied_total"]}
+
+        context["stall_paid_total"] = {
+            f"{row['bazaar_id']}-{row['pm']}": row["total"] for row in rows["stall_paid_total"]
         }
 
-        context["things"] = Thing.objects.order_by("id").all()
+        context["shop_count"] = {row["bazaar_id"]: row["count"] for row in rows["shop_count"]}
+
+        context["shop_occupied_total"] = {row["bazaar_id"]: row["total"] for row in rows["shop_occupied_total"]}
+
+        context["shop_paid_total"] = {
+            f"{row['bazaar_id']}-{row['pm']}": row["total"] for row in rows["shop_paid_total"]
+        }
+
+        context["things"] = rows["things"]
 
         context["rent_count"] = {
             f"{row.bazaar_id}-{row.thing_id}": {
                 "price": row.price,
                 "count": row.count,
                 "total": working_days.get(row.bazaar_id, 0) * row.count
-            } for row in ThingData.objects.filter(
-                bazaar_id__in=bazaars_id
-            ).all()
+            } for row in rows["rent_count"]
         }
 
         context["rent_occupied_total"] = {
-            f"{row['bazaar_id']}-{row['thing_id']}": row for row in
-            MonthFilter(data, queryset=ThingStatus.objects.filter(
-                bazaar_id__in=bazaars_id
-            )).qs.filter(is_occupied=True).values(
-                "bazaar_id", "thing_id"
-            ).annotate(
-                count=Count("thing_id"),
-                total=Coalesce(Sum("price"), 0)
-            ).values("bazaar_id", "thing_id", "total", "count")
+            f"{row['bazaar_id']}-{row['thing_id']}": row for row in rows["rent_occupied_total"]
         }
 
         context["rent_paid_total"] = {
-            f"{row['bazaar_id']}-{row['thing_id']}-{row['pm']}": row["total"] for row in
-            MonthFilter(data, queryset=ThingStatus.objects.filter(
-                bazaar_id__in=bazaars_id
-            )).qs.filter(is_paid=True).values(
-                "bazaar_id", "thing_id", pm=F("payment_method")
-            ).annotate(
-                total=Coalesce(Sum("price"), 0)
-            ).values("bazaar_id", "thing_id", "pm", "total")
+            f"{row['bazaar_id']}-{row['thing_id']}-{row['pm']}": row["total"] for row in rows["rent_paid_total"]
         }
 
-        context["parking"] = {row["bazaar_id"]: row for row in MonthFilter(data, queryset=ParkingStatus.objects.filter(
-            parking__bazaar_id__in=bazaars_id
-        )).qs.values(
-            bazaar_id=F("parking__bazaar_id"),
-        ).annotate(
-            free_count=Count("id", filter=Q(price=0), distinct=True),
-            paid_count=Count("id", filter=Q(price__gt=0), distinct=True),
-            unknown_count=Count("id", filter=Q(number=ParkingStatus.LICENSE_PLATE_UNKNOWN), distinct=True),
-            total=Sum("price"),
-            total_paid_cash=Sum(Case(When(Q(is_paid=True) & Q(payment_method=Bazaar.PAYMENT_METHOD_CASH), then=F("price")), default=0)),
-            total_paid_click=Sum(Case(When(Q(is_paid=True) & Q(payment_method=Bazaar.PAYMENT_METHOD_CLICK), then=F("price")), default=0)),
-            total_paid_payme=Sum(Case(When(Q(is_paid=True) & Q(payment_method=Bazaar.PAYMENT_METHOD_PAYME), then=F("price")), default=0)),
-            total_paid=Sum(Case(When(is_paid=True, then=F("price")), default=0)),
-        ).values("bazaar_id", "free_count", "paid_count", "unknown_count", "total", "total_paid", "total_paid_cash", "total_paid_click", "total_paid_payme")}
+        context["parking"] = {row["bazaar_id"]: row for row in rows["parking"]}
 
         context["months"] = months
         context["n"] = data["n"]
         context["range_title"] = data["range_title"]
 
-        cal = DayWeekCalendar(request.GET.dict())
+        cal = DayWeekCalendar(params)
         context["calendar"] = cal.formatmonth(selected_month.year, selected_month.month)
 
 
@@ -349,13 +200,11 @@ class ReportTotalScanView(NormalizeDataMixin, LoginRequiredMixin, PermissionRequ
         data, months, selected_month = self.normalize_data(self.request.GET.dict())
         md = self.month_days(selected_month)
 
-        start, end = self.date_range(data, True)
+        start, end = self.date_range(data)
         scan_data = run_clickhouse_sql(
-            "SELECT "
-            "toStartOfDay(toTimeZone(scan_at, 'Asia/Tashkent')) AS local_day,"
-            "object_type, COUNT(object_id) FROM smartbozor.scan "
-            "WHERE {start:DateTime} <= scan_at AND scan_at < {end:DateTime} "
-            "GROUP BY local_day, object_type",
+            "SELECT day, object_type, sum(scans) FROM smartbozor.scan_daily "
+            "WHERE {start:Date} <= day AND day < {end:Date} "
+            "GROUP BY day, object_type",
             start=start,
             end=end
         ).result_rows
@@ -367,8 +216,9 @@ class ReportTotalScanView(NormalizeDataMixin, LoginRequiredMixin, PermissionRequ
             'p': [0] * md,
         }
 
-        for local_day, object_type, n in scan_data:
-            chart_data[object_type][local_day.day - 1] = n
+        for day, object_type, n in scan_data:
+            if object_type in chart_data:
+                chart_data[object_type][day.day - 1] = n
 
         context["data"] = {
             "type": "line",
@@ -400,7 +250,133 @@ class ReportTotalScanView(NormalizeDataMixin, LoginRequiredMixin, PermissionRequ
         return context
 
 
-class ReportTotalClick(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+class ScanHeatMixin(NormalizeDataMixin):
+    # object_type -> (model, bozor maydoni, nom maydoni, sarlavha)
+    SCAN_OBJECTS = {
+        's': (Stall, "section__area__bazaar_id", "number", _("Rasta")),
+        'm': (Shop, "section__area__bazaar_id", "number", _("Magazin")),
+        'r': (ThingData, "bazaar_id", "thing__name_uz", _("Ijara buyumlari")),
+        'p': (Parking, "bazaar_id", "name", _("Avtoturargoh")),
+    }
+
+    def set_range(self, context):
+        data, months, selected_month = self.normalize_data(self.request.GET.dict())
+
+        context["months"] = months
+        context["n"] = data["n"]
+        context["range_title"] = data["range_title"]
+        context["object_types"] = [(t, row[3]) for t, row in self.SCAN_OBJECTS.items()]
+
+        cal = DayWeekCalendar(self.request.GET.dict())
+        context["calendar"] = cal.formatmonth(selected_month.year, selected_month.month)
+
+        return self.date_range(data)
+
+
+class ReportScanHeatView(ScanHeatMixin, LoginRequiredMixin, PermissionRequiredMixin, ReadReplicaMixin, TemplateView):
+    template_name = 'report/scan-heat.j2'
+    permission_required = 'report.can_view_total_scan'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        start, end = self.set_range(context)
+
+        bazaars = list(self.request.user.allowed_bazaar.order_by('id').all())
+        heat = {bazaar.id: {"total": 0, "objects": 0, "by_type": dict()} for bazaar in bazaars}
+
+        # Faqat ruxsat berilgan bozorlar obyektlari bo'yicha: boshqa bozorlar ma'lumoti ClickHouse'dan olinmaydi
+        bazaar_by_object, where, params = dict(), [], dict()
+        for object_type, (model, bazaar_field, __, __) in self.SCAN_OBJECTS.items():
+            bazaar_by_object[object_type] = dict(model.objects.filter(
+                **{f"{bazaar_field}__in": list(heat.keys())}
+            ).values_list("id", bazaar_field))
+            if bazaar_by_object[object_type]:
+                where.append(f"(object_type = '{object_type}' AND object_id IN {{ids_{object_type}:Array(Int64)}})")
+                params[f"ids_{object_type}"] = list(bazaar_by_object[object_type].keys())
+
+        if where:
+            for object_type, object_id, n in run_clickhouse_sql(
+                    "SELECT object_type, object_id, sum(scans) FROM smartbozor.scan_daily "
+                    "WHERE {start:Date} <= day AND day < {end:Date} AND (" + " OR ".join(where) + ") "
+                    "GROUP BY object_type, object_id",
+                    start=start,
+                    end=end,
+                    **params
+            ).result_rows:
+                row = heat[bazaar_by_object[object_type][object_id]]
+                row["total"] += n
+                row["objects"] += 1
+                row["by_type"][object_type] = row["by_type"].get(object_type, 0) + n
+
+        context["rows"] = sorted(
+            [(bazaar, heat[bazaar.id]) for bazaar in bazaars],
+            key=lambda x: x[1]["total"],
+            reverse=True,
+        )
+
+        return context
+
+
+class ReportScanHeatObjectsView(ScanHeatMixin, LoginRequiredMixin, PermissionRequiredMixin, ReadReplicaMixin, TemplateView):
+    template_name = 'report/scan-heat.j2'
+    permission_required = 'report.can_view_total_scan'
+    limit = 100
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        start, end = self.set_range(context)
+
+        try:
+            bazaar = self.request.user.allowed_bazaar.get(pk=kwargs["pk"])
+        except Bazaar.DoesNotExist:
+            raise Http404
+
+        object_type = self.request.GET.get("type", "s")
+        if object_type not in self.SCAN_OBJECTS:
+            raise Http404
+
+        model, bazaar_field, name_field, __ = self.SCAN_OBJECTS[object_type]
+        names = dict(model.objects.filter(**{bazaar_field: bazaar.id}).values_list("id", name_field))
+
+        context["bazaar"] = bazaar
+        context["object_type"] = object_type
+        context["objects"] = []
+        context["hours"] = [0] * 24
+        if not names:
+            return context
+
+        # Kunlik agregatlardan: eng ko'p skanerlangan obyektlar
+        for object_id, n, last_scan_at in run_clickhouse_sql(
+                "SELECT object_id, sum(scans) AS n, toTimeZone(max(last_scan_at), 'Asia/Tashkent') FROM smartbozor.scan_daily "
+                "WHERE object_type = {object_type:String} AND {start:Date} <= day AND day < {end:Date} "
+                "AND object_id IN {ids:Array(Int64)} "
+                "GROUP BY object_id ORDER BY n DESC LIMIT {limit:UInt32}",
+                object_type=object_type,
+                start=start,
+                end=end,
+                ids=list(names.keys()),
+                limit=self.limit,
+        ).result_rows:
+            context["objects"].append((names.get(object_id, object_id), n, last_scan_at))
+
+        # Soatlar bo'yicha: scan_by_object proyeksiyasi (object_type, object_id, scan_at) orqali o'qiladi
+        for hour, n in run_clickhouse_sql(
+                "SELECT toHour(toTimeZone(scan_at, 'Asia/Tashkent')) AS h, count() FROM smartbozor.scan "
+                "WHERE object_type = {object_type:String} AND object_id IN {ids:Array(Int64)} "
+                "AND toDateTime({start:Date}, 'Asia/Tashkent') <= scan_at "
+                "AND scan_at < toDateTime({end:Date}, 'Asia/Tashkent') "
+                "GROUP BY h",
+                object_type=object_type,
+                start=start,
+                end=end,
+                ids=list(names.keys()),
+        ).result_rows:
+            context["hours"][hour] = n
+
+        return context
+
+
+class ReportTotalClick(LoginRequiredMixin, PermissionRequiredMixin, ReadReplicaMixin, TemplateView):
     TITLE = _("Click hisobot")
     template_name = 'report/total-click.j2'
     permission_required = "payment.view_click"
@@ -425,3 +401,39 @@ class ReportTotalClick(LoginRequiredMixin, PermissionRequiredMixin, TemplateView
 
         return context
 
+
+class ReportExportView(LoginRequiredMixin, TemplateView):
+    TITLE = _("Eksport")
+    template_name = 'report/export.j2'
+
+    def get(self, request, *args, **kwargs):
+        key = kwargs["key"]
+        job = get_job(key)
+        if job is None or job.get("user_id") != str(request.user.id):
+            raise Http404
+
+        path = job_path(key, job["format"])
+        is_ready = job["status"] == STATUS_DONE and os.path.exists(path)
+
+        if request.GET.get("status", "0") == "1":
+            return JsonResponse({
+                "status": job["status"],
+                "error": job.get("error", ""),
+                "url": reverse("report:export", args=[key]) + "?download=1" if is_ready else None,
+            })
+
+        if request.GET.get("download", "0") == "1":
+            if not is_ready:
+                raise Http404
+
+            return FileResponse(
+                open(path, "rb"),
+                as_attachment=True,
+                filename=job["filename"],
+                content_type=CONTENT_TYPES.get(job["format"]),
+            )
+
+        context = self.get_context_data(**kwargs)
+        context["job"] = job
+        context["is_failed"] = job["status"] == STATUS_FAILED
+        return self.render_to_response(context)
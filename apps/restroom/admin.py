@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 
 from apps.restroom.models import Restroom
@@ -7,7 +8,7 @@ from apps.restroom.models import Restroom
 @admin.register(Restroom)
 class RestroomAdmin(admin.ModelAdmin):
     list_select_related = ('bazaar__district__region', )
-    list_display = ('id', 'get_address', 'number')
+    list_display = ('id', 'get_address', 'number', 'price', 'get_callback_link')
     autocomplete_fields = ('bazaar',)
     search_fields = ('number',)
 
@@ -20,3 +21,16 @@ class RestroomAdmin(admin.ModelAdmin):
         ])
 
     get_address.short_description = _("Joylashgan joyi")
+
+    @admin.display(description="Callback link")
+    def get_callback_link(self, obj):
+        link = f"https://smart-bozor.uz/restroom/{obj.token}/"
+        return format_html(
+            "<a href='{0}' data-clipboard='{1}' target='_blank'>{2}</a>",
+            link,
+            link,
+            "Copy"
+        )
+
+    class Media:
+        js = ('js/data-clipboard.min.js',)
@@ -7,3 +7,6 @@ class RestroomConfig(AppConfig):
     name = 'apps.restroom'
     verbose_name = _("Hojatxona")
     verbose_name_plural = _("Hojatxonalar")
+
+    def ready(self):
+        from apps.restroom import signals
@@ -0,0 +1,276 @@
+import csv
+import datetime
+import io
+import json
+import pickle
+import uuid
+
+from django.db import DataError, IntegrityError, connection, transaction
+from django.utils import timezone
+
+from apps.main.models import Bazaar
+from apps.restroom.models import Restroom, RestroomStatus, RestroomDaily
+from smartbozor.redis import REDIS_CLIENT
+
+# Turniket hodisalari: so'rovda faqat Redis (navbat + jonli hisoblagichlar), bazaga esa
+# flush_restroom_events partiyalab COPY bilan yozadi. Qatorlar faqat qo'shiladi, UPDATE va qulf yo'q.
+
+TOKEN_CACHE_KEY = "restroom:token:{0}"
+TOKEN_CACHE_TTL = 60
+QUEUE_KEY = "restroom:events"
+# Bazaga yozib bo'lmaydigan qatorlar: navbatni to'sib qo'ymasin, qo'lda ko'rib chiqiladi
+DEAD_KEY = "restroom:events:dead"
+# COPY qilinayotgan partiya: bazaga yozilgandan keyingina o'chiriladi (worker o'lsa keyingi flush qayta yozadi)
+PROCESSING_KEY = "restroom:events:processing"
+FLUSH_LOCK_KEY = "restroom:flush:lock"
+FLUSH_LOCK_TTL = 10 * 60
+SEEN_KEY = "restroom:seen:{0}:{1}"
+SEEN_TTL = 2 * 24 * 3600
+LIVE_KEY = "restroom:live:{0:%Y%m%d}"
+LIVE_TTL = 3 * 24 * 3600
+
+EVENT_ENTER = "enter"
+EVENT_EXIT = "exit"
+
+MAX_EVENTS = 1000
+MAX_EVENT_AGE = datetime.timedelta(days=2)
+MAX_CLOCK_SKEW = datetime.timedelta(minutes=5)
+FLUSH_BATCH_SIZE = 5000
+
+STATUS_COLUMNS = ["restroom_id", "is_paid", "payment_method", "price", "enter_at"]
+
+
+def get_restroom(token):
+    """Restroom (token bo'yicha). Yo'q bo'lsa Restroom.DoesNotExist"""
+    raw = REDIS_CLIENT.get(TOKEN_CACHE_KEY.format(token))
+    if raw is not None:
+        return pickle.loads(raw)
+
+    restroom = Restroom.objects.only("id", "bazaar_id", "price", "token").get(token=token)
+    REDIS_CLIENT.set(TOKEN_CACHE_KEY.format(token), pickle.dumps(restroom), ex=TOKEN_CACHE_TTL)
+    return restroom
+
+
+def invalidate_token(token):
+    key = TOKEN_CACHE_KEY.format(token)
+    REDIS_CLIENT.delete(key)
+    transaction.on_commit(lambda: REDIS_CLIENT.delete(key))
+
+
+def parse_events(data, now=None):
+    """
+    [{"id": "...", "type": "enter" | "exit", "time": ISO 8601, "payment_method": 1}] ->
+    ([(id | None, type, aware datetime, payment_method)], rad etilganlar soni)
+    """
+    now = now or timezone.now()
+    events, rejected = [], 0
+    for row in data[:MAX_EVENTS]:
+        try:
+            kind = row.get("type", EVENT_ENTER)
+            at = datetime.datetime.fromisoformat(row["time"])
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+            payment_method = int(row.get("payment_method", Bazaar.PAYMENT_METHOD_CASH))
+            event_id = row.get("id")
+        except (AttributeError, KeyError, TypeError, ValueError):
+            rejected += 1
+            continue
+
+        if payment_method not in Bazaar.PAYMENT_METHOD_DICT:
+            rejected += 1
+            continue
+
+        # Bo'limi bo'lmasligi mumkin bo'lgan juda eski va kelajakdagi hodisalar qabul qilinmaydi
+        if kind not in (EVENT_ENTER, EVENT_EXIT) or not (now - MAX_EVENT_AGE <= at <= now + MAX_CLOCK_SKEW):
+            rejected += 1
+            continue
+
+        events.append((str(event_id)[:64] if event_id else None, kind, at, payment_method))
+
+    return events, rejected + max(len(data) - MAX_EVENTS, 0)
+
+
+def push(restroom, events):
+    """Takrorlanmaganlarini navbatga qo'yadi va jonli hisoblagichlarni oshiradi. (qabul qilingan, takroriy)"""
+    if not events:
+        return 0, 0
+
+    # Turniket javob olmay qayta yuborsa: id bo'yicha bir marta
+    with_id = [event for event in events if event[0]]
+    fresh = set()
+    if with_id:
+        pipe = REDIS_CLIENT.pipeline(transaction=False)
+        for event_id, *__ in with_id:
+            pipe.set(SEEN_KEY.format(restroom.id, event_id), 1, nx=True, ex=SEEN_TTL)
+        fresh = {event[0] for event, ok in zip(with_id, pipe.execute()) if ok}
+
+    accepted = [event for event in events if not event[0] or event[0] in fresh]
+    if not accepted:
+        return 0, len(events)
+
+    rows = []
+    pipe = REDIS_CLIENT.pipeline(transaction=False)
+    for __, kind, at, payment_method in accepted:
+        live_key = LIVE_KEY.format(timezone.localtime(at).date())
+        pipe.hincrby(live_key, f"{restroom.id}:{kind}", 1)
+        if kind == EVENT_ENTER:
+            pipe.hincrby(live_key, f"{restroom.id}:revenue", restroom.price)
+            rows.append(json.dumps([restroom.id, restroom.price > 0, payment_method, restroom.price, at.isoformat()]))
+        pipe.expire(live_key, LIVE_TTL)
+
+    if rows:
+        pipe.rpush(QUEUE_KEY, *rows)
+    pipe.execute()
+
+    return len(accepted), len(events) - len(accepted)
+
+
+def live(restroom_ids, day=None):
+    """{restroom_id: {"enter", "exit", "inside", "revenue"}} - bugungi (yoki day) hisoblagichlar"""
+    day = day or timezone.localdate()
+    restroom_ids = list(restroom_ids)
+    if not restroom_ids:
+        return {}
+
+    fields = [f"{rid}:{name}" for rid in restroom_ids for name in (EVENT_ENTER, EVENT_EXIT, "revenue")]
+    values = [int(v or 0) for v in REDIS_CLIENT.hmget(LIVE_KEY.format(day), fields)]
+
+    result = {}
+    for i, rid in enumerate(restroom_ids):
+        enter, exit_, revenue = values[i * 3:i * 3 + 3]
+        result[rid] = {
+            "enter": enter,
+            "exit": exit_,
+            # Chiqish hodisasi tushib qolishi mumkin, manfiy bo'lmasin
+            "inside": max(enter - exit_, 0),
+            "revenue": revenue,
+        }
+
+    return result
+
+
+# Oldingi tugallanmagan partiya bo'lsa o'shani, aks holda navbat boshini PROCESSING_KEY ga ko'chiradi
+_CLAIM_SCRIPT = REDIS_CLIENT.register_script("""
+if redis.call("LLEN", KEYS[2]) > 0 then
+    return redis.call("LRANGE", KEYS[2], 0, -1)
+end
+local batch = redis.call("LRANGE", KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #batch > 0 then
+    redis.call("RPUSH", KEYS[2], unpack(batch))
+    redis.call("LTRIM", KEYS[1], #batch, -1)
+end
+return batch
+""")
+
+# Partiyani navbat boshiga qaytaradi (tartib saqlanadi)
+_REQUEUE_SCRIPT = REDIS_CLIENT.register_script("""
+local batch = redis.call("LRANGE", KEYS[2], 0, -1)
+for i = #batch, 1, -1 do
+    redis.call("LPUSH", KEYS[1], batch[i])
+end
+redis.call("DEL", KEYS[2])
+return #batch
+""")
+
+_RELEASE_SCRIPT = REDIS_CLIENT.register_script("""
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+""")
+
+
+def flush(batch_size=FLUSH_BATCH_SIZE):
+    """
+    Navbatdagi bitta partiyani COPY bilan restroom_restroomstatus ga yozadi.
+    Bir vaqtda bitta flush ishlashi kerak (flush_all qulf oladi).
+    """
+    batch = _CLAIM_SCRIPT(keys=[QUEUE_KEY, PROCESSING_KEY], args=[batch_size])
+    if not batch:
+        return 0
+
+    try:
+        _copy(batch)
+    except (DataError, IntegrityError, ValueError):
+        # Partiyada buzuq qator bor: qatorma-qator yoziladi, faqat buzuqlari DEAD_KEY ga
+        dead = []
+        for raw in batch:
+            try:
+                _copy([raw])
+            except (DataError, IntegrityError, ValueError):
+                dead.append(raw)
+        pipe = REDIS_CLIENT.pipeline()
+        if dead:
+            pipe.rpush(DEAD_KEY, *dead)
+        pipe.delete(PROCESSING_KEY)
+        pipe.execute()
+        return len(batch) - len(dead)
+    except Exception:
+        # Baza ishlamayapti: yo'qolmasin, keyingi flush qayta urinadi
+        _REQUEUE_SCRIPT(keys=[QUEUE_KEY, PROCESSING_KEY])
+        raise
+
+    REDIS_CLIENT.delete(PROCESSING_KEY)
+    return len(batch)
+
+
+def _copy(batch):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for raw in batch:
+        writer.writerow(json.loads(raw))
+    buf.seek(0)
+
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {RestroomStatus._meta.db_table} ({', '.join(STATUS_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buf
+        )
+
+
+def flush_all(batch_size=FLUSH_BATCH_SIZE, max_batches=100):
+    # Beat ustma-ust ishga tushirsa ikkinchisi PROCESSING_KEY dagi partiyani qayta yozmasin
+    token = uuid.uuid4().hex
+    if not REDIS_CLIENT.set(FLUSH_LOCK_KEY, token, nx=True, ex=FLUSH_LOCK_TTL):
+        return 0
+
+    total = 0
+    try:
+        for __ in range(max_batches):
+            n = flush(batch_size)
+            total += n
+            if n < batch_size:
+                break
+    finally:
+        _RELEASE_SCRIPT(keys=[FLUSH_LOCK_KEY], args=[token])
+
+    return total
+
+
+def rollup(day):
+    """Bir kunlik RestroomDaily qatorlarini RestroomStatus'dan qayta hisoblaydi"""
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time()))
+    end = start + datetime.timedelta(days=1)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO {RestroomDaily._meta.db_table} (restroom_id, date, payment_method, count, amount)
+            SELECT restroom_id, %(day)s, payment_method, count(*), COALESCE(sum(price), 0)
+            FROM {RestroomStatus._meta.db_table}
+            WHERE enter_at >= %(start)s AND enter_at < %(end)s
+            GROUP BY restroom_id, payment_method
+            ON CONFLICT (restroom_id, date, payment_method)
+                DO UPDATE SET count = EXCLUDED.count, amount = EXCLUDED.amount
+        """, {"day": day, "start": start, "end": end})
+        n = cursor.rowcount
+
+        # Qatorlari o'chirilgan (masalan qo'lda tuzatilgan) guruhlar
+        cursor.execute(f"""
+            DELETE FROM {RestroomDaily._meta.db_table} AS d
+            WHERE d.date = %(day)s AND NOT EXISTS (
+                SELECT 1 FROM {RestroomStatus._meta.db_table} AS s
+                WHERE s.restroom_id = d.restroom_id AND s.payment_method = d.payment_method
+                  AND s.enter_at >= %(start)s AND s.enter_at < %(end)s
+            )
+        """, {"day": day, "start": start, "end": end})
+
+    return n
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from apps.parking.models import generate_token
+
+
+def populate_token(apps, schema_editor):
+    Restroom = apps.get_model('restroom', 'Restroom')
+    for obj in Restroom.objects.order_by('id').all():
+        obj.token = generate_token()
+        obj.save(update_fields=['token'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restroom', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restroom',
+            name='token',
+            field=models.CharField(editable=False, max_length=32, null=True, verbose_name='Token'),
+        ),
+        migrations.RunPython(populate_token, reverse_code=migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='restroom',
+            name='token',
+            field=models.CharField(default=generate_token, editable=False, max_length=32,
+                                   unique=True, verbose_name='Token'),
+        ),
+        migrations.CreateModel(
+            name='RestroomDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Kun')),
+                ('payment_method', models.IntegerField(verbose_name="To'lov turi")),
+                ('count', models.IntegerField(default=0, verbose_name='Kirishlar soni')),
+                ('amount', models.BigIntegerField(default=0, verbose_name='Summa')),
+                ('restroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='restroom.restroom',
+                                               verbose_name='Hojatxona')),
+            ],
+            options={
+                'verbose_name': 'Hojatxonaning kunlik hisoboti',
+                'verbose_name_plural': 'Hojatxonalarning kunlik hisobotlari',
+                'unique_together': {('restroom', 'date', 'payment_method')},
+            },
+        ),
+    ]
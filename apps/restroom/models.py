@@ -3,12 +3,16 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 from apps.main.models import Bazaar
+from apps.parking.models import generate_token
 
 
 class Restroom(models.Model):
     bazaar = models.ForeignKey(Bazaar, on_delete=models.RESTRICT, verbose_name=_("Bozor"))
     number = models.CharField(max_length=50, verbose_name=_("Hojatxona raqami"))
     price = models.IntegerField(verbose_name=_("Narxi"), validators=[MinValueValidator(0)])
+    # Turniket shu token bilan hodisalarni yuboradi
+    token = models.CharField(max_length=32, verbose_name=_("Token"), default=generate_token, editable=False,
+                             unique=True)
 
     def __str__(self):
         if hasattr(self, "display_name"):
@@ -35,3 +39,17 @@ class RestroomStatus(models.Model):
 
         verbose_name = _("Hojatxona holati")
         verbose_name_plural = _("Hojatxona holatlari")
+
+
+class RestroomDaily(models.Model):
+    # RestroomStatus'dan rollup_restroom_daily orqali qayta hisoblanadi (hisobotlar uchun)
+    restroom = models.ForeignKey(Restroom, on_delete=models.CASCADE, verbose_name=_("Hojatxona"))
+    date = models.DateField(verbose_name=_("Kun"))
+    payment_method = models.IntegerField(verbose_name=_("To'lov turi"))
+    count = models.IntegerField(default=0, verbose_name=_("Kirishlar soni"))
+    amount = models.BigIntegerField(default=0, verbose_name=_("Summa"))
+
+    class Meta:
+        unique_together = ('restroom', 'date', 'payment_method')
+        verbose_name = _("Hojatxonaning kunlik hisoboti")
+        verbose_name_plural = _("Hojatxonalarning kunlik hisobotlari")
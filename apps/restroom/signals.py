@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.restroom.ingest import invalidate_token
+from apps.restroom.models import Restroom
+
+
+@receiver(post_save, sender=Restroom)
+def restroom_saved(sender, instance, **kwargs):
+    # Narx keshlangan restroom ichida
+    invalidate_token(instance.token)
+
+
+@receiver(post_delete, sender=Restroom)
+def restroom_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.token)
@@ -0,0 +1,19 @@
+import datetime
+
+from django.utils import timezone
+
+from apps.restroom import ingest
+from smartbozor.celery import app
+
+
+@app.task()
+def flush_restroom_events():
+    ingest.flush_all()
+
+
+@app.task()
+def rollup_restroom_daily():
+    # Kechikib kelgan hodisalar uchun kechagi kun ham qayta hisoblanadi
+    today = timezone.localdate()
+    for day in (today - datetime.timedelta(days=1), today):
+        ingest.rollup(day)
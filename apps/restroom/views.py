@@ -1,3 +1,41 @@
-from django.shortcuts import render
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from apps.restroom import ingest
+from apps.restroom.models import Restroom
+
+
+class RestroomEventView(APIView):
+    """
+    Turniket hodisalari (bitta yoki {"events": [...]} partiya).
+    Bazaga bu yerda yozilmaydi: navbat va hisoblagichlar Redis'da, qatorlarni flush_restroom_events qo'shadi.
+    """
+    permission_classes = []
+    authentication_classes = []
+
+    def post(self, request, token, *args, **kwargs):
+        try:
+            restroom = ingest.get_restroom(token[:32])
+        except Restroom.DoesNotExist:
+            return Response({
+                "success": False,
+                "message": "Invalid token",
+            })
+
+        data = request.data
+        rows = data.get("events") if hasattr(data, "get") and "events" in data else [data]
+        if not isinstance(rows, list):
+            return Response({
+                "success": False,
+                "message": "Invalid data",
+            })
+
+        events, rejected = ingest.parse_events(rows)
+        accepted, duplicates = ingest.push(restroom, events)
+
+        return Response({
+            "success": True,
+            "accepted": accepted,
+            "duplicates": duplicates,
+            "rejected": rejected,
+        })
@@ -0,0 +1,161 @@
+from collections import defaultdict
+
+from django.db import connection, transaction
+
+from apps.shop.models import ShopBalance, ShopMonthPayment
+
+# Magazin balansi (shop_shopbalance, shop_shopmonthpayment) Postgres triggerlari bilan yuritiladi:
+# shop_occupied (raw INSERT/DELETE), shop_update_prices (UPDATE), naqd to'lov, Click/Payme -
+# barchasi shop_shopstatus/shop_shoppayment ga yozadi va balans shu tranzaksiyaning o'zida o'zgaradi.
+
+TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION shop_balance_add(p_shop_id BIGINT, p_rent BIGINT, p_paid BIGINT) RETURNS void AS $$
+    INSERT INTO shop_shopbalance (shop_id, rent_total, paid_total, updated_at)
+    VALUES (p_shop_id, p_rent, p_paid, now())
+    ON CONFLICT (shop_id) DO UPDATE SET
+        rent_total = shop_shopbalance.rent_total + EXCLUDED.rent_total,
+        paid_total = shop_shopbalance.paid_total + EXCLUDED.paid_total,
+        updated_at = EXCLUDED.updated_at;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION shop_month_payment_add(p_shop_id BIGINT, p_date DATE, p_method INTEGER, p_amount BIGINT) RETURNS void AS $$
+    INSERT INTO shop_shopmonthpayment (shop_id, month, payment_method, amount)
+    VALUES (p_shop_id, date_trunc('month', p_date)::date, p_method, p_amount)
+    ON CONFLICT (shop_id, month, payment_method) DO UPDATE SET
+        amount = shop_shopmonthpayment.amount + EXCLUDED.amount;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION shop_status_balance_trg() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.shop_id = NEW.shop_id AND OLD.is_occupied = NEW.is_occupied
+            AND OLD.rent_price = NEW.rent_price THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.is_occupied THEN
+        PERFORM shop_balance_add(OLD.shop_id, -OLD.rent_price, 0);
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.is_occupied THEN
+        PERFORM shop_balance_add(NEW.shop_id, NEW.rent_price, 0);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION shop_payment_balance_trg() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.shop_id = NEW.shop_id AND OLD.date = NEW.date AND OLD.amount = NEW.amount
+            AND OLD.payment_method = NEW.payment_method AND (OLD.paid_at IS NULL) = (NEW.paid_at IS NULL) THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.paid_at IS NOT NULL THEN
+        PERFORM shop_balance_add(OLD.shop_id, 0, -OLD.amount);
+        PERFORM shop_month_payment_add(OLD.shop_id, OLD.date, OLD.payment_method, -OLD.amount);
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.paid_at IS NOT NULL THEN
+        PERFORM shop_balance_add(NEW.shop_id, 0, NEW.amount);
+        PERFORM shop_month_payment_add(NEW.shop_id, NEW.date, NEW.payment_method, NEW.amount);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER shop_shopstatus_balance
+    AFTER INSERT OR UPDATE OR DELETE ON shop_shopstatus
+    FOR EACH ROW EXECUTE FUNCTION shop_status_balance_trg();
+
+CREATE TRIGGER shop_shoppayment_balance
+    AFTER INSERT OR UPDATE OR DELETE ON shop_shoppayment
+    FOR EACH ROW EXECUTE FUNCTION shop_payment_balance_trg();
+"""
+
+TRIGGER_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS shop_shoppayment_balance ON shop_shoppayment;
+DROP TRIGGER IF EXISTS shop_shopstatus_balance ON shop_shopstatus;
+DROP FUNCTION IF EXISTS shop_payment_balance_trg();
+DROP FUNCTION IF EXISTS shop_status_balance_trg();
+DROP FUNCTION IF EXISTS shop_month_payment_add(BIGINT, DATE, INTEGER, BIGINT);
+DROP FUNCTION IF EXISTS shop_balance_add(BIGINT, BIGINT, BIGINT);
+"""
+
+# Tarixdan hisoblangan haqiqiy qiymatlar (rebuild va verify uchun)
+EXPECTED_BALANCE_SQL = """
+SELECT s.id AS shop_id, COALESCE(r.total, 0) AS rent_total, COALESCE(p.total, 0) AS paid_total
+FROM shop_shop AS s
+LEFT JOIN (
+    SELECT shop_id, SUM(rent_price) AS total FROM shop_shopstatus WHERE is_occupied GROUP BY shop_id
+) AS r ON r.shop_id = s.id
+LEFT JOIN (
+    SELECT shop_id, SUM(amount) AS total FROM shop_shoppayment WHERE paid_at IS NOT NULL GROUP BY shop_id
+) AS p ON p.shop_id = s.id
+"""
+
+EXPECTED_MONTH_SQL = """
+SELECT shop_id, date_trunc('month', date)::date AS month, payment_method, SUM(amount) AS amount
+FROM shop_shoppayment
+WHERE paid_at IS NOT NULL AND shop_id IN (SELECT id FROM shop_shop)
+GROUP BY 1, 2, 3
+"""
+
+REBUILD_SQL = f"""
+DELETE FROM shop_shopbalance;
+DELETE FROM shop_shopmonthpayment;
+INSERT INTO shop_shopbalance (shop_id, rent_total, paid_total, updated_at)
+SELECT shop_id, rent_total, paid_total, now() FROM ({EXPECTED_BALANCE_SQL}) AS e;
+INSERT INTO shop_shopmonthpayment (shop_id, month, payment_method, amount)
+SELECT shop_id, month, payment_method, amount FROM ({EXPECTED_MONTH_SQL}) AS e;
+"""
+
+
+def rebuild():
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Qayta hisoblash paytida yangi yozuvlar balansni chalkashtirmasligi uchun
+        cursor.execute("LOCK TABLE shop_shopstatus, shop_shoppayment IN SHARE MODE")
+        cursor.execute(REBUILD_SQL)
+
+
+def verify():
+    """Balans jadvallari tarixdan farq qiladigan qatorlar: [(kind, shop_id, key, expected, actual)]"""
+    result = []
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT e.shop_id, e.rent_total, e.paid_total, b.rent_total, b.paid_total
+            FROM ({EXPECTED_BALANCE_SQL}) AS e
+            LEFT JOIN shop_shopbalance AS b ON b.shop_id = e.shop_id
+            WHERE e.rent_total <> COALESCE(b.rent_total, 0) OR e.paid_total <> COALESCE(b.paid_total, 0)
+        """)
+        for shop_id, rent, paid, b_rent, b_paid in cursor.fetchall():
+            result.append(("balance", shop_id, None, (rent, paid), (b_rent, b_paid)))
+
+        cursor.execute(f"""
+            SELECT COALESCE(e.shop_id, m.shop_id), COALESCE(e.month, m.month),
+                   COALESCE(e.payment_method, m.payment_method), e.amount, m.amount
+            FROM ({EXPECTED_MONTH_SQL}) AS e
+            FULL OUTER JOIN shop_shopmonthpayment AS m
+                ON m.shop_id = e.shop_id AND m.month = e.month AND m.payment_method = e.payment_method
+            WHERE COALESCE(e.amount, 0) <> COALESCE(m.amount, 0)
+        """)
+        for shop_id, month, pm, amount, m_amount in cursor.fetchall():
+            result.append(("month", shop_id, (month, pm), amount or 0, m_amount or 0))
+
+    return result
+
+
+def balance_by_shop(shop_ids):
+    return {row.shop_id: row for row in ShopBalance.objects.filter(shop_id__in=shop_ids)}
+
+
+def month_payments_by_shop(shop_ids, month):
+    result = defaultdict(list)
+    for shop_id, pm, amount in ShopMonthPayment.objects.filter(
+            shop_id__in=shop_ids,
+            month=month.replace(day=1),
+    ).exclude(amount=0).order_by("shop_id", "payment_method").values_list("shop_id", "payment_method", "amount"):
+        result[shop_id].append([pm, amount])
+
+    return result
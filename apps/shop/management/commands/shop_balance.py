@@ -0,0 +1,21 @@
+from django.core.management import BaseCommand
+
+from apps.shop.balance import rebuild, verify
+
+
+class Command(BaseCommand):
+    help = "Magazin balansini to'lov/holat tarixi bilan solishtirish yoki qayta hisoblash"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Balans jadvallarini tarixdan qayta hisoblash")
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            rebuild()
+            print("Rebuilt")
+
+        mismatches = verify()
+        for kind, shop_id, key, expected, actual in mismatches:
+            print(kind, "shop:", shop_id, key or "", "expected:", expected, "actual:", actual)
+
+        print("Mismatches:", len(mismatches))
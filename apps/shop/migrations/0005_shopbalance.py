@@ -0,0 +1,143 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# apps.shop.balance dagi SQL shu migratsiya yozilgan paytdagi holatida: keyingi o'zgarishlar tarixga ta'sir qilmasin
+TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION shop_balance_add(p_shop_id BIGINT, p_rent BIGINT, p_paid BIGINT) RETURNS void AS $$
+    INSERT INTO shop_shopbalance (shop_id, rent_total, paid_total, updated_at)
+    VALUES (p_shop_id, p_rent, p_paid, now())
+    ON CONFLICT (shop_id) DO UPDATE SET
+        rent_total = shop_shopbalance.rent_total + EXCLUDED.rent_total,
+        paid_total = shop_shopbalance.paid_total + EXCLUDED.paid_total,
+        updated_at = EXCLUDED.updated_at;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION shop_month_payment_add(p_shop_id BIGINT, p_date DATE, p_method INTEGER, p_amount BIGINT) RETURNS void AS $$
+    INSERT INTO shop_shopmonthpayment (shop_id, month, payment_method, amount)
+    VALUES (p_shop_id, date_trunc('month', p_date)::date, p_method, p_amount)
+    ON CONFLICT (shop_id, month, payment_method) DO UPDATE SET
+        amount = shop_shopmonthpayment.amount + EXCLUDED.amount;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION shop_status_balance_trg() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.shop_id = NEW.shop_id AND OLD.is_occupied = NEW.is_occupied
+            AND OLD.rent_price = NEW.rent_price THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.is_occupied THEN
+        PERFORM shop_balance_add(OLD.shop_id, -OLD.rent_price, 0);
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.is_occupied THEN
+        PERFORM shop_balance_add(NEW.shop_id, NEW.rent_price, 0);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION shop_payment_balance_trg() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.shop_id = NEW.shop_id AND OLD.date = NEW.date AND OLD.amount = NEW.amount
+            AND OLD.payment_method = NEW.payment_method AND (OLD.paid_at IS NULL) = (NEW.paid_at IS NULL) THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.paid_at IS NOT NULL THEN
+        PERFORM shop_balance_add(OLD.shop_id, 0, -OLD.amount);
+        PERFORM shop_month_payment_add(OLD.shop_id, OLD.date, OLD.payment_method, -OLD.amount);
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.paid_at IS NOT NULL THEN
+        PERFORM shop_balance_add(NEW.shop_id, 0, NEW.amount);
+        PERFORM shop_month_payment_add(NEW.shop_id, NEW.date, NEW.payment_method, NEW.amount);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER shop_shopstatus_balance
+    AFTER INSERT OR UPDATE OR DELETE ON shop_shopstatus
+    FOR EACH ROW EXECUTE FUNCTION shop_status_balance_trg();
+
+CREATE TRIGGER shop_shoppayment_balance
+    AFTER INSERT OR UPDATE OR DELETE ON shop_shoppayment
+    FOR EACH ROW EXECUTE FUNCTION shop_payment_balance_trg();
+"""
+
+TRIGGER_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS shop_shoppayment_balance ON shop_shoppayment;
+DROP TRIGGER IF EXISTS shop_shopstatus_balance ON shop_shopstatus;
+DROP FUNCTION IF EXISTS shop_payment_balance_trg();
+DROP FUNCTION IF EXISTS shop_status_balance_trg();
+DROP FUNCTION IF EXISTS shop_month_payment_add(BIGINT, DATE, INTEGER, BIGINT);
+DROP FUNCTION IF EXISTS shop_balance_add(BIGINT, BIGINT, BIGINT);
+"""
+
+REBUILD_SQL = """
+DELETE FROM shop_shopbalance;
+DELETE FROM shop_shopmonthpayment;
+INSERT INTO shop_shopbalance (shop_id, rent_total, paid_total, updated_at)
+SELECT shop_id, rent_total, paid_total, now() FROM (
+SELECT s.id AS shop_id, COALESCE(r.total, 0) AS rent_total, COALESCE(p.total, 0) AS paid_total
+FROM shop_shop AS s
+LEFT JOIN (
+    SELECT shop_id, SUM(rent_price) AS total FROM shop_shopstatus WHERE is_occupied GROUP BY shop_id
+) AS r ON r.shop_id = s.id
+LEFT JOIN (
+    SELECT shop_id, SUM(amount) AS total FROM shop_shoppayment WHERE paid_at IS NOT NULL GROUP BY shop_id
+) AS p ON p.shop_id = s.id
+) AS e;
+INSERT INTO shop_shopmonthpayment (shop_id, month, payment_method, amount)
+SELECT shop_id, month, payment_method, amount FROM (
+SELECT shop_id, date_trunc('month', date)::date AS month, payment_method, SUM(amount) AS amount
+FROM shop_shoppayment
+WHERE paid_at IS NOT NULL AND shop_id IN (SELECT id FROM shop_shop)
+GROUP BY 1, 2, 3
+) AS e;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0004_alter_shop_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopBalance',
+            fields=[
+                ('shop', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='shop.shop', verbose_name='Magazin')),
+                ('rent_total', models.BigIntegerField(default=0, verbose_name='Jami hisoblangan ijara')),
+                ('paid_total', models.BigIntegerField(default=0, verbose_name="Jami to'langan")),
+                ('updated_at', models.DateTimeField(verbose_name='Yangilangan sana')),
+            ],
+            options={
+                'verbose_name': 'Magazin balansi',
+                'verbose_name_plural': 'Magazin balanslari',
+            },
+        ),
+        migrations.CreateModel(
+            name='ShopMonthPayment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Oy')),
+                ('payment_method', models.IntegerField(verbose_name="To'lov turi")),
+                ('amount', models.BigIntegerField(default=0, verbose_name='Summa')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='shop.shop', verbose_name='Magazin')),
+            ],
+            options={
+                'verbose_name': "Magazinning oylik to'lovi",
+                'verbose_name_plural': "Magazinlarning oylik to'lovlari",
+                'unique_together': {('shop', 'month', 'payment_method')},
+            },
+        ),
+        migrations.RunSQL(TRIGGER_SQL, reverse_sql=TRIGGER_REVERSE_SQL),
+        migrations.RunSQL(REBUILD_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -1,12 +1,10 @@
-import os
-
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator, RegexValidator
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 from apps.main.models import Section
-from smartbozor.qrcode import generate_qr_code
+from smartbozor.qrcode import qr_png_file
 
 
 class Shop(models.Model):
@@ -24,18 +22,11 @@ class Shop(models.Model):
 
     @property
     def qr_image_file(self):
-        cache_path = settings.MEDIA_ROOT / "qr-codes" / "shop" / str(self.id // 1000)
-        os.makedirs(cache_path, exist_ok=True)
-
-        cache_file = cache_path / f"{self.qr_data}.png"
-        if os.path.exists(cache_file):
-            return cache_file
+        return qr_png_file(*self.qr_label)
 
-        img = generate_qr_code("rasta-click.png", f"{settings.QR_CODE_LINK_HOST}/m/{self.qr_data}/", "DO'KON", self.number)
-        img.save(cache_file, format="PNG", optimize=True, compress_level=9, dpi=(300, 300))
-        img.close()
-
-        return cache_file
+    @property
+    def qr_label(self):
+        return "rasta-click.png", f"{settings.QR_CODE_LINK_HOST}/m/{self.qr_data}/", "DO'KON", self.number
 
     @property
     def qr_data(self):
@@ -84,3 +75,31 @@ class ShopStatus(models.Model):
 
         verbose_name = _("Magazin holati")
         verbose_name_plural = _("Magazin holatlari")
+
+
+class ShopBalance(models.Model):
+    # Faqat shop_shopstatus/shop_shoppayment triggerlari orqali yangilanadi (apps/shop/balance.py)
+    shop = models.OneToOneField(Shop, on_delete=models.CASCADE, primary_key=True, verbose_name=_("Magazin"))
+    rent_total = models.BigIntegerField(default=0, verbose_name=_("Jami hisoblangan ijara"))
+    paid_total = models.BigIntegerField(default=0, verbose_name=_("Jami to'langan"))
+    updated_at = models.DateTimeField(verbose_name=_("Yangilangan sana"))
+
+    @property
+    def balance(self):
+        return self.paid_total - self.rent_total
+
+    class Meta:
+        verbose_name = _("Magazin balansi")
+        verbose_name_plural = _("Magazin balanslari")
+
+
+class ShopMonthPayment(models.Model):
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, verbose_name=_("Magazin"))
+    month = models.DateField(verbose_name=_("Oy"))
+    payment_method = models.IntegerField(verbose_name=_("To'lov turi"))
+    amount = models.BigIntegerField(default=0, verbose_name=_("Summa"))
+
+    class Meta:
+        unique_together = ('shop', 'month', 'payment_method')
+        verbose_name = _("Magazinning oylik to'lovi")
+        verbose_name_plural = _("Magazinlarning oylik to'lovlari")
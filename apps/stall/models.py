@@ -1,5 +1,3 @@
-import os
-
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator, RegexValidator
 from django.db import models
@@ -8,7 +6,7 @@ from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from apps.main.models import Section
-from smartbozor.qrcode import generate_qr_code
+from smartbozor.qrcode import qr_png_file
 
 
 class StallManager(models.Manager):
@@ -34,19 +32,12 @@ class Stall(models.Model):
 
     @property
     def qr_image_file(self):
-        cache_path = settings.MEDIA_ROOT / "qr-codes" / "stall" / str(self.id // 1000)
-        os.makedirs(cache_path, exist_ok=True)
-
-        cache_file = cache_path / f"{self.qr_data}.png"
-        if os.path.exists(cache_file):
-            return cache_file
+        return qr_png_file(*self.qr_label)
 
-        img = generate_qr_code("rasta-click.png", f"{settings.QR_CODE_LINK_HOST}/s/{self.qr_data}/", "RASTA",
-                               self.number)
-        img.save(cache_file, format="PNG", optimize=True, compress_level=9, dpi=(300, 300))
-        img.close()
-
-        return cache_file
+    @property
+    def qr_label(self):
+        # (shablon, havola, sarlavha, matn) - PNG va vektor PDF uchun umumiy
+        return "rasta-click.png", f"{settings.QR_CODE_LINK_HOST}/s/{self.qr_data}/", "RASTA", self.number
 
     @property
     def qr_data(self):
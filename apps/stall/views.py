@@ -1,30 +1,27 @@
-import base64
-import json
 import re
-from io import BytesIO
+import uuid
 
-import xlsxwriter
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.contrib.humanize.templatetags.humanize import intcomma
 from django.core.exceptions import PermissionDenied
 from django.db import transaction
-from django.db.models import OuterRef, Subquery, Sum, Count, F, Q
+from django.db.models import FilteredRelation, Sum, Count, F, Q
 from django.db.models.functions import Coalesce
-from django.http import Http404, JsonResponse, HttpResponse
+from django.http import Http404, JsonResponse
 from django.shortcuts import redirect
 from django.utils import timezone
-from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import ListView, DetailView, TemplateView
 from django_filters.views import FilterView
-from openpyxl import load_workbook
 
+from apps.main import importer
 from apps.main.models import Bazaar, Area, Section
+from apps.report.exports import FORMAT_XLSX, StallExport, start_export
 from apps.stall.filters import StallFilter
 from apps.stall.forms import StallCashForm
 from apps.stall.models import StallStatus, Stall
-from smartbozor.qrcode import render_qr_png_file
+from smartbozor.qrcode import serve_qr_png
 
 
 class StallBazaarChoiceView(LoginRequiredMixin, TemplateView):
@@ -57,13 +54,15 @@ class StallListView(LoginRequiredMixin, PermissionRequiredMixin, FilterView, Lis
 
     def get(self, request, *args, **kwargs):
         self.set_bazaar(request, *args, **kwargs)
-        return super().get(request, *args, **kwargs)
 
-    def render_to_response(self, context, **response_kwargs):
-        if self.request.GET.get("export", '0') == '1':
-            return self.export(context)
+        if request.GET.get("export", '0') == '1':
+            fmt = request.GET.get("format", FORMAT_XLSX)
+            if fmt not in StallExport.available_formats():
+                raise Http404
 
-        return super().render_to_response(context, **response_kwargs)
+            key = start_export(request.user, StallExport.name, {"bazaar_id": self.bazaar.id}, fmt)
+            return redirect("report:export", key)
+        return super().get(request, *args, **kwargs)
 
     def post(self, request, *args, **kwargs):
         self.set_bazaar(request, *args, **kwargs)
@@ -203,55 +202,6 @@ class StallListView(LoginRequiredMixin, PermissionRequiredMixin, FilterView, Lis
             "title": _("band") if is_occupied else _("band emas")
         })
 
-    def export(self, context):
-        self.set_bazaar(self.request, **self.kwargs)
-
-        xls = BytesIO()
-
-        workbook = xlsxwriter.Workbook(xls, {'in_memory': True})
-        worksheet = workbook.add_worksheet(name="Rastalar")
-
-        header_format = workbook.add_format({
-            'bg_color': '#263D54',
-            'bold': True,
-            'align': 'center',
-            'valign': 'vcenter',
-            'font_color': 'white',
-            'border': 1
-        })
-
-        uzs_format = workbook.add_format({
-            'num_format': '#,##0 "so\'m"',
-            'align': 'right'
-        })
-
-        text_center_format = workbook.add_format({
-            "align": "center",
-        })
-
-        worksheet.write(0, 0, str(_("Rasta raqami")), header_format)
-        worksheet.write(0, 1, str(_("Narxi")), header_format)
-
-        worksheet.set_column(0, 0, width=12)
-        worksheet.set_column(1, 1, width=12)
-
-        for row, stall in enumerate(Stall.objects.filter(section__area__bazaar_id=self.bazaar.id).order_by('id').all(), start=1):
-            worksheet.write(row, 0, stall.number, text_center_format)
-            worksheet.write(row, 1, stall.price, uzs_format)
-
-        workbook.close()
-
-        xls.seek(0)
-
-        name = f"{self.bazaar}-rastalar"
-        response = HttpResponse(xls, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'inline; filename="{}-{:%Y-%m-%d-%H-%M}.xlsx"'.format(
-            slugify(name),
-            timezone.localtime().now(),
-        )
-
-        return response
-
     def set_bazaar(self, request, *args, **kwargs):
         try:
             self.bazaar = Bazaar.objects.filter(
@@ -289,51 +239,61 @@ class StallListView(LoginRequiredMixin, PermissionRequiredMixin, FilterView, Lis
         return ss.is_occupied
 
     def get_queryset(self, add_annotate=True):
-        today = timezone.now().date()
-
-        def sub(field_name):
-            return StallStatus.objects.filter(
-                stall_id=OuterRef('pk'),
-                date=today
-            ).values(field_name)[:1]
-
         qs = super().get_queryset().filter(
             section__area__bazaar_id=self.bazaar.id
         )
 
         if add_annotate:
+            # Bugungi holat bitta LEFT JOIN orqali olinadi (har bir qator uchun alohida subquery emas)
+            today = timezone.localtime().date()
             qs = qs.annotate(
-                is_occupied_today=Coalesce(Subquery(sub("is_occupied")), False),
-                is_paid_today=Coalesce(Subquery(sub("is_paid")), False),
-                payment_method_today=Coalesce(Subquery(sub("payment_method")), 0),
-                payment_progress_today=Coalesce(Subquery(sub("payment_progress")), 0),
+                today_status=FilteredRelation("stallstatus", condition=Q(stallstatus__date=today)),
+            ).annotate(
+                is_occupied_today=Coalesce(F("today_status__is_occupied"), False),
+                is_paid_today=Coalesce(F("today_status__is_paid"), False),
+                payment_method_today=Coalesce(F("today_status__payment_method"), 0),
+                payment_progress_today=Coalesce(F("today_status__payment_progress"), 0),
             )
 
         return qs
 
+    def get_total(self):
+        paid = Q(is_paid_today=True)
+        amounts = {
+            f"amount_{method}": Sum("price", filter=paid & Q(payment_method_today=method))
+            for method in Bazaar.PAYMENT_METHOD_DICT
+        }
+
+        row = self.get_queryset(True).order_by().aggregate(
+            count=Count("id"),
+            occupied_count=Count("id", filter=Q(is_occupied_today=True)),
+            paid_count=Count("id", filter=paid),
+            paid_total=Coalesce(Sum("price", filter=paid), 0),
+            **amounts,
+        )
+
+        return {
+            "count": row["count"],
+            "paid": {
+                "count": row["paid_count"],
+                "total": row["paid_total"],
+            },
+            "occupied_count": row["occupied_count"],
+            "amount": [
+                {"payment_method_today": method, "total": row[f"amount_{method}"]}
+                for method in Bazaar.PAYMENT_METHOD_DICT
+                if row[f"amount_{method}"] is not None
+            ],
+        }
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["bazaar"] = self.bazaar
+        context["export_formats"] = StallExport.available_formats()
         context["PAGE_TITLE"] = str(self.bazaar) + " » " + _("Rastalar ro'yxati")
 
         if self.request.user.has_perm("stall.view_stallstatus"):
-            context["total"] = {
-                "count": self.get_queryset(False).count(),
-                "paid": self.get_queryset(True).order_by().filter(
-                    is_paid_today=True
-                ).aggregate(
-                    count=Count("id"),
-                    total=Coalesce(Sum("price"), 0),
-                ),
-                "occupied_count": self.get_queryset(True).order_by().filter(
-                    is_occupied_today=True
-                ).count(),
-                "amount": self.get_queryset(True).order_by().filter(
-                    is_paid_today=True
-                ).values("payment_method_today").annotate(
-                    total=Coalesce(Sum("price"), 0),
-                ).values("payment_method_today", "total")
-            }
+            context["total"] = self.get_total()
 
         return context
 
@@ -350,7 +310,7 @@ class StallQrCode(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
     def render_to_response(self, context, **response_kwargs):
         obj = self.object  # type: Stall
 
-        return render_qr_png_file(obj.qr_image_file)
+        return serve_qr_png(self.request, obj.qr_label)
 
 
 class StallImportView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
@@ -368,94 +328,60 @@ class StallImportView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
         except:
             pass
 
-        if step == 1:
+        if step == 2:
             try:
-                file = request.FILES.get('file')
-                workbook = load_workbook(file)
-                sheet = workbook.active
-
-                stall_wrong, duplicates, stall_skip, stall_insert, stall_update, stall_delete, import_list, can_save = self.check(
-                    sheet.iter_rows(values_only=True), skip_first_line=True
-                )
-            except Exception as e:
-                messages.error(request, str(e))
+                import_id = uuid.UUID(request.POST.get('import_id', ""))
+            except ValueError:
                 return redirect("stall:import", self.object.id)
-        elif step == 2:
-            stall_list = []
-            try:
-                stall_list = json.loads(base64.b64decode(request.POST.get('data', "")))
-            except:
-                step = 1
-                pass
-
-            if step == 2:
-                with transaction.atomic():
-                    area = Area.objects.filter(bazaar_id=self.object.id).order_by('id').first()
-                    section = Section.objects.filter(area_id=area.id).order_by('id').first()
-
-                    stall_wrong, duplicates, stall_skip, stall_insert, stall_update, stall_delete, import_list, can_save = self.check(
-                        stall_list, in_transaction=True
-                    )
-                    if can_save:
-                        if stall_insert:
-                            insert_objs = [Stall(
-                                section_id=section.id,
-                                number=n,
-                                price=p
-                            ) for n, p in stall_insert]
-                            Stall.objects.bulk_create(insert_objs, batch_size=10)
-
-                        if stall_update:
-                            for stall, p in stall_update:
-                                stall.price = p
-                                stall.save()
-
-                        if stall_delete:
-                            Stall.objects.filter(
-                                id__in=[row.id for row in stall_delete]
-                            ).delete()
-
-                        messages.success(request, _("Muvaffaqiyatli import qilindi."))
-                        return redirect("stall:list", self.object.id)
-                    else:
-                        # Agar saqlab bo'lmasa, userga ko'rsatamiz
-                        step = 1
+
+            area = Area.objects.filter(bazaar_id=self.object.id).order_by('id').first()
+            section = Section.objects.filter(area_id=area.id).order_by('id').first()
+
+            if importer.apply(importer.KIND_STALL, import_id, request.user, self.object, section.id):
+                messages.success(request, _("Muvaffaqiyatli import qilindi."))
+                return redirect("stall:list", self.object.id)
+
+            messages.error(request, _("Import muddati o'tgan, faylni qaytadan yuklang."))
+            return redirect("stall:import", self.object.id)
+
+        try:
+            stall_wrong, duplicates, rows = self.check(importer.read_sheet(request.FILES.get('file')))
+        except Exception as e:
+            messages.error(request, str(e))
+            return redirect("stall:import", self.object.id)
+
+        import_id = importer.stage(importer.KIND_STALL, request.user, self.object, rows)
+        changes = importer.diff(importer.KIND_STALL, import_id, request.user, self.object)
+        # To'g'ri qatorsiz fayl saqlanmaydi: aks holda hamma narsa o'chiriladigan ko'rinadi, apply esa importni topmaydi
+        can_save = bool(rows) and not stall_wrong and not duplicates and \
+            bool(changes["insert"] or changes["update"] or changes["delete"])
+        if not can_save:
+            importer.discard(import_id)
 
         context = self.get_context_data(object=self.object)
 
         context["step"] = step
         context["stall_wrong"] = stall_wrong
         context["duplicates"] = duplicates
-        context["stall_insert"] = stall_insert
-        context["stall_update"] = stall_update
-        context["stall_delete"] = stall_delete
-        context["stall_skip"] = stall_skip
-        context["import_data"] = base64.b64encode(json.dumps(import_list).encode('utf-8')).decode('utf-8')
+        context["stall_insert"] = changes["insert"]
+        context["stall_update"] = changes["update"]
+        context["stall_delete"] = changes["delete"]
+        context["stall_skip"] = changes["skip"]
+        context["import_id"] = import_id
         context["can_save"] = can_save
 
         return self.render_to_response(context)
 
-    def check(self, stall_list, *, in_transaction=False, skip_first_line=False):
-        stall_wrong, duplicates, stall_skip, stall_insert, stall_update, stall_delete = [], [], [], [], [], []
-        stall_processed, import_list = set(), []
-
-        qs = Stall.objects.filter(
-            section__area__bazaar_id=self.object.id
-        )
-        if in_transaction:
-            qs = qs.select_for_update()
-
-        stall_by_number = {row.number: row for row in qs.all()}
-
-        for n, row in enumerate(stall_list):
-            if skip_first_line and n == 0:  # Skip header
-                continue
+    def check(self, rows):
+        """Qatorlarni tekshiradi: (noto'g'rilar, dublikatlar, [(line, number, None, price)])"""
+        stall_wrong, duplicates, valid = [], [], []
+        stall_processed = set()
 
+        for line, row in rows:
             if len(row) < 2:
                 raise Exception(_("Faylda kamida 2 ta ustun bo'lishi lozim"))
 
             number, price = map(lambda s: s.strip(), map(str, row[:2]))
-            import_list.append((number, price))
 
             if not re.match(Stall.NUMBER_PATTERN, number) or not re.match("^[0-9]+$", price):
                 stall_wrong.append((number, price))
@@ -468,20 +394,6 @@ class StallImportView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
                 continue
 
             stall_processed.add(number)
+            valid.append((line, number, None, price))
 
-            if number not in stall_by_number:
-                # Agar DB da mavjud bo'lmasa
-                stall_insert.append((number, price))
-            else:
-                stall = stall_by_number[number]
-                del stall_by_number[number]
-
-                if stall.price == price:
-                    stall_skip.append(stall)
-                else:
-                    stall_update.append((stall, price))
-
-        stall_delete.extend(stall_by_number.values())
-        can_save = not stall_wrong and not duplicates and (stall_insert or stall_update or stall_delete)
-
-        return stall_wrong, duplicates, stall_skip, stall_insert, stall_update, stall_delete, import_list, can_save
+        return stall_wrong, duplicates, valid
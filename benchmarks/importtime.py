@@ -0,0 +1,143 @@
+"""
+Jarayon turlari (wsgi, asgi, celery worker) bo'yicha start-up auditi: `python -X importtime` asosida
+import vaqti, eng og'ir modullar, maksimal RSS va web/worker'da bo'lmasligi kerak bo'lgan og'ir kutubxonalar.
+
+    python benchmarks/importtime.py
+    python benchmarks/importtime.py --type web --top 40 --json importtime.json
+
+Byudjetdan oshsa yoki taqiqlangan modul yuklansa exit code 1.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Faqat kerak bo'lganda (funksiya ichida) import qilinadigan kutubxonalar
+FORBIDDEN = (
+    "numpy", "cv2", "fitz", "pymupdf", "PIL", "qrcode", "openpyxl", "xlsxwriter", "pyarrow",
+    "clickhouse_connect", "prompt_toolkit",
+)
+
+_SETUP = (
+    "import os\n"
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smartbozor.settings')\n"
+)
+
+_RESOLVE_URLS = (
+    # Birinchi so'rovda baribir yuklanadi: barcha view modullari
+    "from django.urls import get_resolver\n"
+    "get_resolver().url_patterns\n"
+)
+
+_REPORT = (
+    "import json, resource, sys\n"
+    "print(json.dumps({'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,"
+    " 'modules': sorted(sys.modules)}))\n"
+)
+
+# tur -> (kod, start-up byudjeti soniyada, RSS byudjeti MB da)
+PROCESS_TYPES = {
+    "web": (_SETUP + "from smartbozor.wsgi import application\n" + _RESOLVE_URLS, 1.5, 140),
+    "asgi": (_SETUP + "from smartbozor.asgi import application\n" + _RESOLVE_URLS, 1.8, 160),
+    "worker": (_SETUP + "from smartbozor.celery import app\napp.loader.import_default_modules()\n", 2.0, 170),
+}
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def parse_importtime(stderr):
+    """[(modul, self_us, cumulative_us, chuqurlik)]"""
+    rows = []
+    for line in stderr.splitlines():
+        m = IMPORTTIME_RE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+    return rows
+
+
+def measure(code):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code + _REPORT],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-4000:])
+
+    report = json.loads(proc.stdout.strip().splitlines()[-1])
+    rows = parse_importtime(proc.stderr)
+    # Linux: ru_maxrss kilobaytda
+    return {
+        "wall_s": wall,
+        "import_s": sum(cumulative for __, __, cumulative, depth in rows if depth == 0) / 1e6,
+        "rss_mb": report["rss_kb"] / 1024,
+        "modules": report["modules"],
+        "rows": rows,
+    }
+
+
+def audit(name, repeat, top):
+    code, budget_s, budget_mb = PROCESS_TYPES[name]
+    runs = [measure(code) for __ in range(repeat)]
+    best = min(runs, key=lambda r: r["wall_s"])
+
+    loaded = {module.split(".")[0] for module in best["modules"]}
+    forbidden = sorted(loaded & set(FORBIDDEN))
+
+    heaviest = sorted(best["rows"], key=lambda r: r[2], reverse=True)
+    heaviest_top = [(module, cumulative / 1000) for module, __, cumulative, depth in heaviest if depth == 0][:top]
+
+    return {
+        "type": name,
+        "wall_s": round(best["wall_s"], 3),
+        "import_s": round(best["import_s"], 3),
+        "rss_mb": round(max(r["rss_mb"] for r in runs), 1),
+        "modules": len(best["modules"]),
+        "budget_s": budget_s,
+        "budget_mb": budget_mb,
+        "forbidden": forbidden,
+        "heaviest_ms": [[module, round(ms, 1)] for module, ms in heaviest_top],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--type", action="append", choices=sorted(PROCESS_TYPES), help="Faqat shu jarayon tur(lar)i")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--json", help="Natijani shu faylga yozish")
+    parser.add_argument("--no-budget", action="store_true", help="Byudjetdan oshsa ham exit code 0")
+    args = parser.parse_args()
+
+    results, failed = [], False
+    for name in args.type or list(PROCESS_TYPES):
+        result = audit(name, max(args.repeat, 1), args.top)
+        results.append(result)
+
+        over = result["wall_s"] > result["budget_s"] or result["rss_mb"] > result["budget_mb"] or result["forbidden"]
+        failed = failed or bool(over)
+
+        print(f"{name}: start-up {result['wall_s']:.3f}s (budget {result['budget_s']}s), "
+              f"imports {result['import_s']:.3f}s, RSS {result['rss_mb']:.1f}MB (budget {result['budget_mb']}MB), "
+              f"modules {result['modules']}" + ("  OVER BUDGET" if over else ""))
+        if result["forbidden"]:
+            print("\tforbidden:", ", ".join(result["forbidden"]))
+        for module, ms in result["heaviest_ms"]:
+            print(f"\t{ms:>9.1f} ms  {module}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    return 1 if failed and not args.no_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
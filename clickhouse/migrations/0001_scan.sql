@@ -0,0 +1,13 @@
+-- clickhouse_init.sh bilan yaratilgan boshlang'ich sxema
+CREATE DATABASE IF NOT EXISTS smartbozor;
+
+CREATE TABLE IF NOT EXISTS smartbozor.scan
+(
+    scan_at     DateTime,
+    object_type CHAR(1),
+    object_id   Int64
+)
+ENGINE = MergeTree()
+PARTITION BY toYYYYMM(scan_at)
+ORDER BY (scan_at)
+PRIMARY KEY scan_at;
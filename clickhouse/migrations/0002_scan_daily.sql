@@ -0,0 +1,75 @@
+-- Kunlik (Asia/Tashkent) skanerlar soni: (day, object_type, object_id)
+CREATE TABLE IF NOT EXISTS smartbozor.scan_daily
+(
+    day          Date,
+    object_type  LowCardinality(String),
+    object_id    Int64,
+    scans        SimpleAggregateFunction(sum, UInt64),
+    last_scan_at SimpleAggregateFunction(max, DateTime)
+)
+ENGINE = AggregatingMergeTree()
+PARTITION BY toYYYYMM(day)
+ORDER BY (day, object_type, object_id);
+
+-- Backfill chegarasi MV yaratilishidan oldin bir marta olinadi va qayta ishga tushirilganda o'zgarmaydi:
+-- MV undan keyingi yozuvlarni, backfill esa undan oldingi skanerlarni hisoblaydi
+CREATE TABLE IF NOT EXISTS smartbozor.scan_daily_backfill
+(
+    step String,
+    at   DateTime
+)
+ENGINE = ReplacingMergeTree()
+ORDER BY step;
+
+INSERT INTO smartbozor.scan_daily_backfill
+SELECT 'cutoff', now()
+WHERE (SELECT count() FROM smartbozor.scan_daily_backfill WHERE step = 'cutoff') = 0;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS smartbozor.scan_daily_mv TO smartbozor.scan_daily AS
+SELECT
+    toDate(scan_at, 'Asia/Tashkent') AS day,
+    object_type,
+    object_id,
+    count() AS scans,
+    max(scan_at) AS last_scan_at
+FROM smartbozor.scan
+GROUP BY day, object_type, object_id;
+
+-- Chegaradan oldingi to'liq kunlarda MV qatorlari yo'q: avval o'chirib, keyin qayta yoziladi (idempotent)
+ALTER TABLE smartbozor.scan_daily DELETE
+WHERE day < (SELECT toDate(min(at), 'Asia/Tashkent') FROM smartbozor.scan_daily_backfill WHERE step = 'cutoff')
+SETTINGS mutations_sync = 1, allow_nondeterministic_mutations = 1;
+
+INSERT INTO smartbozor.scan_daily
+SELECT
+    toDate(scan_at, 'Asia/Tashkent') AS day,
+    object_type,
+    object_id,
+    count() AS scans,
+    max(scan_at) AS last_scan_at
+FROM smartbozor.scan
+WHERE scan_at < (
+    SELECT toStartOfDay(min(at), 'Asia/Tashkent') FROM smartbozor.scan_daily_backfill WHERE step = 'cutoff'
+)
+GROUP BY day, object_type, object_id;
+
+-- Chegara kunining boshidan chegaragacha: bu kunda MV qatorlari ham bor, o'chirib bo'lmaydi,
+-- shuning uchun bir martalik va 'partial' belgisi bilan himoyalangan
+INSERT INTO smartbozor.scan_daily
+SELECT
+    toDate(scan_at, 'Asia/Tashkent') AS day,
+    object_type,
+    object_id,
+    count() AS scans,
+    max(scan_at) AS last_scan_at
+FROM smartbozor.scan
+WHERE scan_at >= (
+    SELECT toStartOfDay(min(at), 'Asia/Tashkent') FROM smartbozor.scan_daily_backfill WHERE step = 'cutoff'
+)
+  AND scan_at < (SELECT min(at) FROM smartbozor.scan_daily_backfill WHERE step = 'cutoff')
+  AND (SELECT count() FROM smartbozor.scan_daily_backfill WHERE step = 'partial') = 0
+GROUP BY day, object_type, object_id;
+
+INSERT INTO smartbozor.scan_daily_backfill
+SELECT 'partial', now()
+WHERE (SELECT count() FROM smartbozor.scan_daily_backfill WHERE step = 'partial') = 0;
@@ -0,0 +1,7 @@
+-- Obyekt bo'yicha so'rovlar (object_type, object_id, scan_at) to'liq skanersiz ishlashi uchun
+ALTER TABLE smartbozor.scan ADD PROJECTION IF NOT EXISTS scan_by_object
+(
+    SELECT * ORDER BY (object_type, object_id, scan_at)
+);
+
+ALTER TABLE smartbozor.scan MATERIALIZE PROJECTION scan_by_object;
@@ -0,0 +1,137 @@
+-- Postgres cdc_outbox'dan keladigan jadvallar (smartbozor/cdc.py).
+-- _version = outbox id (backfill uchun 0), _deleted = 1 o'chirilgan qator.
+-- O'qishda FINAL yoki argMax(..., _version) ishlatiladi.
+CREATE TABLE IF NOT EXISTS smartbozor.cdc_stall_status
+(
+    id               Int64,
+    stall_id         Int64,
+    date             Date,
+    is_occupied      Bool,
+    is_paid          Bool,
+    payment_method   Int32,
+    payment_progress Int16,
+    price            Int64,
+    occupied_at      Nullable(DateTime64(6, 'UTC')),
+    paid_at          Nullable(DateTime64(6, 'UTC')),
+    _version         UInt64,
+    _deleted         UInt8
+)
+ENGINE = ReplacingMergeTree(_version, _deleted)
+PARTITION BY toYYYYMM(date)
+ORDER BY (date, id);
+
+CREATE TABLE IF NOT EXISTS smartbozor.cdc_thing_status
+(
+    id               Int64,
+    bazaar_id        Int64,
+    thing_id         Int64,
+    number           Int32,
+    date             Date,
+    is_occupied      Bool,
+    is_paid          Bool,
+    payment_method   Int32,
+    payment_progress Int16,
+    price            Int64,
+    occupied_at      Nullable(DateTime64(6, 'UTC')),
+    paid_at          Nullable(DateTime64(6, 'UTC')),
+    _version         UInt64,
+    _deleted         UInt8
+)
+ENGINE = ReplacingMergeTree(_version, _deleted)
+PARTITION BY toYYYYMM(date)
+ORDER BY (date, id);
+
+CREATE TABLE IF NOT EXISTS smartbozor.cdc_shop_payment
+(
+    id             Int64,
+    shop_id        Int64,
+    date           Date,
+    nonce          String,
+    payment_method Int32,
+    amount         Int64,
+    paid_at        Nullable(DateTime64(6, 'UTC')),
+    _version       UInt64,
+    _deleted       UInt8
+)
+ENGINE = ReplacingMergeTree(_version, _deleted)
+PARTITION BY toYYYYMM(date)
+ORDER BY (date, id);
+
+CREATE TABLE IF NOT EXISTS smartbozor.cdc_parking_status
+(
+    id               Int64,
+    parking_id       Int64,
+    date             Date,
+    number           String,
+    is_paid          Bool,
+    payment_method   Int32,
+    payment_progress Int16,
+    price            Int64,
+    duration         Int64,
+    enter_count      Int32,
+    leave_count      Int32,
+    enter_at         DateTime64(6, 'UTC'),
+    leave_at         Nullable(DateTime64(6, 'UTC')),
+    paid_at          Nullable(DateTime64(6, 'UTC')),
+    _version         UInt64,
+    _deleted         UInt8
+)
+ENGINE = ReplacingMergeTree(_version, _deleted)
+PARTITION BY toYYYYMM(date)
+ORDER BY (date, id);
+
+CREATE TABLE IF NOT EXISTS smartbozor.cdc_receipt
+(
+    id          Int64,
+    user_id     Int64,
+    bazaar_id   Int64,
+    object_type Int16,
+    object_id   Int64,
+    amount      Int64,
+    status      Int16,
+    ofd_link    Nullable(String),
+    ofd_time    Int64,
+    added_at    DateTime64(6, 'UTC'),
+    _version    UInt64,
+    _deleted    UInt8
+)
+ENGINE = ReplacingMergeTree(_version, _deleted)
+PARTITION BY toYYYYMM(added_at)
+ORDER BY (added_at, id);
+
+CREATE TABLE IF NOT EXISTS smartbozor.cdc_click
+(
+    id              Int64,
+    order_type      LowCardinality(String),
+    order_id        Int64,
+    click_trans_id  Int64,
+    click_paydoc_id Int64,
+    amount          Int64,
+    status          Int16,
+    prepare_time    DateTime64(6, 'UTC'),
+    complete_time   Nullable(DateTime64(6, 'UTC')),
+    _version        UInt64,
+    _deleted        UInt8
+)
+ENGINE = ReplacingMergeTree(_version, _deleted)
+PARTITION BY toYYYYMM(prepare_time)
+ORDER BY (prepare_time, id);
+
+CREATE TABLE IF NOT EXISTS smartbozor.cdc_payme
+(
+    id           Int64,
+    order_type   LowCardinality(String),
+    order_id     Int64,
+    payme_id     String,
+    amount       Int64,
+    state        Int16,
+    reason       Nullable(Int16),
+    create_time  DateTime64(6, 'UTC'),
+    perform_time Nullable(DateTime64(6, 'UTC')),
+    cancel_time  Nullable(DateTime64(6, 'UTC')),
+    _version     UInt64,
+    _deleted     UInt8
+)
+ENGINE = ReplacingMergeTree(_version, _deleted)
+PARTITION BY toYYYYMM(create_time)
+ORDER BY (create_time, id);
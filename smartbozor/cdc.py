@@ -0,0 +1,147 @@
+import datetime
+import json
+
+from django.db import connection, transaction
+
+from smartbozor.helpers import clickhouse_client
+
+# Postgres jadvali -> ClickHouse ReplacingMergeTree jadvali (clickhouse/migrations/0004_cdc.sql)
+CDC_TABLES = {
+    "stall_stallstatus": "smartbozor.cdc_stall_status",
+    "rent_thingstatus": "smartbozor.cdc_thing_status",
+    "shop_shoppayment": "smartbozor.cdc_shop_payment",
+    "parking_parkingstatus": "smartbozor.cdc_parking_status",
+    "main_receipt": "smartbozor.cdc_receipt",
+    "payment_click": "smartbozor.cdc_click",
+    "payment_payme": "smartbozor.cdc_payme",
+}
+
+CDC_LOCK_ID = 7_040_001
+DRAIN_BATCH_SIZE = 5000
+
+CLICKHOUSE_INSERT_SETTINGS = {
+    "input_format_skip_unknown_fields": 1,
+    "date_time_input_format": "best_effort",
+}
+
+OUTBOX_SQL = """
+CREATE TABLE cdc_outbox
+(
+    id         BIGSERIAL PRIMARY KEY,
+    table_name VARCHAR(64) NOT NULL,
+    op         CHAR(1)     NOT NULL,
+    row        JSONB       NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION cdc_capture_trg() RETURNS trigger AS $$
+BEGIN
+    -- Bo'lingan jadvallarda TG_TABLE_NAME bo'lim nomi bo'ladi, shuning uchun ota jadval nomi argumentda
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO cdc_outbox (table_name, op, row) VALUES (TG_ARGV[0], 'D', to_jsonb(OLD));
+    ELSE
+        INSERT INTO cdc_outbox (table_name, op, row) VALUES (TG_ARGV[0], left(TG_OP, 1), to_jsonb(NEW));
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+OUTBOX_REVERSE_SQL = """
+DROP FUNCTION IF EXISTS cdc_capture_trg() CASCADE;
+DROP TABLE IF EXISTS cdc_outbox;
+"""
+
+
+def trigger_sql(table):
+    return (
+        f"CREATE TRIGGER {table}_cdc AFTER INSERT OR UPDATE OR DELETE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION cdc_capture_trg('{table}');"
+    )
+
+
+def trigger_reverse_sql(table):
+    return f"DROP TRIGGER IF EXISTS {table}_cdc ON {table};"
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+
+    return str(value)
+
+
+def _insert(client, table, rows):
+    block = "\n".join(json.dumps(row, default=_json_default) for row in rows).encode()
+    client.raw_insert(CDC_TABLES[table], insert_block=block, fmt="JSONEachRow", settings=CLICKHOUSE_INSERT_SETTINGS)
+
+
+def drain(batch_size=DRAIN_BATCH_SIZE, client=None):
+    """
+    Outbox'dan bitta tartiblangan partiyani ClickHouse'ga o'tkazadi va o'chiradi.
+    Versiya = outbox id: partiya qayta yuborilsa ham ReplacingMergeTree bitta qatorni qoldiradi.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Bir vaqtda faqat bitta worker
+        cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", [CDC_LOCK_ID])
+        if not cursor.fetchone()[0]:
+            return 0
+
+        cursor.execute("SELECT id, table_name, op, row FROM cdc_outbox ORDER BY id LIMIT %s", [batch_size])
+        rows = cursor.fetchall()
+        if not rows:
+            return 0
+
+        by_table = dict()
+        for outbox_id, table, op, row in rows:
+            if isinstance(row, str):
+                row = json.loads(row)
+
+            row["_version"] = outbox_id
+            row["_deleted"] = 1 if op == "D" else 0
+            by_table.setdefault(table, []).append(row)
+
+        client = client or clickhouse_client()
+        for table, table_rows in by_table.items():
+            if table in CDC_TABLES:
+                _insert(client, table, table_rows)
+
+        cursor.execute("DELETE FROM cdc_outbox WHERE id = ANY(%s)", [[row[0] for row in rows]])
+
+    return len(rows)
+
+
+def backfill(table, batch_size=DRAIN_BATCH_SIZE, log=print):
+    """
+    Tarixni yuklash. Versiya 0: trigger orqali kelgan har qanday o'zgarish undan ustun turadi,
+    shuning uchun backfill va drain bir vaqtda ishlashi mumkin.
+    """
+    client = clickhouse_client()
+    last_id, total = 0, 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, to_jsonb(t) FROM {table} AS t WHERE id > %s ORDER BY id LIMIT %s",
+                [last_id, batch_size]
+            )
+            rows = cursor.fetchall()
+
+        if not rows:
+            break
+
+        batch = []
+        for row_id, row in rows:
+            if isinstance(row, str):
+                row = json.loads(row)
+            row["_version"] = 0
+            row["_deleted"] = 0
+            batch.append(row)
+
+        _insert(client, table, batch)
+
+        last_id = rows[-1][0]
+        total += len(rows)
+        log("\t", table, "rows:", total)
+
+    return total
@@ -12,3 +12,8 @@ app.conf.enable_utc = False
 app.conf.broker_connection_retry_on_startup = True
 
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
+
+# View'lar kabi tasklar uchun ham SQL statistikasi
+from smartbozor.instrumentation import connect_celery_signals
+
+connect_celery_signals()
@@ -0,0 +1,77 @@
+import os
+import re
+
+from django.conf import settings
+
+from smartbozor.helpers import clickhouse_client
+
+MIGRATIONS_DIR = settings.BASE_DIR / "clickhouse" / "migrations"
+MIGRATIONS_TABLE = "smartbozor.schema_migrations"
+
+MIGRATION_FILE_RE = re.compile(r"^(\d{4})_[a-z0-9_]+\.sql$")
+
+
+def migration_files():
+    """[(version, name, path)] versiya bo'yicha tartiblangan"""
+    result = []
+    for name in sorted(os.listdir(MIGRATIONS_DIR)):
+        m = MIGRATION_FILE_RE.match(name)
+        if m:
+            result.append((m.group(1), name[:-4], MIGRATIONS_DIR / name))
+
+    return result
+
+
+def split_statements(sql):
+    # Izohlarni olib tashlab, ";" bilan tugagan qatorlar bo'yicha bo'lamiz
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [s.strip() for s in re.split(r";\s*$", "\n".join(lines), flags=re.M) if s.strip()]
+
+
+def ensure_migrations_table(client):
+    client.command("CREATE DATABASE IF NOT EXISTS smartbozor")
+    client.command(f"""
+        CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE}
+        (
+            version    String,
+            name       String,
+            applied_at DateTime DEFAULT now()
+        )
+        ENGINE = ReplacingMergeTree(applied_at)
+        ORDER BY version
+    """)
+
+
+def applied_versions(client):
+    return {row[0] for row in client.query(f"SELECT version FROM {MIGRATIONS_TABLE} FINAL").result_rows}
+
+
+def migrate(fake=False, log=print):
+    client = clickhouse_client()
+    ensure_migrations_table(client)
+    applied = applied_versions(client)
+
+    done = []
+    for version, name, path in migration_files():
+        if version in applied:
+            continue
+
+        log("Applying", name, "(fake)" if fake else "")
+        if not fake:
+            with open(path) as f:
+                for statement in split_statements(f.read()):
+                    client.command(statement)
+
+        client.insert(MIGRATIONS_TABLE, [[version, name]], column_names=["version", "name"])
+        done.append(name)
+
+    return done
+
+
+def show_migrations(log=print):
+    client = clickhouse_client()
+    ensure_migrations_table(client)
+    applied = applied_versions(client)
+
+    for version, name, __ in migration_files():
+        log("[X]" if version in applied else "[ ]", name)
@@ -1,4 +1,4 @@
-from apps.rent.models import Thing
+from smartbozor.navigation import get_navigation
 
 
 def smartbozor(request):
@@ -12,10 +12,11 @@ def smartbozor(request):
         if cls and hasattr(cls, "TITLE"):
             current_title = cls.TITLE
 
-    allowed_bazaar = list(request.user.allowed_bazaar.prefetch_related('district__region').order_by("id").all())
+    navigation = get_navigation(request.user)
+    allowed_bazaar = navigation["bazaars"]
     return {
         "ALLOWED_BAZAAR": allowed_bazaar,
         "ALLOWED_BAZAAR_ID": set([row.id for row in allowed_bazaar]),
         "TITLE": current_title,
-        "THINGS": Thing.objects.order_by('id').all()
+        "THINGS": navigation["things"],
     }
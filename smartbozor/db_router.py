@@ -0,0 +1,98 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+REPLICA_ALIAS = "replica"
+LAG_CHECK_INTERVAL = 10
+
+# Joriy kontekstdagi o'qish bazasi: None -> default (primary)
+_read_alias = ContextVar("db_read_alias", default=None)
+
+_lag_lock = threading.Lock()
+_lag_cache = [0.0, None]  # [tekshirilgan vaqt, lag soniyada | None (replika ishlamayapti)]
+
+
+def has_replica():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def replica_lag():
+    with _lag_lock:
+        checked_at, lag = _lag_cache
+        if time.monotonic() - checked_at < LAG_CHECK_INTERVAL:
+            return lag
+
+    try:
+        with connections[REPLICA_ALIAS].cursor() as cursor:
+            cursor.execute("""
+                SELECT CASE
+                    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+                END
+            """)
+            lag = float(cursor.fetchone()[0])
+    except Exception:
+        lag = None
+
+    with _lag_lock:
+        _lag_cache[0], _lag_cache[1] = time.monotonic(), lag
+
+    return lag
+
+
+def replica_available(include_today=True):
+    if not has_replica():
+        return False
+
+    lag = replica_lag()
+    if lag is None:
+        return False
+
+    # Bugungi ma'lumotlar uchun replika orqada qolgan bo'lsa primary'dan o'qiymiz
+    return not include_today or lag <= settings.DATABASE_REPLICA_MAX_LAG
+
+
+@contextmanager
+def use_replica(include_today=True):
+    """Faqat o'qiydigan analitika (hisobot, dashboard, eksport, AI) uchun"""
+    token = _read_alias.set(REPLICA_ALIAS if replica_available(include_today) else None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+@contextmanager
+def use_primary():
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def read_alias():
+    return _read_alias.get() or "default"
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        # Tranzaksiya ichidagi (select_for_update va h.k.) o'qishlar doim primary'da
+        if alias is None or connections["default"].in_atomic_block:
+            return None
+
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
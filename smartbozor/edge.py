@@ -0,0 +1,124 @@
+import asyncio
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+ACCESS_TOKEN = os.environ.get("CONTROL_ACCESS_TOKEN")
+EDGE_PORT = 1984
+CHUNK_SIZE = 64 * 1024
+POOL_SIZE = 16
+CACHE_MAX_ITEMS = 512
+
+_sessions = dict()
+_sessions_lock = threading.Lock()
+
+# url -> (expires_at, EdgeResponse)
+_cache = dict()
+# url -> asyncio.Future, bir vaqtda kelgan so'rovlar bitta upstream so'rovni kutadi
+_inflight = dict()
+
+
+class EdgeResponse:
+    def __init__(self, status_code, content_type, content):
+        self.status_code = status_code
+        self.content_type = content_type
+        self.content = content
+
+
+def edge_url(server_ip, path):
+    return f"http://{server_ip}:{EDGE_PORT}/{path.lstrip('/')}"
+
+
+def edge_session(server_ip):
+    # Har bir edge server uchun umumiy keep-alive ulanishlar puli
+    with _sessions_lock:
+        session = _sessions.get(server_ip)
+        if session is None:
+            session = requests.Session()
+            session.headers["Authorization"] = f"Bearer {ACCESS_TOKEN}"
+            session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE))
+            _sessions[server_ip] = session
+
+        return session
+
+
+def _fetch(server_ip, path, timeout):
+    resp = edge_session(server_ip).get(edge_url(server_ip, path), timeout=timeout)
+    resp.raise_for_status()
+    return EdgeResponse(resp.status_code, resp.headers.get("Content-Type", "application/octet-stream"), resp.content)
+
+
+def _cache_put(url, ttl, result):
+    now = time.monotonic()
+    if len(_cache) >= CACHE_MAX_ITEMS:
+        for key in [k for k, (expires_at, _) in _cache.items() if expires_at <= now]:
+            del _cache[key]
+        if len(_cache) >= CACHE_MAX_ITEMS:
+            _cache.clear()
+
+    _cache[url] = (now + ttl, result)
+
+
+async def edge_fetch(server_ip, path, ttl=1.0, timeout=10):
+    url = edge_url(server_ip, path)
+
+    hit = _cache.get(url)
+    if hit and hit[0] > time.monotonic():
+        return hit[1]
+
+    future = _inflight.get(url)
+    if future is not None:
+        return await asyncio.shield(future)
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[url] = future
+    try:
+        result = await asyncio.to_thread(_fetch, server_ip, path, timeout)
+        if ttl > 0:
+            _cache_put(url, ttl, result)
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        # Kutuvchilar bo'lmasa "exception was never retrieved" ogohlantirishi chiqmasin
+        future.exception()
+        raise
+    finally:
+        _inflight.pop(url, None)
+
+
+class EdgeStream:
+    def __init__(self, resp):
+        self.resp = resp
+        self.status_code = resp.status_code
+        self.content_type = resp.headers.get("Content-Type", "application/octet-stream")
+        self.content_length = resp.headers.get("Content-Length")
+
+    async def body(self):
+        chunks = self.resp.iter_content(CHUNK_SIZE)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            self.resp.close()
+
+
+def _open_stream(server_ip, path, timeout):
+    resp = edge_session(server_ip).get(edge_url(server_ip, path), timeout=timeout, stream=True)
+    try:
+        resp.raise_for_status()
+    except Exception:
+        resp.close()
+        raise
+
+    return EdgeStream(resp)
+
+
+async def edge_stream(server_ip, path, timeout=10):
+    return await asyncio.to_thread(_open_stream, server_ip, path, timeout)
@@ -0,0 +1,70 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+
+from django.db import connections, transaction
+from django.db.models import QuerySet
+
+from smartbozor.db_router import read_alias
+
+DEFAULT_TIMEOUT = 20
+MAX_WORKERS = 8
+
+
+class FanoutTimeout(TimeoutError):
+    pass
+
+
+def _run(query, alias, deadline):
+    try:
+        with transaction.atomic(using=alias):
+            connection = connections[alias]
+            if connection.vendor == "postgresql":
+                # Byudjet tugasa so'rov serverning o'zida bekor qilinadi
+                budget_ms = max(int((deadline - time.monotonic()) * 1000), 1)
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL statement_timeout = %s", [budget_ms])
+
+            if isinstance(query, QuerySet):
+                return list(query.using(alias))
+
+            return query()
+    finally:
+        # Har bir oqim o'z ulanishini ochadi, pulga qaytarilmaydi
+        connections.close_all()
+
+
+def fanout(queries, timeout=DEFAULT_TIMEOUT, using=None, max_workers=MAX_WORKERS):
+    """
+    {nom: QuerySet | callable} ni parallel bajarib {nom: natija} qaytaradi.
+    QuerySet -> list(...), callable -> callable() qiymati.
+    Umumiy vaqt byudjeti timeout soniya; oshsa yoki biror so'rov xato bersa qolganlari bekor qilinadi.
+    """
+    if not queries:
+        return {}
+
+    # use_replica() konteksti bo'lsa replika, aks holda default
+    alias = using or read_alias()
+    deadline = time.monotonic() + timeout
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(queries)), thread_name_prefix="fanout")
+    try:
+        futures = {
+            executor.submit(contextvars.copy_context().run, _run, query, alias, deadline): name
+            for name, query in queries.items()
+        }
+        done, pending = wait(futures, timeout=timeout, return_when=FIRST_EXCEPTION)
+
+        for future in done:
+            if future.exception() is not None:
+                raise future.exception()
+
+        if pending:
+            raise FanoutTimeout("Queries did not finish in {0}s: {1}".format(
+                timeout, ", ".join(sorted(futures[f] for f in pending))
+            ))
+
+        return {futures[future]: future.result() for future in done}
+    finally:
+        # Boshlanmaganlari bekor qilinadi, ishlayotganlari statement_timeout bilan to'xtaydi
+        executor.shutdown(wait=False, cancel_futures=True)
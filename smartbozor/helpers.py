@@ -7,7 +7,6 @@ import uuid
 from urllib.parse import urlencode
 from string import digits, ascii_lowercase
 
-import clickhouse_connect
 from django.conf import settings
 from django.utils.dates import WEEKDAYS_ABBR
 from django.utils.deconstruct import deconstructible
@@ -59,13 +58,17 @@ def normalize_d(data, year, month):
 
     return ds, de
 
-def range_d(month, d):
+def bounds_d(month, d):
     ds, de = map(int, d.split('-'))
     if ds == 0 and de == 0:
         ds, de = 1, calendar.monthrange(month.year, month.month)[1]
     elif de == 0:
         de = ds
 
+    return ds, de
+
+def range_d(month, d):
+    ds, de = bounds_d(month, d)
     for d in range(ds, de + 1):
         yield month.replace(day=d)
 
@@ -134,15 +137,19 @@ class DayWeekCalendar(calendar.HTMLCalendar):
         return ''.join(v)
 
 
-def run_clickhouse_sql(sql, **parameters):
-    client = clickhouse_connect.get_client(
+def clickhouse_client():
+    import clickhouse_connect
+
+    return clickhouse_connect.get_client(
         host=settings.CLICKHOUSE_HOST,
         port=settings.CLICKHOUSE_PORT,
         username=settings.CLICKHOUSE_USERNAME,
         password=settings.CLICKHOUSE_PASSWORD
     )
 
-    return client.query(query=sql, parameters=parameters)
+
+def run_clickhouse_sql(sql, **parameters):
+    return clickhouse_client().query(query=sql, parameters=parameters)
 
 
 def to_int(s, default=None):
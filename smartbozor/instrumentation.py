@@ -0,0 +1,289 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from smartbozor.redis import REDIS_CLIENT
+
+# View va Celery tasklar bo'yicha SQL so'rovlar soni, DB vaqti, javob vaqti va N+1 (bir xil shablonli) so'rovlar.
+# Daqiqalik Redis hashlarida (rolling oyna) va umumiy hisoblagichlarda (Prometheus) yig'iladi.
+
+logger = logging.getLogger("smartbozor.instrumentation")
+
+BUCKET_KEY = "instr:bucket:{0}"
+TOTAL_KEY = "instr:total"
+SIMILAR_KEY = "instr:similar:{0}"
+BUCKET_TTL = 2 * 3600
+SIMILAR_TTL = 24 * 3600
+# Bir so'rov ichida shu marta takrorlangan shablon N+1 hisoblanadi
+SIMILAR_THRESHOLD = 5
+FIELDS = ("count", "queries", "duplicates", "similar", "db_ms", "time_ms", "over_budget")
+
+_literal_re = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_in_list_re = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """Qiymatlardan tozalangan so'rov shabloni: IN (%s, %s, ...) -> IN (...)"""
+    sql = _literal_re.sub("?", sql)
+    return _in_list_re.sub("(...)", sql)
+
+
+class Recorder:
+    def __init__(self, name, budget=None):
+        self.name = name
+        self.budget = budget
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+        self.shapes = Counter()
+        self.started = time.monotonic()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.monotonic() - started
+            self.queries += 1
+            self.statements[(sql, repr(params))] += 1
+            self.shapes[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        return sum(n - 1 for n in self.statements.values() if n > 1)
+
+    def similar(self):
+        return [(shape, n) for shape, n in self.shapes.items() if n >= SIMILAR_THRESHOLD]
+
+
+def enabled():
+    return settings.INSTRUMENTATION
+
+
+def start(name, budget=None):
+    """Barcha ulanishlarga recorder o'rnatadi, (recorder, stack) qaytaradi"""
+    recorder = Recorder(name, budget)
+    stack = ExitStack()
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(recorder))
+
+    return recorder, stack
+
+
+def finish(recorder, stack):
+    stack.close()
+
+    elapsed = time.monotonic() - recorder.started
+    similar = recorder.similar()
+    over_budget = recorder.budget is not None and recorder.queries > recorder.budget
+
+    try:
+        save(recorder, elapsed, similar, over_budget)
+    except Exception:
+        logger.exception("Instrumentation save failed")
+
+    if over_budget:
+        message = "{0}: {1} queries, budget {2}".format(recorder.name, recorder.queries, recorder.budget)
+        if settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+def save(recorder, elapsed, similar, over_budget):
+    values = {
+        "count": 1,
+        "queries": recorder.queries,
+        "duplicates": recorder.duplicates,
+        "similar": sum(n for __, n in similar),
+        "db_ms": round(recorder.db_time * 1000, 3),
+        "time_ms": round(elapsed * 1000, 3),
+        "over_budget": int(over_budget),
+    }
+    bucket = BUCKET_KEY.format(int(time.time()) // 60)
+
+    pipe = REDIS_CLIENT.pipeline(transaction=False)
+    for field, value in values.items():
+        if not value:
+            continue
+
+        key = f"{recorder.name}|{field}"
+        if isinstance(value, float):
+            pipe.hincrbyfloat(bucket, key, value)
+            pipe.hincrbyfloat(TOTAL_KEY, key, value)
+        else:
+            pipe.hincrby(bucket, key, value)
+            pipe.hincrby(TOTAL_KEY, key, value)
+    pipe.expire(bucket, BUCKET_TTL)
+
+    if similar:
+        similar_key = SIMILAR_KEY.format(recorder.name)
+        for shape, n in similar:
+            pipe.zincrby(similar_key, n, shape[:500])
+        pipe.expire(similar_key, SIMILAR_TTL)
+
+    pipe.execute()
+
+
+def _parse(data):
+    result = {}
+    for key, value in data.items():
+        name, field = key.decode().rsplit("|", 1)
+        row = result.setdefault(name, dict.fromkeys(FIELDS, 0))
+        row[field] += float(value)
+    return result
+
+
+def window(minutes=60):
+    """Oxirgi minutes daqiqa bo'yicha {nom: {field: qiymat}}"""
+    now = int(time.time()) // 60
+    pipe = REDIS_CLIENT.pipeline(transaction=False)
+    for bucket in range(now - minutes + 1, now + 1):
+        pipe.hgetall(BUCKET_KEY.format(bucket))
+
+    result = {}
+    for data in pipe.execute():
+        for name, row in _parse(data).items():
+            target = result.setdefault(name, dict.fromkeys(FIELDS, 0))
+            for field, value in row.items():
+                target[field] += value
+
+    return result
+
+
+def totals():
+    return _parse(REDIS_CLIENT.hgetall(TOTAL_KEY))
+
+
+def top_similar(name, limit=5):
+    return [
+        (shape.decode(), int(n))
+        for shape, n in REDIS_CLIENT.zrevrange(SIMILAR_KEY.format(name), 0, limit - 1, withscores=True)
+    ]
+
+
+def prometheus_text():
+    metrics = (
+        ("requests", "count", "Requests or task runs"),
+        ("queries", "queries", "SQL queries"),
+        ("duplicate_queries", "duplicates", "Repeated identical SQL queries"),
+        ("similar_queries", "similar", "Queries in N+1 patterns"),
+        ("db_seconds", "db_ms", "Time spent in SQL"),
+        ("duration_seconds", "time_ms", "Request or task duration"),
+        ("over_budget", "over_budget", "Runs over the query budget"),
+    )
+    data = totals()
+    lines = []
+    for metric, field, help_text in metrics:
+        lines.append(f"# HELP smartbozor_{metric}_total {help_text}")
+        lines.append(f"# TYPE smartbozor_{metric}_total counter")
+        for name in sorted(data):
+            value = data[name][field]
+            if field.endswith("_ms"):
+                value /= 1000
+            kind, __, view = name.partition(":")
+            view = view.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'smartbozor_{metric}_total{{kind="{kind}",name="{view}"}} {value:.17g}')
+
+    return "\n".join(lines) + "\n"
+
+
+def view_budget(request):
+    match = request.resolver_match
+    if match is None:
+        return None
+
+    view_class = getattr(match.func, "view_class", None)
+    budget = getattr(view_class, "QUERY_BUDGET", None)
+    if budget is None:
+        budget = settings.QUERY_BUDGETS.get(match.view_name)
+
+    return budget
+
+
+class InstrumentationMiddleware:
+    """
+    View nomi bo'yicha (url name) SQL va vaqt statistikasi.
+    Byudjet: view klassida QUERY_BUDGET yoki settings.QUERY_BUDGETS[view_name].
+    """
+
+    # ASGI'da butun zanjir sync'ga o'tkazilmasin (async view'lar thread'siz ishlaydi)
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if not enabled():
+            return self.get_response(request)
+
+        recorder, stack = start("view:-")
+        try:
+            response = self.get_response(request)
+        except Exception:
+            stack.close()
+            raise
+
+        self.resolve(recorder, request)
+        finish(recorder, stack)
+
+        return response
+
+    async def __acall__(self, request):
+        if not enabled():
+            return await self.get_response(request)
+
+        recorder, stack = start("view:-")
+        try:
+            response = await self.get_response(request)
+        except Exception:
+            stack.close()
+            raise
+
+        self.resolve(recorder, request)
+        # Redis'ga yozish bloklovchi: event loop'dan tashqarida
+        await sync_to_async(finish)(recorder, stack)
+
+        return response
+
+    @staticmethod
+    def resolve(recorder, request):
+        match = request.resolver_match
+        recorder.name = "view:" + (match.view_name if match and match.view_name else "-")
+        recorder.budget = view_budget(request)
+
+
+_task_recorders = {}
+
+
+def task_prerun(task_id=None, task=None, **kwargs):
+    if enabled():
+        _task_recorders[task_id] = start("task:" + task.name, getattr(task, "query_budget", None))
+
+
+def task_postrun(task_id=None, **kwargs):
+    state = _task_recorders.pop(task_id, None)
+    if state is not None:
+        finish(*state)
+
+
+def connect_celery_signals():
+    from celery.signals import task_prerun as prerun, task_postrun as postrun
+
+    prerun.connect(task_prerun, weak=False)
+    postrun.connect(task_postrun, weak=False)
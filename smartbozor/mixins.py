@@ -2,9 +2,12 @@ import calendar
 import datetime
 
 from dateutil.relativedelta import relativedelta
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import PermissionDenied
 from django.utils import timezone
 from django.utils.formats import date_format
 
+from smartbozor.db_router import use_replica
 from smartbozor.helpers import normalize_d
 
 
@@ -65,3 +68,46 @@ class NormalizeDataMixin:
 
 
         return data, months, month
+
+
+class AsyncPermissionRequiredMixin:
+    """LoginRequiredMixin + PermissionRequiredMixin ning async (ASGI) view'lar uchun varianti"""
+    permission_required = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+
+        if self.permission_required and not await user.ahas_perm(self.permission_required):
+            raise PermissionDenied
+
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class ReadReplicaMixin:
+    """
+    Faqat o'qiydigan analitik view: o'qishlar replika orqali (sozlangan bo'lsa).
+    Login/ruxsat tekshiruvlari primary'da qolishi uchun MRO da ulardan keyin qo'yiladi.
+    """
+
+    def includes_today(self, request):
+        if isinstance(self, NormalizeDataMixin):
+            data, __, __ = self.normalize_data(request.GET.dict())
+            start, end = self.date_range(data)
+            return start <= timezone.localtime().date() < end
+
+        return True
+
+    def dispatch(self, request, *args, **kwargs):
+        with use_replica(self.includes_today(request)):
+            return super().dispatch(request, *args, **kwargs)
+
+
+class ReadReplicaCommandMixin:
+    """Faqat o'qiydigan management buyruqlari uchun"""
+    replica_includes_today = False
+
+    def execute(self, *args, **options):
+        with use_replica(self.replica_includes_today):
+            return super().execute(*args, **options)
@@ -0,0 +1,41 @@
+import pickle
+
+from smartbozor.redis import REDIS_CLIENT
+
+# Har bir foydalanuvchi uchun menyu ma'lumotlari (ruxsat berilgan bozorlar, buyumlar).
+# Bozor/tuman/viloyat/buyum o'zgarsa umumiy versiya oshadi, allowed_bazaar o'zgarsa faqat o'sha foydalanuvchi keshi o'chadi.
+NAV_VERSION_KEY = "nav:version"
+NAV_USER_KEY = "nav:user:{0}"
+NAV_TTL = 3600
+
+
+def _load(user):
+    from apps.rent.models import Thing
+
+    return {
+        "bazaars": list(user.allowed_bazaar.select_related('district__region').order_by("id").all()),
+        "things": list(Thing.objects.order_by('id').all()),
+    }
+
+
+def get_navigation(user):
+    version, raw = REDIS_CLIENT.mget(NAV_VERSION_KEY, NAV_USER_KEY.format(user.pk))
+    version = int(version or 0)
+    if raw is not None:
+        data = pickle.loads(raw)
+        if data["version"] == version:
+            return data
+
+    data = _load(user)
+    data["version"] = version
+    REDIS_CLIENT.set(NAV_USER_KEY.format(user.pk), pickle.dumps(data), ex=NAV_TTL)
+    return data
+
+
+def invalidate_user(*user_ids):
+    if user_ids:
+        REDIS_CLIENT.delete(*[NAV_USER_KEY.format(user_id) for user_id in user_ids])
+
+
+def invalidate_all():
+    REDIS_CLIENT.incr(NAV_VERSION_KEY)
@@ -1,6 +1,11 @@
 import datetime
+import gzip
+import os
+import re
 
 from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db import connection, transaction
 
 
 def partition_table_info(table_name, add=0, use_days=False):
@@ -39,3 +44,181 @@ def create_partition_table_sql(table_name, add=0, *, use_days=False, add_time=Tr
     )
 
     return sql
+
+
+GRANULARITY_MONTH = "month"
+GRANULARITY_DAY = "day"
+
+ARCHIVE_DETACH = "detach"  # faqat ajratib qo'yiladi, jadval bazada qoladi
+ARCHIVE_CSV = "csv"  # PARTITION_ARCHIVE_DIR ga csv.gz, so'ng DROP
+
+PARTITION_BOUND_RE = re.compile(r"FROM \('(\d{4}-\d{2}-\d{2})[^']*'\) TO \('(\d{4}-\d{2}-\d{2})[^']*'\)")
+
+
+class PartitionedTable:
+    def __init__(self, table, column, *, granularity=GRANULARITY_MONTH, ahead=5, retention=None, archive=ARCHIVE_DETACH):
+        self.table = table
+        self.column = column
+        self.granularity = granularity
+        # Oldindan yaratiladigan davrlar soni
+        self.ahead = ahead
+        # Nechta davr (oy/kun) ulangan holda qoladi, None - hech qachon arxivlanmaydi
+        self.retention = retention
+        self.archive = archive
+
+    @property
+    def use_days(self):
+        return self.granularity == GRANULARITY_DAY
+
+    def period(self, day, add=0):
+        if self.use_days:
+            start = day + relativedelta(days=add)
+            return start, start + relativedelta(days=1)
+
+        start = day.replace(day=1) + relativedelta(months=add)
+        return start, start + relativedelta(months=1)
+
+    def partition_name(self, start):
+        return f"{self.table}_{start:%Y_%m}" + (f"_{start:%d}" if self.use_days else "")
+
+
+# Barcha vaqt bo'yicha bo'lingan jadvallar
+PARTITIONED_TABLES = [
+    PartitionedTable("stall_stallstatus", "date"),
+    PartitionedTable("shop_shoppayment", "date"),
+    PartitionedTable("shop_shopstatus", "date"),
+    PartitionedTable("rent_thingstatus", "date"),
+    PartitionedTable("parking_parkingstatus", "date"),
+    # Turniket hodisalari ko'p: kunlik bo'limlar, hisobot RestroomDaily'da qoladi
+    PartitionedTable("restroom_restroomstatus", "enter_at", granularity=GRANULARITY_DAY, ahead=7, retention=90,
+                     archive=ARCHIVE_CSV),
+    PartitionedTable("main_receipt", "added_at"),
+    PartitionedTable("payment_payme", "create_time"),
+    PartitionedTable("payment_click", "prepare_time"),
+    PartitionedTable("ai_stalldataset", "snapshot_at"),
+    PartitionedTable("ai_stalloccupation", "check_at", retention=6, archive=ARCHIVE_CSV),
+]
+
+
+def get_partitioned_table(table):
+    for row in PARTITIONED_TABLES:
+        if row.table == table:
+            return row
+
+    raise KeyError(table)
+
+
+def existing_partitions(cursor, table):
+    """[(nom, start, end)] - hozir ota jadvalga ulangan bo'limlar"""
+    cursor.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits AS i
+            JOIN pg_class AS c ON c.oid = i.inhrelid
+            JOIN pg_class AS p ON p.oid = i.inhparent
+        WHERE p.relname = %s
+        ORDER BY c.relname
+    """, [table])
+
+    result = []
+    for name, bound in cursor.fetchall():
+        m = PARTITION_BOUND_RE.search(bound or "")
+        if m:
+            result.append((
+                name,
+                datetime.date.fromisoformat(m.group(1)),
+                datetime.date.fromisoformat(m.group(2)),
+            ))
+
+    return result
+
+
+def ensure_partitions(cursor, pt, today=None):
+    """Joriy va keyingi pt.ahead davr uchun bo'limlarni yaratadi, yaratilganlar ro'yxatini qaytaradi"""
+    today = today or datetime.date.today()
+    existing = existing_partitions(cursor, pt.table)
+
+    created = []
+    for add in range(0, pt.ahead + 1):
+        start, end = pt.period(today, add)
+        # Boshqa granulyarlikdagi bo'lim shu oraliqni qoplagan bo'lsa, o'tkazib yuboramiz
+        if any(s < end and start < e for __, s, e in existing):
+            continue
+
+        name = pt.partition_name(start)
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {pt.table} "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}');"
+        )
+        existing.append((name, start, end))
+        created.append(name)
+
+    return created
+
+
+def cold_partitions(cursor, pt, today=None):
+    if pt.retention is None:
+        return []
+
+    today = today or datetime.date.today()
+    cutoff, __ = pt.period(today, -pt.retention)
+
+    return [row for row in existing_partitions(cursor, pt.table) if row[2] <= cutoff]
+
+
+def archive_path(pt, name):
+    return os.path.join(settings.PARTITION_ARCHIVE_DIR, pt.table, f"{name}.csv.gz")
+
+
+def archive_partition(pt, name):
+    """
+    Bo'limni ajratib (DETACH), CSV arxivga yozib o'chiradi. Har qadam alohida tranzaksiyada:
+    ota jadval faqat qisqa DETACH paytida qulflanadi, COPY paytida tirik bo'limlarga yozish to'xtamaydi.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Uzoq so'rovlar ortida navbatda turib, boshqa yozuvlarni to'sib qo'ymasin
+        cursor.execute("SET LOCAL lock_timeout = '5s'")
+        cursor.execute(f"ALTER TABLE {pt.table} DETACH PARTITION {name}")
+
+    if pt.archive != ARCHIVE_CSV:
+        return None
+
+    path = archive_path(pt, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    tmp_path = path + ".tmp"
+    with connection.cursor() as cursor, gzip.open(tmp_path, "wb") as f:
+        cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER true)", f)
+    os.replace(tmp_path, path)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE {name}")
+
+    return path
+
+
+def partition_sizes(cursor, tables=None):
+    """[(jadval, bo'lim, start, end, hajm baytda, taxminiy qatorlar)]"""
+    tables = tables or [pt.table for pt in PARTITIONED_TABLES]
+    cursor.execute("""
+        SELECT p.relname, c.relname, pg_get_expr(c.relpartbound, c.oid),
+               pg_total_relation_size(c.oid), c.reltuples::bigint
+        FROM pg_inherits AS i
+            JOIN pg_class AS c ON c.oid = i.inhrelid
+            JOIN pg_class AS p ON p.oid = i.inhparent
+        WHERE p.relname = ANY(%s)
+        ORDER BY p.relname, c.relname
+    """, [list(tables)])
+
+    result = []
+    for table, name, bound, size, rows in cursor.fetchall():
+        m = PARTITION_BOUND_RE.search(bound or "")
+        result.append((
+            table,
+            name,
+            m.group(1) if m else None,
+            m.group(2) if m else None,
+            size,
+            max(rows, 0),
+        ))
+
+    return result
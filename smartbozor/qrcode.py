@@ -1,18 +1,37 @@
+import hashlib
 import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
-import qrcode
-from PIL import Image, ImageDraw, ImageFont
 from django.conf import settings
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
 
 DPI = 300
 QR_SIZE_MM=110
 QR_MARGIN_MM=48.6
 QR_TITLE_MARGIN_MM=1900
 QR_TEXT_MARGIN_MM=1990
+DEFAULT_FONT = "Orbitron-Black.ttf"
 
+# generate_qr_code chizish usuli o'zgarsa oshiriladi: barcha keshlangan PNG'lar yaroqsiz bo'ladi
+RENDER_VERSION = 1
+CACHE_URL = "qr-codes/cas"
+MANIFEST_NAME = "manifest.jsonl"
+
+# Jarayon ichida: bor deb bilingan kalitlar va yaratilgan kataloglar (har murojaatda stat qilmaslik uchun)
+_known_keys = set()
+_known_dirs = set()
+
+# PIL va qrcode shu yerda import qilinmaydi: modellar bu modulni import qiladi, rasm esa faqat yaratishda kerak
+
+
+def paste_rgba_on_white(img_rgba):
+    from PIL import Image
 
-def paste_rgba_on_white(img_rgba: Image.Image) -> Image.Image:
     if img_rgba.mode != "RGBA":
         return img_rgba.convert("RGB")
     bg = Image.new("RGB", img_rgba.size, (255, 255, 255))
@@ -20,17 +39,45 @@ def paste_rgba_on_white(img_rgba: Image.Image) -> Image.Image:
     return bg
 
 
+@lru_cache(maxsize=8)
+def load_template(template):
+    """Oq fonga qo'yilgan shablon (faqat o'qish uchun, nusxa olib ishlatiladi)"""
+    from PIL import Image
+
+    with Image.open(settings.BASE_DIR / "assets" / "qrcode" / template) as img:
+        return paste_rgba_on_white(img.convert("RGBA"))
+
+
+@lru_cache(maxsize=16)
+def load_font(font_name, size):
+    from PIL import ImageFont
+
+    return ImageFont.truetype(settings.BASE_DIR / "assets" / "fonts" / font_name, size=size)
+
+
+@lru_cache(maxsize=8)
+def template_version(template, font_name=DEFAULT_FONT):
+    digest = hashlib.sha256(str(RENDER_VERSION).encode())
+    for path in (settings.BASE_DIR / "assets" / "qrcode" / template, settings.BASE_DIR / "assets" / "fonts" / font_name):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()[:16]
+
+
 def generate_qr_code(template, data, title, text, *,
                      qr_code_top=QR_MARGIN_MM,
                      title_margin=QR_TITLE_MARGIN_MM,
                      text_margin=QR_TEXT_MARGIN_MM,
                      qr_code_size=QR_SIZE_MM,
-                     font_name="Orbitron-Black.ttf",
+                     font_name=DEFAULT_FONT,
                      title_font_size=100,
                      text_font_size=250,
                      ):
-    base = Image.open(settings.BASE_DIR / "assets" / "qrcode" / template).convert("RGBA")
-    base = paste_rgba_on_white(base)
+    import qrcode
+    from PIL import Image, ImageDraw
+
+    base = load_template(template).copy()
 
     W, H = base.size
     draw = ImageDraw.Draw(base)
@@ -50,8 +97,8 @@ def generate_qr_code(template, data, title, text, *,
     y = mm_to_px(qr_code_top)
     base.paste(qr_img, (x, y))
 
-    font_title = ImageFont.truetype(settings.BASE_DIR / "assets" / "fonts" / font_name, size=title_font_size)
-    font_text = ImageFont.truetype(settings.BASE_DIR / "assets" / "fonts" / font_name, size=text_font_size)
+    font_title = load_font(font_name, title_font_size)
+    font_text = load_font(font_name, text_font_size)
 
     def draw_text(txt, fnt, margin):
         bbox = draw.textbbox((0, 0), txt, font=fnt)
@@ -67,9 +114,185 @@ def generate_qr_code(template, data, title, text, *,
 
     return base
 
-def render_qr_png_file(img_file):
-    with open(img_file, "rb") as f:
-        return HttpResponse(f.read(), content_type="image/png")
+def qr_matrix(data):
+    """generate_qr_code bilan bir xil modullar (border=1 bilan)"""
+    import qrcode
+
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=qrcode.ERROR_CORRECT_H,
+        border=1
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+@lru_cache(maxsize=8)
+def template_png(template, scale):
+    """Shablon fon rasmi (oq fonda, 1/scale o'lchamda) PNG baytlari va asl o'lchami"""
+    from PIL import Image
+
+    base = load_template(template)
+    size = base.size
+    if scale > 1:
+        base = base.resize((size[0] // scale, size[1] // scale), Image.LANCZOS)
+    else:
+        base = base.copy()
+
+    buf = io.BytesIO()
+    base.save(buf, format="PNG", optimize=True)
+    base.close()
+    return buf.getvalue(), size
+
+
+def qr_cache_key(template, data, title, text):
+    """Kontent bo'yicha kalit: havola, sarlavha, matn yoki shablon o'zgarsa kalit ham o'zgaradi"""
+    payload = "\0".join((template_version(template), template, data, title, text))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def qr_cache_path(key):
+    return settings.MEDIA_ROOT / CACHE_URL / key[:2] / f"{key}.png"
+
+
+def _manifest_path():
+    return settings.MEDIA_ROOT / CACHE_URL / MANIFEST_NAME
+
+
+def load_manifest():
+    """{kalit: [shablon, havola, sarlavha, matn]} - yaratilgan PNG'lar ro'yxati"""
+    result = {}
+    try:
+        with open(_manifest_path(), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                result[row[0]] = row[1:]
+    except FileNotFoundError:
+        pass
+
+    return result
+
+
+def _append_manifest(rows):
+    if not rows:
+        return
+
+    lines = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode()
+    os.makedirs(_manifest_path().parent, exist_ok=True)
+    # O_APPEND: parallel jarayonlar qatorlari aralashib ketmaydi
+    fd = os.open(_manifest_path(), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.write(fd, lines)
+    finally:
+        os.close(fd)
+
+
+def _render_to_file(key, label):
+    path = qr_cache_path(key)
+    if path.parent not in _known_dirs:
+        os.makedirs(path.parent, exist_ok=True)
+        _known_dirs.add(path.parent)
+
+    img = generate_qr_code(*label)
+    tmp = path.with_name(f"{key}.{os.getpid()}.tmp")
+    img.save(tmp, format="PNG", optimize=True, compress_level=9, dpi=(DPI, DPI))
+    img.close()
+    os.replace(tmp, path)
+    return key
+
+
+def qr_png_file(template, data, title, text):
+    """Bitta yorliq PNG fayli (keshda bo'lmasa yaratiladi)"""
+    key = qr_cache_key(template, data, title, text)
+    path = qr_cache_path(key)
+    if key in _known_keys and os.path.exists(path):
+        return path
+
+    if not os.path.exists(path):
+        _known_dirs.discard(path.parent)
+        _render_to_file(key, (template, data, title, text))
+        if key not in _known_keys:
+            _append_manifest([[key, template, data, title, text]])
+
+    _known_keys.add(key)
+    return path
+
+
+def render_many(items, workers=None):
+    """
+    items: [(shablon, havola, sarlavha, matn), ...] -> PNG yo'llari shu tartibda.
+    Keshda yo'qlari (manifest bo'yicha) jarayonlar pulida yaratiladi.
+    """
+    labels = [tuple(item) for item in items]
+    keys = [qr_cache_key(*label) for label in labels]
+
+    manifest = load_manifest()
+    missing = {}
+    for key, label in zip(keys, labels):
+        # Manifestda bor, lekin fayl o'chirilgan bo'lsa ham qayta yaratiladi
+        if key in manifest or key in _known_keys:
+            if os.path.exists(qr_cache_path(key)):
+                continue
+            _known_keys.discard(key)
+            _known_dirs.discard(qr_cache_path(key).parent)
+        missing[key] = label
+
+    # Fork'dan oldin: bolalar tayyor shablon va shriftlarni meros oladi
+    for template in {label[0] for label in missing.values()}:
+        load_template(template)
+        load_font(DEFAULT_FONT, 100)
+        load_font(DEFAULT_FONT, 250)
+
+    workers = workers or os.cpu_count() or 1
+    if len(missing) > 1 and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(missing)),
+                                 mp_context=multiprocessing.get_context("fork")) as executor:
+            list(executor.map(_render_to_file, missing.keys(), missing.values(), chunksize=32))
+    else:
+        for key, label in missing.items():
+            _render_to_file(key, label)
+
+    _append_manifest([[key, *label] for key, label in missing.items() if key not in manifest])
+    _known_keys.update(keys)
+
+    return [qr_cache_path(key) for key in keys]
+
+
+def send_file(request, path, content_type, etag, immutable=False):
+    """
+    Kontent bo'yicha nomlangan faylni yuborish: ETag = nomidagi xesh, If-None-Match bo'lsa 304.
+    QR_X_ACCEL_REDIRECT berilgan bo'lsa faylni nginx o'zi yuboradi (MEDIA_ROOT ichidagi fayllar).
+    """
+    etag = f'"{etag}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        if settings.QR_X_ACCEL_REDIRECT:
+            response = HttpResponse(content_type=content_type)
+            response["X-Accel-Redirect"] = settings.QR_X_ACCEL_REDIRECT + str(path.relative_to(settings.MEDIA_ROOT))
+        else:
+            response = FileResponse(open(path, "rb"), content_type=content_type)
+
+    response["ETag"] = etag
+    # Manzil o'zgarmas (versiyalangan) bo'lsagina uzoq keshlash, aks holda har safar ETag bilan tekshirish
+    response["Cache-Control"] = "private, max-age=31536000, immutable" if immutable else "private, no-cache"
+    return response
+
+
+def serve_qr_png(request, label):
+    """label = (shablon, havola, sarlavha, matn). 304 uchun fayl ochilmaydi ham, yaratilmaydi ham"""
+    key = qr_cache_key(*label)
+    etag = f'"{key}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+    return send_file(request, qr_png_file(*label), "image/png", key)
 
 
 def mm_to_px(mm: float, dpi: int = DPI) -> int:
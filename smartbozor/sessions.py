@@ -0,0 +1,27 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cache import SessionStore as CacheSessionStore
+
+REFRESHED_AT_KEY = "_refreshed_at"
+
+
+def refresh_interval():
+    # Muddat shu qadar o'zgarmasa (SESSION_COOKIE_AGE'ning 1%, kamida 1 daqiqa) saqlash shart emas
+    return max(60, settings.SESSION_COOKIE_AGE // 100)
+
+
+class SessionStore(CacheSessionStore):
+    """
+    Redis (SESSION_CACHE_ALIAS) keshidagi sessiya. SESSION_SAVE_EVERY_REQUEST=True bo'lsa ham
+    o'zgarmagan sessiya faqat muddati sezilarli uzayadigan bo'lsagina qayta yoziladi.
+    """
+
+    def save(self, must_create=False):
+        now = int(time.time())
+        if not must_create and not self.modified and self.session_key \
+                and now - self._get_session().get(REFRESHED_AT_KEY, 0) < refresh_interval():
+            return
+
+        self[REFRESHED_AT_KEY] = now
+        super().save(must_create=must_create)
@@ -13,6 +13,7 @@ import os
 import time
 from pathlib import Path
 import jinja2
+from celery.schedules import crontab
 from django.urls import reverse_lazy
 from django_jinja.builtins import DEFAULT_EXTENSIONS
 from dotenv import load_dotenv
@@ -72,6 +73,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'smartbozor.instrumentation.InstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -85,6 +87,21 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'smartbozor.urls'
 
+# SQL/vaqt statistikasi (smartbozor/instrumentation.py)
+INSTRUMENTATION = os.getenv('INSTRUMENTATION', '1') == '1'
+# Testlarda '1': byudjetdan oshgan view xato beradi, aks holda faqat log
+QUERY_BUDGET_RAISE = os.getenv('QUERY_BUDGET_RAISE', '0') == '1'
+# url name -> maksimal SQL so'rovlar soni (view klassidagi QUERY_BUDGET ustun)
+QUERY_BUDGETS = {
+    "stall:list": 30,
+    "shop:list": 30,
+    "stall:qr-code": 10,
+    "shop:qr-code": 10,
+    "rent:qr-code": 10,
+}
+# /metrics/ uchun "Authorization: Bearer <token>" (staff foydalanuvchilarga tokensiz)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 STATIC_VERSION = time.time() if DEBUG else int(os.getenv('STATIC_VERSION'))
 
 TEMPLATES = [
@@ -152,6 +169,20 @@ DATABASES = {
     'default': DB_DEFAULT
 }
 
+# Ixtiyoriy read-replica: hisobot, dashboard, eksport va AI buyruqlari o'qishlari uchun
+if os.getenv("DATABASE_REPLICA_HOST"):
+    DATABASES['replica'] = {
+        **DB_DEFAULT,
+        'HOST': os.environ["DATABASE_REPLICA_HOST"],
+        'PORT': os.getenv("DATABASE_REPLICA_PORT", ""),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['smartbozor.db_router.ReplicaRouter']
+
+# Replika shu soniyadan ko'p orqada qolsa, bugungi ma'lumotlar primary'dan o'qiladi
+DATABASE_REPLICA_MAX_LAG = int(os.getenv("DATABASE_REPLICA_MAX_LAG", 30))
+
 
 
 # Password validation
@@ -209,6 +240,10 @@ STATIC_ROOT = BASE_DIR / 'static' / 'backend'
 MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_URL = '/media/'
 
+# nginx: "location /protected-media/ { internal; alias <MEDIA_ROOT>/; }" bo'lsa "/protected-media/".
+# Bo'sh bo'lsa QR PNG/PDF fayllari FileResponse bilan yuboriladi
+QR_X_ACCEL_REDIRECT = os.getenv("QR_X_ACCEL_REDIRECT", "")
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -224,6 +259,22 @@ LOGOUT_REDIRECT_URL = reverse_lazy('main:index')
 
 SESSION_COOKIE_AGE = int(os.getenv('SESSION_COOKIE_AGE'))
 SESSION_SAVE_EVERY_REQUEST = True
+# "smartbozor.sessions" - Redis keshidagi sessiya, har so'rovda emas, muddat sezilarli o'zgarganda yoziladi
+SESSION_ENGINE = os.getenv('SESSION_ENGINE', 'django.contrib.sessions.backends.db')
+SESSION_CACHE_ALIAS = "sessions"
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "sessions": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": "redis://{0}:{1}/{2}".format(
+            os.getenv('REDIS_HOST', '127.0.0.1'), os.getenv('REDIS_PORT', 6379), os.getenv('REDIS_DB', 0)
+        ),
+        "KEY_PREFIX": "session",
+    },
+}
 
 USE_X_FORWARDED_HOST = True
 USE_X_FORWARDED_PORT = True
@@ -247,6 +298,41 @@ CELERY_TASK_TIME_LIMIT = 30 * 60
 CELERY_RESULT_BACKEND = CELERY_BROKER_URL
 CELERY_RESULT_EXPIRES = 30
 CELERY_ENABLE_UTC = False
+CELERY_BEAT_SCHEDULE = {
+    "maintain-partitions": {
+        "task": "apps.main.tasks.maintain_partitions",
+        "schedule": crontab(hour=3, minute=30),
+    },
+    "probe-bazaars": {
+        "task": "apps.main.tasks.probe_bazaars",
+        "schedule": 60.0,
+        # Navbatda qolib ketganlari ustma-ust ishlamasin
+        "options": {"expires": 55},
+    },
+    "drain-cdc-outbox": {
+        "task": "apps.main.tasks.drain_cdc_outbox",
+        "schedule": 10.0,
+    },
+    "flush-token-last-used": {
+        "task": "apps.api.tasks.flush_token_last_used",
+        "schedule": 60.0,
+    },
+    "flush-restroom-events": {
+        "task": "apps.restroom.tasks.flush_restroom_events",
+        "schedule": 5.0,
+    },
+    "rollup-restroom-daily": {
+        "task": "apps.restroom.tasks.rollup_restroom_daily",
+        "schedule": 600.0,
+    },
+    "cleanup-import-rows": {
+        "task": "apps.main.tasks.cleanup_import_rows",
+        "schedule": crontab(hour=4, minute=0),
+    },
+}
+
+# Arxivlangan (ajratilgan) bo'limlarning csv.gz nusxalari
+PARTITION_ARCHIVE_DIR = os.getenv("PARTITION_ARCHIVE_DIR", str(BASE_DIR / "archive" / "partitions"))
 
 CLICKHOUSE_HOST = os.getenv('CLICKHOUSE_HOST')
 CLICKHOUSE_PORT = os.getenv('CLICKHOUSE_PORT')
@@ -24,15 +24,18 @@ from django.utils.translation import gettext_lazy as _
 from django.views.i18n import JavaScriptCatalog
 from django_otp.admin import OTPAdminSite
 
+from apps.main.views import MainMetricsView
 from apps.parking.views import ParkingActionView
 from apps.payment.views import PaymentQrStallView, PaymentClick, PaymentPayme, PaymentQrShopView, PaymentQrRentView, \
     PaymentQrParkingView, PaymentQrPoint, PaymentClickPointProduct
+from apps.restroom.views import RestroomEventView
 from smartbozor.storages import stall_storage
 
 urlpatterns = [
     path('control/', admin.site.urls),
     path("jsi18n/", JavaScriptCatalog.as_view(), name="javascript-catalog"),
     path("api/", include("apps.api.urls")),
+    path("metrics/", MainMetricsView.as_view(), name="metrics"),
 
     path("s/<int:bazaar_id>-<int:area_id>-<int:section_id>-<str:number>/", PaymentQrStallView.as_view(), name="stall-qr"),
     path("m/<int:bazaar_id>-<int:area_id>-<int:section_id>-<str:number>/", PaymentQrShopView.as_view(), name="shop-qr"),
@@ -41,6 +44,7 @@ urlpatterns = [
     path("x/<int:pk>/", PaymentQrPoint.as_view(), name="point-qr"),
 
     path("parking/<str:action>/<str:token>/", ParkingActionView.as_view(), name="action"),
+    path("restroom/<str:token>/", RestroomEventView.as_view(), name="restroom-event"),
 
     path("payment/click/<str:name>/", PaymentClick.as_view(), name="payment-click"),
     path("payment/click/x/<str:slug>/", PaymentClickPointProduct.as_view(), name="payment-x-click"),